@@ -0,0 +1,318 @@
+"""
+Store colonnaire en mémoire des chaînes, en lecture seule, un par worker.
+
+Les métriques sont gardées en tableaux NumPy (une case par chaîne, dans
+l'ordre naturel de la collection) avec, à côté, les noms, URLs et revenus
+affichés. Le store est rechargé seulement quand la version des données
+(collection `meta`, document `data_version`) change : les routes de
+classement y font leurs top-k (argpartition) et leurs statistiques
+(réductions vectorisées) sans relire Mongo.
+
+    python channel_store.py --synthetic 1000000    # empreinte mémoire
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+import numpy as np
+
+
+METRIC_FIELDS = ("subscribers", "total_views", "videos")
+TEXT_FIELDS = ("channel_name", "channel_url", "estimated_monthly_earnings")
+PROJECTION = {field: 1 for field in ("rank",) + METRIC_FIELDS + TEXT_FIELDS}
+
+STORE_CHECK_SECONDS = float(os.getenv("STORE_CHECK_SECONDS", "5"))
+
+
+def extract_salary(s):
+    """Extrait le nombre du format '$6M - $18M' ou '$865K - $3M'"""
+    if not s:
+        return 0
+    # Enlève le '$' et récupère la première partie
+    parts = s.split(' - ')
+    first_part = parts[0].replace('$', '').strip()
+    # Convertit 'K' et 'M' en nombres
+    try:
+        if 'M' in first_part:
+            return float(first_part.replace('M', '')) * 1000000
+        elif 'K' in first_part:
+            return float(first_part.replace('K', '')) * 1000
+    except ValueError:
+        pass
+    return 0
+
+
+def _ratio(numerator, denominator):
+    """numerator / denominator, 0 quand le dénominateur est nul."""
+    out = np.zeros(len(numerator), dtype=np.float64)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+
+class ChannelStore:
+    """Métriques des chaînes en colonnes NumPy + index vers les champs texte."""
+
+    def __init__(self, docs, version=None):
+        """
+        Args:
+            docs: Documents channels_enriched (ordre naturel de la collection)
+            version: Version des données chargées
+        """
+        docs = list(docs)
+        n = len(docs)
+        self.version = version
+        self.loaded_at = time.time()
+
+        self.ids = np.array([str(d.get("_id")) for d in docs], dtype=object)
+        self.text = {
+            field: np.array([d.get(field) for d in docs], dtype=object)
+            for field in TEXT_FIELDS
+        }
+        # rank manquant = NaN (trié avant les autres en ordre croissant, comme Mongo)
+        self.rank = np.fromiter(
+            (d["rank"] if d.get("rank") is not None else np.nan for d in docs),
+            dtype=np.float64, count=n,
+        )
+        self.metrics = {
+            field: np.fromiter((d.get(field) or 0 for d in docs), dtype=np.int64, count=n)
+            for field in METRIC_FIELDS
+        }
+        subscribers = self.metrics["subscribers"]
+        views = self.metrics["total_views"]
+        videos = self.metrics["videos"]
+        self.metrics.update({
+            "views_per_subscriber": _ratio(views, subscribers),
+            "views_per_video": _ratio(views, videos),
+            "subs_per_video": _ratio(subscribers, videos),
+            "salary": np.fromiter(
+                (extract_salary(s) for s in self.text["estimated_monthly_earnings"]),
+                dtype=np.float64, count=n,
+            ),
+        })
+        self.position = np.arange(n)
+        # Le store est immuable : classements et statistiques calculés une
+        # fois par version, puis servis depuis ce cache
+        self._cache = {}
+
+    @classmethod
+    def from_collection(cls, collection, version=None):
+        return cls(collection.find({}, PROJECTION), version)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ------------------------------------------------------------------
+    # Classements
+    # ------------------------------------------------------------------
+
+    def top_k(self, values, k=10, tiebreak=None):
+        """
+        Indices des k plus grandes valeurs, en ordre décroissant.
+
+        argpartition isole les k meilleures en O(n) ; seules ces valeurs (et
+        les ex aequo du k-ième) sont ensuite triées. Les ex aequo sont
+        départagés par `tiebreak` croissant (défaut : ordre naturel).
+        """
+        n = len(values)
+        if n == 0 or k <= 0:
+            return np.array([], dtype=np.int64)
+        tiebreak = self.position if tiebreak is None else tiebreak
+        if k < n:
+            candidates = np.argpartition(-values, k - 1)[:k]
+            threshold = values[candidates].min()
+            candidates = np.flatnonzero(values >= threshold)
+        else:
+            candidates = self.position
+        order = np.lexsort((tiebreak[candidates], -values[candidates]))
+        return candidates[order][:k]
+
+    def rank_key(self, missing):
+        """Rang en float, les rangs manquants remplacés par `missing`."""
+        return np.where(np.isnan(self.rank), missing, self.rank)
+
+    def top_by(self, metric, k=10):
+        """Top k par métrique ou ratio ('rank' = rangs croissants, 'rank_desc' décroissants)."""
+        key = ("top", metric, k)
+        if key not in self._cache:
+            self._cache[key] = self._top_by(metric, k)
+        return self._cache[key]
+
+    def _top_by(self, metric, k):
+        if metric == "rank":
+            return self.top_k(-self.rank_key(-np.inf), k)
+        if metric == "rank_desc":
+            return self.top_k(self.rank_key(-np.inf), k)
+        if metric == "salary":
+            # Ex aequo départagés par rang (lecture triée par rang)
+            return self.top_k(self.metrics["salary"], k, tiebreak=self.rank_key(-np.inf))
+        return self.top_k(self.metrics[metric], k)
+
+    def rows(self, indices):
+        """Documents (dicts) pour l'affichage des lignes sélectionnées."""
+        rows = []
+        for i in indices:
+            row = {"_id": self.ids[i]}
+            for field in TEXT_FIELDS:
+                row[field] = self.text[field][i]
+            row["rank"] = None if np.isnan(self.rank[i]) else int(self.rank[i])
+            for field in METRIC_FIELDS:
+                row[field] = int(self.metrics[field][i])
+            for field in ("views_per_subscriber", "views_per_video", "subs_per_video"):
+                row[field] = float(self.metrics[field][i])
+            rows.append(row)
+        return rows
+
+    # ------------------------------------------------------------------
+    # Statistiques
+    # ------------------------------------------------------------------
+
+    def summary_stats(self):
+        if "stats" not in self._cache:
+            self._cache["stats"] = self._summary_stats()
+        return dict(self._cache["stats"])
+
+    def _summary_stats(self):
+        if not len(self):
+            return {"avg_subscribers": 0, "median_subscribers": 0, "avg_views": 0,
+                    "median_views": 0, "avg_videos": 0}
+        subscribers = self.metrics["subscribers"]
+        views = self.metrics["total_views"]
+        return {
+            "avg_subscribers": int(subscribers.mean()),
+            "median_subscribers": int(np.median(subscribers)),
+            "avg_views": int(views.mean()),
+            "median_views": int(np.median(views)),
+            "avg_videos": int(self.metrics["videos"].mean()),
+        }
+
+    def correlation(self, x="subscribers", y="total_views"):
+        key = ("correlation", x, y)
+        if key not in self._cache:
+            self._cache[key] = self._correlation(x, y)
+        return self._cache[key]
+
+    def _correlation(self, x, y):
+        a = self.metrics[x]
+        b = self.metrics[y]
+        if len(a) < 2 or a.sum() <= 0 or b.sum() <= 0 or a.std() == 0 or b.std() == 0:
+            return 0
+        return round(float(np.corrcoef(a, b)[0, 1]), 3)
+
+    # ------------------------------------------------------------------
+    # Mémoire
+    # ------------------------------------------------------------------
+
+    def nbytes(self):
+        """Empreinte mémoire approximative (tableaux + chaînes Python)."""
+        total = self.rank.nbytes + self.position.nbytes + self.ids.nbytes
+        total += sum(values.nbytes for values in self.metrics.values())
+        total += sum(sys.getsizeof(s) for s in self.ids)
+        for values in self.text.values():
+            total += values.nbytes
+            total += sum(sys.getsizeof(s) for s in values if s is not None)
+        return total
+
+
+class StoreCache:
+    """Store du worker, rechargé quand la version des données change."""
+
+    def __init__(self, check_every=STORE_CHECK_SECONDS):
+        self.check_every = check_every
+        self._store = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, get_db):
+        """
+        Args:
+            get_db: Fabrique de connexion, appelée seulement pour vérifier la version
+        """
+        now = time.monotonic()
+        store = self._store
+        if store is not None and now < self._next_check:
+            return store
+
+        # Un seul thread recharge ; les autres continuent sur l'ancien store
+        # au lieu d'attendre le lock (seul le tout premier chargement bloque)
+        if not self._lock.acquire(blocking=store is None):
+            return store
+        try:
+            if self._store is None or now >= self._next_check:
+                db = get_db()
+                collection = db["channels_enriched"]
+                meta = db["meta"].find_one({"_id": "data_version"}) or {}
+                # Base jamais estampillée : le nombre de documents sert de version
+                version = meta.get("version") or f"count:{collection.estimated_document_count()}"
+                if self._store is None or self._store.version != version:
+                    start = time.perf_counter()
+                    self._store = ChannelStore.from_collection(collection, version)
+                    print(f"[ChannelStore] {len(self._store)} chaînes chargées "
+                          f"en {time.perf_counter() - start:.2f}s (version {version})")
+                self._next_check = time.monotonic() + self.check_every
+            return self._store
+        finally:
+            self._lock.release()
+
+
+STORE_CACHE = StoreCache()
+
+
+def get_store(get_db):
+    """Store du worker courant (rechargé si la version des données a changé)."""
+    return STORE_CACHE.get(get_db)
+
+
+def synthetic_docs(n, seed=42):
+    rng = np.random.default_rng(seed)
+    subscribers = rng.lognormal(13, 2, n).astype(np.int64)
+    for i in range(n):
+        yield {
+            "_id": f"{i:024x}",
+            "rank": i + 1,
+            "channel_name": f"Channel {i}",
+            "channel_url": f"https://vidiq.com/fr/youtube-stats/channel/UC{i:022d}/",
+            "estimated_monthly_earnings": f"${rng.integers(1, 999)}K - ${rng.integers(1, 9)}M",
+            "subscribers": int(subscribers[i]),
+            "total_views": int(subscribers[i] * rng.uniform(10, 500)),
+            "videos": int(rng.integers(1, 50_000)),
+        }
+
+
+def _timings(fn, repeat=1000):
+    """Durée du premier appel (calcul) et moyenne des suivants (cache)."""
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return first, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Empreinte mémoire et latence du store colonnaire")
+    parser.add_argument("--synthetic", type=int, default=1_000_000, help="Nombre de chaînes synthétiques")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = ChannelStore(synthetic_docs(args.synthetic))
+    load = time.perf_counter() - start
+
+    size = store.nbytes()
+    print(f"{len(store)} chaînes chargées en {load:.1f}s")
+    print(f"Mémoire : {size / 1e6:.0f} Mo, soit {size / len(store):.0f} octets par chaîne "
+          f"(= Mo par million de chaînes)")
+    print(f"{'':<30}{'1er appel (ms)':>16}{'suivants (µs)':>16}")
+    for metric in ("salary", "views_per_video", "views_per_subscriber", "total_views", "rank"):
+        first, cached = _timings(lambda: store.rows(store.top_by(metric)))
+        print(f"  top 10 {metric:<22}{first * 1e3:>16.2f}{cached * 1e6:>16.1f}")
+    first, cached = _timings(lambda: (store.summary_stats(), store.correlation()))
+    print(f"  {'statistiques + corrélation':<28}{first * 1e3:>16.2f}{cached * 1e6:>16.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,12 +2,18 @@ from flask import Flask, render_template, request, jsonify
 from pymongo import MongoClient
 import os
 import json
-import statistics
 import numpy as np
 from jinja2 import Undefined
 import collections.abc
 from scipy import stats as scipy_stats
 import re
+import math
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+from channel_store import get_store
+from prerender import PRERENDERED
+from query_api import INDEX_MANAGER, QueryError, build_batch_lookup, build_query, explained_indexes
 
 
 
@@ -79,6 +85,28 @@ def humanize_metric(value):
 
 app.jinja_env.filters['humanize_metric'] = humanize_metric
 
+# Tris du top 10 (?sort_by=) -> métrique du store ; tout autre tri = rang décroissant
+TOP10_SORTS = {
+    'salary': 'salary',
+    'views_per_video': 'views_per_video',
+    'videos': 'videos',
+    'views': 'total_views',
+    'rank': 'rank',
+}
+CHANNELS_PER_PAGE = 20
+
+
+# Routes dont prerender.py rend des pages ; les autres (API, statiques,
+# recherche) ne passent pas par le rafraîchissement des pages pré-rendues
+PRERENDERED_ENDPOINTS = {'home', 'channels_list', 'top10', 'chaines_sous_cotees', 'quiz'}
+
+
+@app.before_request
+def serve_prerendered():
+    """Sert la page pré-rendue (prerender.py) si elle est à jour, sans Jinja."""
+    if request.endpoint in PRERENDERED_ENDPOINTS and app.config.get('SERVE_PRERENDERED', True):
+        return PRERENDERED.response(request, get_db)
+
 @app.route("/")
 def home():
     """Accueil - affiche les stats générales."""
@@ -109,7 +137,7 @@ def channels_list():
     try:
         # Paramètres de pagination
         page = request.args.get('page', 1, type=int)
-        per_page = 20
+        per_page = CHANNELS_PER_PAGE
         skip = (page - 1) * per_page
         
         db = get_db()
@@ -184,9 +212,6 @@ def search():
 def top10():
     """Affiche le top 10 avec sélection de tri : salaire, vidéos, vues ou vues/vidéo."""
     try:
-        db = get_db()
-        collection = db['channels_enriched']
-        
         # Paramètre de tri (salary, videos, views, views_per_video)
         sort_by = request.args.get('sort_by', type=str)
 
@@ -197,60 +222,9 @@ def top10():
                 sort_by=None
             )
         
-        # Récupère tous les canaux et trie en Python
-        if sort_by == 'salary':
-            # Pour le tri par salaire, parse la chaîne "$6M - $18M"
-            all_channels = list(collection.find().sort('rank', 1))
-            
-            def extract_salary(s):
-                """Extrait le nombre du format '$6M - $18M' ou '$865K - $3M'"""
-                if not s:
-                    return 0
-                # Enlève le '$' et récupère la première partie
-                parts = s.split(' - ')
-                first_part = parts[0].replace('$', '').strip()
-                # Convertit 'K' et 'M' en nombres
-                if 'M' in first_part:
-                    return float(first_part.replace('M', '')) * 1000000
-                elif 'K' in first_part:
-                    return float(first_part.replace('K', '')) * 1000
-                return 0
-            
-            # Trie par salaire estimé (descendant)
-            all_channels.sort(key=lambda x: extract_salary(x.get('estimated_monthly_earnings', '')), reverse=True)
-            top_channels = all_channels[:10]
-
-        elif sort_by == 'views_per_video':
-            all_channels = list(collection.find())
-            all_channels = add_derived_metrics(all_channels)
-            top_channels = sorted(
-                all_channels,
-                key=lambda c: c.get("views_per_video", 0),
-                reverse=True
-            )[:10]
-        
-        else:
-            # Pour les autres tris, utilise MongoDB sort
-            sort_field_map = {
-                'videos': 'videos',
-                'views': 'total_views',
-                'rank': 'rank'
-            }
-            sort_field = sort_field_map.get(sort_by, 'rank')
-            sort_order = 1 if sort_by == 'rank' else -1
-            
-            top_channels = list(
-                collection.find()
-                .sort(sort_field, sort_order)
-                .limit(10)
-            )
-        
-        # Ajoute les métriques dérivées pour l'affichage (views_per_video, etc.)
-        top_channels = add_derived_metrics(top_channels)
-
-        # Convertit ObjectId en string
-        for ch in top_channels:
-            ch['_id'] = str(ch['_id'])
+        # Top 10 depuis le store colonnaire du worker
+        store = get_store(get_db)
+        top_channels = store.rows(store.top_by(TOP10_SORTS.get(sort_by, 'rank_desc')))
         
         return render_template(
             'top10.html',
@@ -268,25 +242,29 @@ def top10():
 
 @app.route("/api/channels")
 def api_channels():
-    """API pour récupérer les chaînes en JSON."""
+    """API filtrable des chaînes en JSON (paramètres : voir query_api)."""
     try:
+        try:
+            query, sort, index, limit, skip = build_query(request.args)
+        except QueryError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+        INDEX_MANAGER.ensure(get_db)
         db = get_db()
         collection = db['channels_enriched']
-        
-        # Paramètres
-        limit = request.args.get('limit', 100, type=int)
-        sort_by = request.args.get('sort', 'rank', type=str)
-        order = request.args.get('order', 'asc', type=str)
-        
-        # Valide les paramètres
-        limit = min(limit, 1000)
-        sort_order = 1 if order == 'asc' else -1
-        
-        channels = list(
-            collection.find()
-            .sort(sort_by, sort_order)
+
+        cursor = (
+            collection.find(query)
+            .sort(sort)
+            .skip(skip)
             .limit(limit)
+            .hint(index)
         )
+        index_used = index
+        if request.args.get('debug'):
+            # Index réellement retenu par le planificateur
+            index_used = ','.join(explained_indexes(cursor.clone().explain()))
+        channels = list(cursor)
         
         # Convertit ObjectId
         for ch in channels:
@@ -294,11 +272,13 @@ def api_channels():
             if 'scraped_at' in ch:
                 ch['scraped_at'] = str(ch['scraped_at'])
         
-        return jsonify({
+        response = jsonify({
             'status': 'success',
             'count': len(channels),
             'data': channels
         })
+        response.headers['X-Index-Used'] = index_used
+        return response
         
     except Exception as e:
         return jsonify({
@@ -307,6 +287,205 @@ def api_channels():
         }), 500
 
 
+def _ranks_before(rank, other):
+    """rank passe-t-il avant other ? (None = non classé, en dernier)"""
+    if rank is None:
+        return False
+    return other is None or rank < other
+
+
+@app.route("/api/channels/batch", methods=["POST"])
+def api_channels_batch():
+    """
+    Résout une liste de noms, d'URLs ou de rangs en une seule requête $in.
+
+    Les résultats suivent l'ordre des entrées ; une entrée sans chaîne
+    correspondante est renvoyée avec found=false.
+    """
+    try:
+        try:
+            kind, field, values, keys, index = build_batch_lookup(request.get_json(silent=True))
+        except QueryError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+
+        INDEX_MANAGER.ensure(get_db)
+        db = get_db()
+        collection = db['channels_enriched']
+
+        wanted = list({key for key in keys if key is not None})
+        matches = {}
+        if wanted:
+            cursor = collection.find({field: {'$in': wanted}}).hint(index)
+            for ch in cursor:
+                # Plusieurs chaînes pour une clé : la mieux classée l'emporte,
+                # une chaîne sans rang passe après les chaînes classées
+                key = ch.get(field)
+                known = matches.get(key)
+                if known is not None and not _ranks_before(ch.get('rank'), known.get('rank')):
+                    continue
+                ch['_id'] = str(ch['_id'])
+                if 'scraped_at' in ch:
+                    ch['scraped_at'] = str(ch['scraped_at'])
+                matches[key] = ch
+
+        data = []
+        for value, key in zip(values, keys):
+            channel = matches.get(key)
+            if channel is None:
+                data.append({'input': value, 'found': False})
+            else:
+                data.append({'input': value, 'found': True, 'channel': channel})
+
+        return jsonify({
+            'status': 'success',
+            'by': kind,
+            'count': len(data),
+            'found': sum(1 for item in data if item['found']),
+            'data': data
+        })
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+HISTORY_METRICS = ('subscribers', 'total_views', 'videos', 'rank')
+
+
+def find_channel(collection, channel_id):
+    """Retrouve une chaîne par ObjectId ou par identifiant VidIQ (fin de channel_url)."""
+    if ObjectId.is_valid(channel_id):
+        channel = collection.find_one({'_id': ObjectId(channel_id)})
+        if channel:
+            return channel
+    suffix = f"/{re.escape(channel_id.strip('/'))}/?$"
+    return collection.find_one({'channel_url': {'$regex': suffix}})
+
+
+def history_bin(start, end, points):
+    """Choisit l'unité / la taille de bucket $dateTrunc pour ~`points` points."""
+    seconds = max((end - start).total_seconds() / max(points, 1), 60)
+    for unit, unit_seconds in (('day', 86400), ('hour', 3600), ('minute', 60)):
+        if seconds >= unit_seconds:
+            return unit, math.ceil(seconds / unit_seconds)
+    return 'minute', 1
+
+
+@app.route("/api/channels/<channel_id>/history")
+def api_channel_history(channel_id):
+    """Historique d'une chaîne, sous-échantillonné côté serveur."""
+    try:
+        db = get_db()
+        channel = find_channel(db['channels_enriched'], channel_id)
+        if not channel:
+            return jsonify({'status': 'error', 'message': 'Chaîne introuvable'}), 404
+
+        end = datetime.utcnow()
+        days = request.args.get('days', 90, type=int)
+        points = min(request.args.get('points', 200, type=int), 2000)
+        start = end - timedelta(days=days)
+        unit, bin_size = history_bin(start, end, points)
+
+        pipeline = [
+            {'$match': {
+                'channel_url': channel['channel_url'],
+                'ts': {'$gte': start, '$lte': end},
+            }},
+            {'$sort': {'ts': 1}},
+            {'$group': {
+                '_id': {'$dateTrunc': {'date': '$ts', 'unit': unit, 'binSize': bin_size}},
+                **{metric: {'$last': f'${metric}'} for metric in HISTORY_METRICS},
+            }},
+            {'$sort': {'_id': 1}},
+        ]
+        series = [
+            {'ts': point.pop('_id').isoformat(), **point}
+            for point in db['channel_metrics'].aggregate(pipeline)
+        ]
+
+        return jsonify({
+            'status': 'success',
+            'channel_url': channel['channel_url'],
+            'channel_name': channel.get('channel_name'),
+            'bucket': f'{bin_size} {unit}',
+            'count': len(series),
+            'data': series,
+        })
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@app.route("/api/growth")
+def api_growth():
+    """Classement par croissance d'une métrique sur une fenêtre (agrégation Mongo)."""
+    try:
+        metric = request.args.get('metric', 'subscribers', type=str)
+        if metric not in ('subscribers', 'total_views', 'videos'):
+            return jsonify({'status': 'error', 'message': f'Métrique invalide : {metric}'}), 400
+        days = request.args.get('days', 30, type=int)
+        limit = min(request.args.get('limit', 20, type=int), 1000)
+
+        db = get_db()
+        since = datetime.utcnow() - timedelta(days=days)
+        pipeline = [
+            {'$match': {'ts': {'$gte': since}, metric: {'$gt': 0}}},
+            {'$sort': {'channel_url': 1, 'ts': 1}},
+            {'$group': {
+                '_id': '$channel_url',
+                'first': {'$first': f'${metric}'},
+                'last': {'$last': f'${metric}'},
+                'first_ts': {'$first': '$ts'},
+                'last_ts': {'$last': '$ts'},
+            }},
+            {'$match': {'$expr': {'$gt': ['$last_ts', '$first_ts']}}},
+            {'$project': {
+                'first': 1,
+                'last': 1,
+                'delta': {'$subtract': ['$last', '$first']},
+                'growth_rate': {'$divide': [{'$subtract': ['$last', '$first']}, '$first']},
+                'per_day': {'$divide': [
+                    {'$subtract': ['$last', '$first']},
+                    {'$divide': [{'$subtract': ['$last_ts', '$first_ts']}, 86400000]},
+                ]},
+            }},
+            {'$sort': {'growth_rate': -1}},
+            {'$limit': limit},
+        ]
+        ranking = list(db['channel_metrics'].aggregate(pipeline, allowDiskUse=True))
+
+        names = {
+            ch['channel_url']: ch.get('channel_name')
+            for ch in db['channels_enriched'].find(
+                {'channel_url': {'$in': [r['_id'] for r in ranking]}},
+                {'channel_url': 1, 'channel_name': 1},
+            )
+        }
+        data = []
+        for r in ranking:
+            channel_url = r.pop('_id')
+            data.append({'channel_url': channel_url, 'channel_name': names.get(channel_url), **r})
+
+        return jsonify({
+            'status': 'success',
+            'metric': metric,
+            'days': days,
+            'count': len(data),
+            'data': data,
+        })
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
 @app.route("/health")
 def health():
     """Vérify que l'app et MongoDB sont fonctionnels."""
@@ -331,42 +510,16 @@ def health():
 def chaines_sous_cotees():
     """Chaînes sous-cotées et chaînes sous-cotées."""
     try:
-        db = get_db()
-        collection = db['channels_enriched']
-
-        channels = list(collection.find())
-        channels = add_derived_metrics(channels)
+        store = get_store(get_db)
 
         # Statistiques globales
-        subscribers_list = [c.get("subscribers", 0) for c in channels]
-        views_list = [c.get("total_views", 0) for c in channels]
-        videos_list = [c.get("videos", 0) for c in channels]
-
-        stats = {
-            "avg_subscribers": int(statistics.mean(subscribers_list)) if subscribers_list else 0,
-            "median_subscribers": int(statistics.median(subscribers_list)) if subscribers_list else 0,
-            "avg_views": int(statistics.mean(views_list)) if views_list else 0,
-            "median_views": int(statistics.median(views_list)) if views_list else 0,
-            "avg_videos": int(statistics.mean(videos_list)) if videos_list else 0,
-        }
+        stats = store.summary_stats()
 
         # Chaînes sous-cotées : ratio vues/abonnés élevé
-        underrated = sorted(
-            channels,
-            key=lambda c: c.get("views_per_subscriber", 0),
-            reverse=True
-        )[:10]
+        underrated = store.rows(store.top_by("views_per_subscriber"))
 
         # Top par vues/vidéo
-        top_views_per_video = sorted(
-            channels,
-            key=lambda c: c.get("views_per_video", 0),
-            reverse=True
-        )[:10]
-
-        # Convertit ObjectId en string
-        for ch in underrated + top_views_per_video:
-            ch['_id'] = str(ch['_id'])
+        top_views_per_video = store.rows(store.top_by("views_per_video"))
 
         return render_template(
             'chaines_sous_cotees.html',
@@ -382,16 +535,9 @@ def chaines_sous_cotees():
 @app.route("/quiz")
 def quiz():
     try:
-        db = get_db()
-        collection = db['channels_enriched']
-        channels = list(collection.find())
-        subscribers = [c.get("subscribers", 0) for c in channels]
-        views = [c.get("total_views", 0) for c in channels]
+        store = get_store(get_db)
         # Corrélation
-        if subscribers and views and len(subscribers) > 1 and len(views) > 1 and sum(subscribers) > 0 and sum(views) > 0:
-            correlation = round(statistics.correlation(subscribers, views), 3)
-        else:
-            correlation = 0
+        correlation = store.correlation("subscribers", "total_views")
         # Chaînes sous-cotées
         interpretation = f"La corrélation entre abonnés et vues est de {correlation}. Cela montre une relation modérée entre la popularité et l'audience."
         return render_template(
@@ -0,0 +1,313 @@
+"""
+Pré-rendu des pages qui ne changent qu'à la fin d'un scraping : accueil,
+top 10 (chaque tri), chaînes sous-cotées, quiz et les premières pages de
+/channels.
+
+Chaque rendu passe par les routes Flask (test_client) et s'écrit dans un
+dossier versionné, avec sa variante gzip et un manifest.json :
+
+    prerendered/
+        current -> 20260101T120000-3f2a9c1e7b44    (lien symbolique)
+        20260101T120000-3f2a9c1e7b44/
+            manifest.json
+            index.html  index.html.gz  top10-sort_by-salary.html  ...
+
+Le lien `current` est remplacé atomiquement (os.replace) une fois le
+dossier complet ; les workers web (PRERENDERED, hook before_request de
+main.py) rechargent le manifest quand sa cible change et servent ces
+pages depuis la mémoire, sans Jinja. Tant que la version des données
+(meta.data_version, relue au plus toutes les VERSION_CHECK_SECONDS)
+diffère de celle du manifest, les pages repassent par le rendu
+dynamique : un pré-rendu manqué ou en échec ne sert jamais de pages
+périmées au-delà de ce délai.
+
+    python prerender.py                      # depuis app/
+    python prerender.py --channel-pages 20 --force
+"""
+
+import os
+import re
+import sys
+import json
+import gzip
+import time
+import fcntl
+import shutil
+import argparse
+import threading
+from urllib.parse import urlencode
+
+
+PRERENDER_DIR = os.getenv(
+    "PRERENDER_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "prerendered")
+)
+CHANNEL_PAGES = int(os.getenv("PRERENDER_CHANNEL_PAGES", "10"))
+KEEP_VERSIONS = 3
+CHECK_SECONDS = 1.0
+VERSION_CHECK_SECONDS = float(os.getenv("PRERENDER_VERSION_CHECK_SECONDS", "5"))
+CURRENT = "current"
+
+
+def page_key(path, args=()):
+    """Clé d'une page : chemin + paramètres triés ('/top10?sort_by=salary')."""
+    args = sorted(args)
+    return f"{path}?{urlencode(args)}" if args else path
+
+
+def _file_name(key):
+    """'/top10?sort_by=salary' -> 'top10-sort_by-salary.html'"""
+    name = re.sub(r"[^A-Za-z0-9_.]+", "-", key).strip("-")
+    return f"{name or 'index'}.html"
+
+
+# ----------------------------------------------------------------------
+# Service (workers web)
+# ----------------------------------------------------------------------
+
+class PrerenderedPages:
+    """Pages de la version `current`, gardées en mémoire par le worker."""
+
+    def __init__(self, root=PRERENDER_DIR, check_every=CHECK_SECONDS,
+                 version_check_every=VERSION_CHECK_SECONDS):
+        self.root = root
+        self.check_every = check_every
+        self.version_check_every = version_check_every
+        self.version = None
+        self.data_version = None
+        self.pages = {}
+        self.fresh = False
+        self._target = None
+        self._live_version = None
+        self._next_check = 0.0
+        self._next_version_check = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, get_db):
+        """
+        Recharge le manifest si le lien `current` pointe ailleurs, et
+        compare sa version des données à meta.data_version.
+
+        Args:
+            get_db: Fabrique de connexion, appelée seulement pour relire la version
+        """
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_every
+            try:
+                target = os.readlink(os.path.join(self.root, CURRENT))
+            except OSError:
+                target = None
+            if target != self._target:
+                self._target = target
+                self.version, self.data_version, self.pages = (
+                    self._load(target) if target else (None, None, {})
+                )
+
+            if now >= self._next_version_check:
+                self._next_version_check = now + self.version_check_every
+                try:
+                    meta = get_db()["meta"].find_one({"_id": "data_version"}) or {}
+                    self._live_version = meta.get("version")
+                except Exception as e:
+                    # Mongo indisponible : dernière version connue
+                    print(f"[Prerender] Version des données illisible : {e}")
+            fresh = bool(self.pages) and self.data_version == self._live_version
+            if self.pages and fresh != self.fresh:
+                print(f"[Prerender] Version {self.version} "
+                      f"{'servie' if fresh else 'périmée, rendu dynamique'}")
+            self.fresh = fresh
+
+    def _load(self, target):
+        folder = os.path.join(self.root, target)
+        try:
+            with open(os.path.join(folder, "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+            pages = {}
+            files = {}
+            for key, name in manifest["pages"].items():
+                if name not in files:
+                    with open(os.path.join(folder, name), "rb") as f:
+                        html = f.read()
+                    with open(os.path.join(folder, name + ".gz"), "rb") as f:
+                        files[name] = (f'"{target}/{name}"', html, f.read())
+                pages[key] = files[name]
+        except (OSError, ValueError, KeyError) as e:
+            # Version supprimée entre-temps ou incomplète : rendu dynamique
+            print(f"[Prerender] Version {target} illisible : {e}")
+            return None, None, {}
+        print(f"[Prerender] Version {target} chargée ({len(files)} pages)")
+        return target, manifest.get("data_version"), pages
+
+    def response(self, request, get_db):
+        """Réponse Flask pour la page demandée, ou None pour le rendu dynamique."""
+        if request.method not in ("GET", "HEAD"):
+            return None
+        self.refresh(get_db)
+        if not self.fresh:
+            return None
+        args = list(request.args.items(multi=True))
+        if len(args) != len(request.args):
+            return None
+        page = self.pages.get(page_key(request.path, args))
+        if page is None:
+            return None
+
+        # Import local : ce module est aussi lancé seul, hors contexte Flask
+        from flask import Response
+        etag, html, compressed = page
+        headers = {"ETag": etag, "Vary": "Accept-Encoding", "X-Prerendered": self.version}
+        # Comparaison faible (RFC 9110) : gère *, W/"..." et les listes de tags
+        if request.if_none_match.contains_weak(etag[1:-1]):
+            return Response(status=304, headers=headers)
+        if request.accept_encodings["gzip"]:
+            headers["Content-Encoding"] = "gzip"
+            body = compressed
+        else:
+            body = html
+        return Response(body, mimetype="text/html", headers=headers)
+
+
+PRERENDERED = PrerenderedPages()
+
+
+# ----------------------------------------------------------------------
+# Rendu
+# ----------------------------------------------------------------------
+
+def _current_version(root):
+    try:
+        with open(os.path.join(root, CURRENT, "manifest.json"), encoding="utf-8") as f:
+            return json.load(f).get("data_version")
+    except (OSError, ValueError):
+        return None
+
+
+def _pages(main, db, channel_pages):
+    """(clés servies, chemin, paramètres) des pages à rendre."""
+    pages = [(["/"], "/", {})]
+    pages.append((["/top10"], "/top10", {}))
+    for sort_by in main.TOP10_SORTS:
+        pages.append(([page_key("/top10", [("sort_by", sort_by)])], "/top10", {"sort_by": sort_by}))
+    pages.append((["/chaines_sous_cotees"], "/chaines_sous_cotees", {}))
+    pages.append((["/quiz"], "/quiz", {}))
+
+    total = db["channels_enriched"].count_documents({})
+    total_pages = (total + main.CHANNELS_PER_PAGE - 1) // main.CHANNELS_PER_PAGE
+    for page in range(1, min(channel_pages, total_pages) + 1):
+        keys = [page_key("/channels", [("page", str(page))])]
+        if page == 1:
+            keys.append("/channels")
+        pages.append((keys, "/channels", {"page": page}))
+    return pages
+
+
+def _prune(root, keep):
+    """Supprime les anciennes versions (et les rendus interrompus)."""
+    current = os.readlink(os.path.join(root, CURRENT))
+    versions = sorted(
+        name for name in os.listdir(root)
+        if os.path.isdir(os.path.join(root, name)) and not os.path.islink(os.path.join(root, name))
+    )
+    for name in versions:
+        if name == current or (not name.startswith(".") and name in versions[-keep:]):
+            continue
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def prerender(root=PRERENDER_DIR, channel_pages=CHANNEL_PAGES, force=False, keep=KEEP_VERSIONS):
+    """
+    Rend les pages dans une nouvelle version et bascule `current` dessus.
+
+    Returns:
+        Nom de la version servie, None si rien n'a été rendu
+    """
+    os.makedirs(root, exist_ok=True)
+    # Un seul rendu à la fois ; les déclenchements concurrents attendent
+    # puis voient la version déjà à jour
+    with open(os.path.join(root, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        # Import local : main.py importe PRERENDERED depuis ce module
+        from flask import template_rendered
+        import main
+
+        db = main.get_db()
+        meta = db["meta"].find_one({"_id": "data_version"}) or {}
+        data_version = meta.get("version")
+        if not force and data_version and data_version == _current_version(root):
+            print(f"[Prerender] Déjà à jour (version {data_version})")
+            return None
+
+        start = time.perf_counter()
+        stamp = re.sub(r"\W", "", data_version or "")[:12] or "unversioned"
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{stamp}"
+        tmp = os.path.join(root, f".tmp-{name}")
+        os.makedirs(tmp)
+
+        rendered = []
+
+        def record(sender, template, context, **extra):
+            rendered.append(template.name)
+
+        # Rendu par les routes elles-mêmes, pas par le hook qui sert ces pages
+        serve = main.app.config.get("SERVE_PRERENDERED", True)
+        main.app.config["SERVE_PRERENDERED"] = False
+        client = main.app.test_client()
+        manifest = {"data_version": data_version, "rendered_at": time.time(), "pages": {}}
+        try:
+            for keys, path, params in _pages(main, db, channel_pages):
+                del rendered[:]
+                with template_rendered.connected_to(record, main.app):
+                    response = client.get(path, query_string=params)
+                # Les routes rendent error.html (statut 200) quand Mongo échoue
+                if response.status_code != 200 or "error.html" in rendered:
+                    raise RuntimeError(f"{page_key(path, params.items())} : rendu en erreur")
+                html = response.get_data()
+                file_name = _file_name(keys[0])
+                with open(os.path.join(tmp, file_name), "wb") as f:
+                    f.write(html)
+                with open(os.path.join(tmp, file_name + ".gz"), "wb") as f:
+                    f.write(gzip.compress(html, compresslevel=9))
+                for key in keys:
+                    manifest["pages"][key] = file_name
+            with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        finally:
+            main.app.config["SERVE_PRERENDERED"] = serve
+
+        # Bascule atomique : le lien est remplacé, jamais absent
+        os.rename(tmp, os.path.join(root, name))
+        link = os.path.join(root, f".{CURRENT}-{os.getpid()}")
+        os.symlink(name, link)
+        os.replace(link, os.path.join(root, CURRENT))
+        _prune(root, keep)
+        print(f"[Prerender] {len(manifest['pages'])} pages rendues en "
+              f"{time.perf_counter() - start:.1f}s → {name}")
+        return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-rendu statique des pages de l'application")
+    parser.add_argument("--root", default=PRERENDER_DIR, help="Dossier des versions pré-rendues")
+    parser.add_argument("--channel-pages", type=int, default=CHANNEL_PAGES,
+                        help="Pages de /channels pré-rendues")
+    parser.add_argument("--force", action="store_true", help="Rendre même si la version est à jour")
+    args = parser.parse_args()
+
+    try:
+        prerender(args.root, args.channel_pages, args.force)
+    except Exception as e:
+        print(f"[Prerender] Échec, version précédente conservée : {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
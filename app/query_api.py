@@ -0,0 +1,314 @@
+"""
+Requêtes filtrées de /api/channels et recherche groupée de
+/api/channels/batch.
+
+Les paramètres sont validés puis traduits en filtre et tri Mongo, servis
+par un index de l'ensemble géré QUERY_INDEXES (forcé avec hint) : soit
+un index dont le premier champ est borné des deux côtés (ou filtré par
+préfixe), soit un index qui rend la première clé de tri dans l'ordre.
+Une forme de requête qu'aucun de ces index ne sert est refusée.
+
+    /api/channels?min_subscribers=1000000&max_views_per_video=50000
+    /api/channels?name_prefix=mr&sort=-subscribers,rank&limit=50
+
+Paramètres :
+- min_<champ> / max_<champ> : bornes incluses, pour rank, subscribers,
+  views, videos, earnings (borne basse des revenus mensuels estimés),
+  views_per_subscriber, views_per_video, subs_per_video
+- name_prefix : début du nom (casse et espaces ignorés)
+- sort : clés séparées par des virgules, '-' pour un ordre décroissant
+  (order=desc s'applique encore à la première clé, pour compatibilité)
+- limit (1000 max), skip (10000 max)
+
+/api/channels/batch (POST, JSON) : une seule des clés names, urls ou
+ranks, avec au plus MAX_BATCH valeurs, résolues en une requête $in sur
+la clé normalisée indexée (name_key, url_key ou rank).
+"""
+
+import re
+import math
+import time
+import threading
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from search_keys import normalize_name, normalize_url
+
+
+# Nom du paramètre -> champ stocké (les champs dérivés sont calculés à
+# l'écriture par scrapers.vidiq_enrich.derived_fields)
+FIELDS = {
+    "rank": "rank",
+    "subscribers": "subscribers",
+    "views": "total_views",
+    "videos": "videos",
+    "earnings": "earnings_monthly_low",
+    "views_per_subscriber": "views_per_subscriber",
+    "views_per_video": "views_per_video",
+    "subs_per_video": "subs_per_video",
+    "name": "name_key",
+}
+RANGE_PARAMS = [param for param in FIELDS if param != "name"]
+# Anciens noms acceptés par ?sort=
+SORT_ALIASES = {"total_views": "views", "channel_name": "name"}
+
+MAX_LIMIT = 1000
+MAX_SKIP = 10_000
+
+QUERY_INDEXES = [
+    IndexModel([("rank", ASCENDING)], name="rank"),
+    IndexModel([("subscribers", DESCENDING)], name="subscribers"),
+    IndexModel([("total_views", DESCENDING)], name="total_views"),
+    IndexModel([("videos", DESCENDING)], name="videos"),
+    IndexModel([("subscribers", DESCENDING), ("total_views", DESCENDING)],
+               name="subscribers_total_views"),
+    IndexModel([("earnings_monthly_low", DESCENDING), ("rank", ASCENDING)], name="earnings_rank"),
+    IndexModel([("views_per_subscriber", DESCENDING), ("rank", ASCENDING)],
+               name="views_per_subscriber_rank"),
+    IndexModel([("views_per_video", DESCENDING), ("rank", ASCENDING)], name="views_per_video_rank"),
+    IndexModel([("subs_per_video", DESCENDING), ("rank", ASCENDING)], name="subs_per_video_rank"),
+    IndexModel([("name_key", ASCENDING), ("rank", ASCENDING)], name="name_key_rank"),
+    IndexModel([("url_key", ASCENDING), ("rank", ASCENDING)], name="url_key_rank"),
+]
+INDEX_KEYS = [(index.document["name"], list(index.document["key"].items())) for index in QUERY_INDEXES]
+
+INDEX_CHECK_SECONDS = 60
+
+MAX_BATCH = 5000
+
+
+class QueryError(ValueError):
+    """Paramètre invalide ou forme de requête non indexée (réponse 400)."""
+
+
+def _rank_key(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        rank = int(value)
+    except (TypeError, ValueError, OverflowError):
+        # OverflowError : Infinity, accepté par le JSON de Flask
+        return None
+    return rank if rank == float(value) else None
+
+
+# Clé du corps -> (champ indexé, normalisation, index)
+BATCH_KEYS = {
+    "names": ("name_key", normalize_name, "name_key_rank"),
+    "urls": ("url_key", normalize_url, "url_key_rank"),
+    "ranks": ("rank", _rank_key, "rank"),
+}
+
+
+def build_batch_lookup(body):
+    """
+    Valide le corps de /api/channels/batch.
+
+    Returns:
+        (type de clé, champ, valeurs d'entrée, clés normalisées, index)
+    """
+    if not isinstance(body, dict):
+        raise QueryError("Corps JSON attendu : {\"names\": [...]} , {\"urls\": [...]} ou {\"ranks\": [...]}")
+    kinds = [kind for kind in BATCH_KEYS if kind in body]
+    if len(kinds) != 1 or set(body) - set(BATCH_KEYS):
+        raise QueryError(f"Une seule clé parmi : {', '.join(BATCH_KEYS)}")
+    kind = kinds[0]
+    values = body[kind]
+    if not isinstance(values, list):
+        raise QueryError(f"{kind} doit être une liste")
+    if len(values) > MAX_BATCH:
+        raise QueryError(f"{len(values)} valeurs, {MAX_BATCH} maximum par requête")
+
+    field, normalize, index = BATCH_KEYS[kind]
+    keys = [normalize(value) if isinstance(value, (str, int, float)) else None for value in values]
+    return kind, field, values, keys, index
+
+
+def _number(args, key):
+    value = args.get(key)
+    if value is None or value == "":
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise QueryError(f"{key} doit être un nombre : {value!r}")
+    if not math.isfinite(number):
+        raise QueryError(f"{key} doit être un nombre fini : {value!r}")
+    return number
+
+
+def _int_arg(args, key, default, maximum):
+    value = args.get(key, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise QueryError(f"{key} doit être un entier : {value!r}")
+    if value < 0:
+        raise QueryError(f"{key} doit être positif")
+    return min(value, maximum)
+
+
+def parse_sort(args):
+    """'-subscribers,rank' -> [('subscribers', -1), ('rank', 1)]"""
+    raw = args.get("sort") or "rank"
+    sort = []
+    for part in raw.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        direction = DESCENDING if part.startswith("-") else ASCENDING
+        param = SORT_ALIASES.get(part.lstrip("-+"), part.lstrip("-+"))
+        if param not in FIELDS:
+            raise QueryError(f"Tri invalide : {part!r} (possibles : {', '.join(FIELDS)})")
+        field = FIELDS[param]
+        if any(field == f for f, _ in sort):
+            raise QueryError(f"Clé de tri répétée : {param}")
+        sort.append((field, direction))
+    if not sort:
+        raise QueryError("sort vide")
+
+    # Compatibilité : ?sort=subscribers&order=desc
+    order = args.get("order")
+    if order in ("asc", "desc") and not raw.lstrip().startswith(("-", "+")):
+        sort[0] = (sort[0][0], ASCENDING if order == "asc" else DESCENDING)
+    elif order not in (None, "asc", "desc"):
+        raise QueryError(f"order invalide : {order!r}")
+    return sort
+
+
+def parse_filter(args):
+    query = {}
+    for param in RANGE_PARAMS:
+        low = _number(args, f"min_{param}")
+        high = _number(args, f"max_{param}")
+        if low is None and high is None:
+            continue
+        if low is not None and high is not None and low > high:
+            raise QueryError(f"min_{param} > max_{param}")
+        bounds = {}
+        if low is not None:
+            bounds["$gte"] = low
+        if high is not None:
+            bounds["$lte"] = high
+        query[FIELDS[param]] = bounds
+
+    prefix = normalize_name(args.get("name_prefix"))
+    if prefix:
+        # Préfixe ancré, sensible à la casse : bornes d'index sur name_key
+        query["name_key"] = {"$regex": f"^{re.escape(prefix)}"}
+
+    unknown = [
+        key for key in args
+        if key not in ("sort", "order", "limit", "skip", "name_prefix", "debug")
+        and not re.fullmatch(r"(min|max)_(%s)" % "|".join(RANGE_PARAMS), key)
+    ]
+    if unknown:
+        raise QueryError(f"Paramètres inconnus : {', '.join(sorted(unknown))}")
+    return query
+
+
+def _provides_sort(keys, sort):
+    """L'index rend-il les documents dans l'ordre demandé (ou l'inverse exact) ?"""
+    if len(sort) > len(keys):
+        return False
+    prefix = keys[:len(sort)]
+    same = all(k == s for k, s in zip(prefix, sort))
+    reverse = all(k[0] == s[0] and k[1] == -s[1] for k, s in zip(prefix, sort))
+    return same or reverse
+
+
+def _selective(condition):
+    """Filtre borné des deux côtés (intervalle ou préfixe de nom) ?"""
+    return "$regex" in condition or ("$gte" in condition and "$lte" in condition)
+
+
+def choose_index(query, sort):
+    """
+    Index géré servant la requête : son premier champ doit être filtré
+    par un intervalle borné des deux côtés ou un préfixe (parcours d'une
+    plage), ou être la première clé de tri (parcours dans l'ordre, arrêté
+    par limit, le filtre éventuel appliqué au passage). Un filtre ouvert
+    d'un côté sur un autre champ que le tri ne suffit pas : il parcourrait
+    presque tout l'index puis trierait en mémoire. Sinon QueryError.
+    """
+    best, best_score = None, -1
+    for name, keys in INDEX_KEYS:
+        lead = keys[0][0]
+        if lead in query and _selective(query[lead]):
+            # Le préfixe de nom est le filtre le plus sélectif
+            score = 3 if lead == "name_key" else 2
+        elif lead == sort[0][0]:
+            score = 1 if lead in query else 0
+        else:
+            continue
+        if _provides_sort(keys, sort):
+            score += 1
+        if score > best_score:
+            best, best_score = name, score
+    if best is None:
+        leads = sorted({keys[0][0] for _, keys in INDEX_KEYS})
+        raise QueryError(
+            "Requête non indexée (parcours complet) : borner des deux côtés, ou "
+            f"trier d'abord sur, l'un de {', '.join(leads)}"
+        )
+    return best
+
+
+def build_query(args):
+    """
+    Returns:
+        (filtre, tri, nom de l'index, limit, skip)
+    """
+    query = parse_filter(args)
+    sort = parse_sort(args)
+    index = choose_index(query, sort)
+    limit = _int_arg(args, "limit", 100, MAX_LIMIT)
+    skip = _int_arg(args, "skip", 0, MAX_SKIP)
+    return query, sort, index, limit, skip
+
+
+def explained_indexes(explain):
+    """Noms des index présents dans le plan gagnant d'un explain()."""
+    names = []
+
+    def walk(stage):
+        if isinstance(stage, dict):
+            if stage.get("indexName"):
+                names.append(stage["indexName"])
+            for value in stage.values():
+                walk(value)
+        elif isinstance(stage, list):
+            for value in stage:
+                walk(value)
+
+    walk(explain.get("queryPlanner", {}).get("winningPlan", {}))
+    return names or ["COLLSCAN"]
+
+
+class IndexManager:
+    """Crée les index gérés, et les recrée quand la version des données change."""
+
+    def __init__(self, check_every=INDEX_CHECK_SECONDS):
+        self.check_every = check_every
+        self._version = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def ensure(self, get_db):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            db = get_db()
+            meta = db["meta"].find_one({"_id": "data_version"}) or {}
+            version = meta.get("version") or "unversioned"
+            # Un bootstrap remplace la collection : nouvelle version, index à recréer
+            if version != self._version:
+                db["channels_enriched"].create_indexes(QUERY_INDEXES)
+                self._version = version
+            self._next_check = time.monotonic() + self.check_every
+
+
+INDEX_MANAGER = IndexManager()
@@ -0,0 +1,32 @@
+"""
+Clés de recherche normalisées (name_key, url_key) des chaînes.
+
+Calculées à l'écriture par scrapers.vidiq_enrich (derived_fields) et à la
+lecture par query_api pour interroger les mêmes index : une seule
+définition, importée à plat par l'app web (app/ n'est pas un paquet) et
+par `app.search_keys` côté scrapers.
+"""
+
+import re
+import unicodedata
+from typing import Optional
+
+
+def normalize_name(name) -> Optional[str]:
+    """Clé de recherche d'un nom : NFKC, casse repliée, espaces réduits."""
+    if not name:
+        return None
+    return " ".join(unicodedata.normalize("NFKC", str(name)).casefold().split())
+
+
+def normalize_url(url) -> Optional[str]:
+    """Clé de recherche d'une URL : sans schéma, www, paramètres ni / final ; hôte en minuscules."""
+    if not url:
+        return None
+    url = str(url).strip().split("#", 1)[0].split("?", 1)[0]
+    url = re.sub(r"^[a-z][a-z0-9+.-]*://", "", url, flags=re.IGNORECASE)
+    host, _, path = url.partition("/")
+    host = host.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"{host}/{path}".rstrip("/")
@@ -0,0 +1,344 @@
+"""
+Benchmark des fonctions appelées par chaîne ou par requête, de 1e2 à
+1e6 entrées, comparé à des références enregistrées (sans Mongo ni
+navigateur).
+
+    python benchmarks/bench_functions.py                    # compare aux références
+    python benchmarks/bench_functions.py --save             # enregistre les références
+    python benchmarks/bench_functions.py --only gini_index --max-size 10000
+
+Pour limiter le bruit :
+- chaque cas est exécuté une fois à vide, puis mesuré --rounds fois ;
+  la médiane est ramenée à une entrée (ns / entrée) ;
+- chaque tour chronomètre aussi une boucle de référence en pur Python,
+  juste avant le cas : le ratio cas / référence (médiane des tours) ne
+  dépend plus de la vitesse de la machine au moment de la mesure ;
+- la décision porte sur chaque fonction : moyenne géométrique des ratios
+  normalisés sur les tailles >= GATE_MIN_SIZE (les cas de 1e2 entrées,
+  sous la milliseconde, sont affichés mais pas jugés).
+
+Les références (baselines/functions.json) ne contiennent que ces ratios
+à la boucle de référence, sans temps absolus : elles restent valables
+d'une machine à l'autre, pas d'une version de Python à l'autre (signalé).
+
+Le script sort en erreur (code 1) si une fonction dépasse sa référence
+de plus de --threshold. --calibrate N relance la mesure N fois sur le
+code courant et affiche l'écart maximal observé, à partir duquel le
+seuil par défaut a été choisi.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import statistics
+import random
+import timeit
+import argparse
+import platform
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+# app/ n'est pas un paquet : main.py importe channel_store et query_api à plat
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from scrapers.vidiq_enrich import _to_int, extract_labeled_value, LABELS_MONTHLY
+from scrapers.vidiq_playwright_parser import VidIQPlaywrightParser
+from channel_store import extract_salary
+from main import add_derived_metrics, gini_index, lorenz_curve, humanize_metric
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "functions.json")
+# Résultats enregistrés : ratio à la boucle de référence par cas
+BASELINE_FORMAT = "ratio"
+SIZES = (100, 1_000, 10_000, 100_000, 1_000_000)
+GATE_MIN_SIZE = 1_000
+# Écart max mesuré entre exécutions identiques (--calibrate 3, 1 CPU
+# partagé) : 16 % (extract_salary), 13 % au plus pour les autres
+# fonctions ; seuil fixé à un peu plus du double
+DEFAULT_THRESHOLD = 0.35
+
+
+# ----------------------------------------------------------------------
+# Entrées synthétiques (graine fixe)
+# ----------------------------------------------------------------------
+
+def formatted_numbers(n, rng):
+    samples = []
+    for _ in range(n):
+        value = rng.uniform(1, 999)
+        samples.append(rng.choice([
+            f"{value:.1f}K", f"{value:.1f}M", f"{value:.2f}B",
+            f"{int(value * 1000):,}", f"{int(value)}", "N/A",
+        ]))
+    return samples
+
+
+def raw_values(n, rng):
+    return [rng.choice([
+        rng.randint(0, 10**9), f"{rng.randint(0, 10**9):,}", f"{rng.uniform(0, 1e6):.1f}",
+        "", None, "n/a",
+    ]) for _ in range(n)]
+
+
+def page_lines(n, rng):
+    """Page de n lignes, le label cherché vers la fin (parcours quasi complet)."""
+    filler = ["Accueil", "Chaînes", "Vidéos", "Top 100", "Connexion", "Partager", "Voir plus"]
+    lines = [f"{rng.choice(filler)} {rng.randint(0, 10_000)}" for _ in range(n)]
+    pos = max(n - 3, 0)
+    lines[pos:pos + 2] = [LABELS_MONTHLY[0], f"${rng.randint(1, 999)}K - ${rng.randint(1, 9)}M"]
+    return lines[:n]
+
+
+def earnings(n, rng):
+    return [rng.choice([
+        f"${rng.randint(1, 999)}K - ${rng.randint(1, 9)}M",
+        f"${rng.randint(1, 99)}M - ${rng.randint(100, 300)}M",
+        f"${rng.randint(1, 999)} - ${rng.randint(1, 999)}K",
+        "",
+    ]) for _ in range(n)]
+
+
+def channels(n, rng):
+    return [{
+        "subscribers": rng.choice([0, rng.randint(1, 10**8)]),
+        "total_views": rng.randint(0, 10**11),
+        "videos": rng.choice([0, rng.randint(1, 50_000)]),
+    } for _ in range(n)]
+
+
+def metric_values(n, rng):
+    return [int(rng.lognormvariate(13, 2)) for _ in range(n)]
+
+
+# ----------------------------------------------------------------------
+# Cas mesurés : (entrées, fonction qui traite les n entrées, taille max)
+# ----------------------------------------------------------------------
+
+def _each(fn):
+    def run(inputs):
+        for value in inputs:
+            fn(value)
+    return run
+
+
+CASES = {
+    "_parse_number": (formatted_numbers, _each(VidIQPlaywrightParser._parse_number), None),
+    "_to_int": (raw_values, _each(_to_int), None),
+    # Une page de n lignes par appel
+    "extract_labeled_value": (page_lines, lambda lines: extract_labeled_value(lines, LABELS_MONTHLY), None),
+    "extract_salary": (earnings, _each(extract_salary), None),
+    "add_derived_metrics": (channels, add_derived_metrics, None),
+    # Sommes de préfixes recalculées : O(n²), limité à 1e4
+    "gini_index": (metric_values, gini_index, 10_000),
+    "lorenz_curve": (metric_values, lorenz_curve, 10_000),
+    "humanize_metric": (metric_values, _each(humanize_metric), None),
+}
+
+
+def measure(name, n, rounds):
+    """
+    Mesure un cas en alternant avec la boucle de référence.
+
+    Chaque tour chronomètre la référence puis le cas : le ratio des deux
+    est insensible aux variations de vitesse de la machine pendant la
+    mesure. Un appel à vide précède les tours.
+
+    Returns:
+        (médiane en ns / entrée, médiane du ratio cas / référence par entrée)
+    """
+    make_inputs, fn, _ = CASES[name]
+    inputs = make_inputs(n, random.Random(42))
+    case = timeit.Timer(lambda: fn(inputs))
+    fn(inputs)
+    # Nombre de répétitions pour qu'une mesure dure au moins 0.2s
+    number, _ = case.autorange()
+    reference, reference_number = _reference_timer()
+
+    times, ratios = [], []
+    for _ in range(rounds):
+        reference_ns = reference.timeit(reference_number) / reference_number * 1e9 / len(_REFERENCE_INPUTS)
+        case_ns = case.timeit(number) / number * 1e9 / n
+        times.append(case_ns)
+        ratios.append(case_ns / reference_ns)
+    return statistics.median(times), statistics.median(ratios)
+
+
+_REFERENCE_INPUTS = [f"{i},{i * 7}" for i in range(10_000)]
+
+
+def reference_loop():
+    """Boucle de référence : découpage, conversions et dict, comme les fonctions mesurées."""
+    total = {}
+    for text in _REFERENCE_INPUTS:
+        a, b = text.split(",")
+        total[a] = int(a) + float(b)
+    return total
+
+
+_REFERENCE = {}
+
+
+def _reference_timer():
+    """Timer de la référence et nombre de répétitions pour ~0.1s (calculé une fois)."""
+    if not _REFERENCE:
+        timer = timeit.Timer(reference_loop)
+        reference_loop()
+        start = time.perf_counter()
+        reference_loop()
+        _REFERENCE["timer"] = timer
+        _REFERENCE["number"] = max(1, int(0.1 / (time.perf_counter() - start)))
+    return _REFERENCE["timer"], _REFERENCE["number"]
+
+
+def run_suite(names, sizes, max_size, rounds):
+    """
+    Returns:
+        {'fonction@n': (ns / entrée, ratio à la référence)}
+    """
+    results = {}
+    for name in names:
+        cap = CASES[name][2]
+        for n in sizes:
+            if (cap and n > cap) or (max_size and n > max_size):
+                continue
+            results[f"{name}@{n}"] = measure(name, n, rounds)
+    return results
+
+
+def gate_ratios(normalized, base_normalized):
+    """Ratio par fonction : moyenne géométrique sur les tailles jugées."""
+    logs = {}
+    for key, value in normalized.items():
+        name, n = key.rsplit("@", 1)
+        base = base_normalized.get(key)
+        if base and int(n) >= GATE_MIN_SIZE:
+            logs.setdefault(name, []).append(math.log(value / base))
+    return {name: math.exp(sum(values) / len(values)) for name, values in logs.items()}
+
+
+def load_baselines(path):
+    """{'python': version des mesures, 'results': {'fonction@n': ratio à la référence}}"""
+    if not os.path.exists(path):
+        return {"python": None, "results": {}}
+    with open(path, encoding="utf-8") as f:
+        baselines = json.load(f)
+    results = {}
+    for key, value in baselines.get("results", {}).items():
+        # Format précédent : {"ns": ..., "ratio": ...}, seul le ratio est gardé
+        if isinstance(value, dict):
+            value = value.get("ratio")
+        # Sans "format" : des nombres seuls sont des ns, pas des ratios
+        elif baselines.get("format") != BASELINE_FORMAT:
+            value = None
+        if isinstance(value, (int, float)):
+            results[key] = value
+    # Ancien format (ns seuls, sans ratio de référence) : inutilisable, à ré-enregistrer
+    if len(results) != len(baselines.get("results", {})):
+        print(f"⚠ {len(baselines['results']) - len(results)} références à l'ancien format ignorées "
+              f"(relancer avec --save)")
+    python = baselines.get("python") or (baselines.get("machine") or {}).get("python")
+    return {"python": python, "results": results}
+
+
+def calibrate(names, sizes, max_size, rounds, runs):
+    """Relance la suite `runs` fois et affiche l'écart max de chaque fonction à la première."""
+    first = None
+    worst = {}
+    for i in range(runs):
+        results = run_suite(names, sizes, max_size, rounds)
+        normalized = {key: ratio for key, (_, ratio) in results.items()}
+        print(f"[Bench] Exécution {i + 1}/{runs} terminée")
+        if first is None:
+            first = normalized
+            continue
+        for name, ratio in gate_ratios(normalized, first).items():
+            worst[name] = max(worst.get(name, 0.0), abs(ratio - 1))
+    print(f"\n{'fonction':<24}{'écart max':>10}")
+    for name, deviation in worst.items():
+        print(f"{name:<24}{deviation:>10.1%}")
+    if worst:
+        print(f"\n[Bench] Écart max toutes fonctions : {max(worst.values()):.1%}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des fonctions par chaîne / par requête")
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="Fonctions mesurées")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES), help="Tailles d'entrée")
+    parser.add_argument("--max-size", type=int, help="Ignore les tailles supérieures")
+    parser.add_argument("--rounds", type=int, default=7, help="Mesures par cas (médiane retenue)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Ralentissement toléré par fonction (0.35 = +35%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Fichier des références")
+    parser.add_argument("--save", action="store_true", help="Enregistre les mesures comme références")
+    parser.add_argument("--calibrate", type=int, default=0, metavar="N",
+                        help="Mesure N fois le code courant et affiche la variance observée")
+    args = parser.parse_args()
+    names = args.only or list(CASES)
+
+    if args.calibrate:
+        return calibrate(names, args.sizes, args.max_size, args.rounds, args.calibrate)
+
+    baselines = load_baselines(args.baseline)
+    if baselines["python"] and baselines["python"] != platform.python_version() and not args.save:
+        print(f"⚠ Références mesurées avec Python {baselines['python']} "
+              f"(actuel : {platform.python_version()})")
+
+    results = run_suite(names, args.sizes, args.max_size, args.rounds)
+    normalized = {key: ratio for key, (_, ratio) in results.items()}
+    reference = baselines["results"]
+
+    print(f"{'fonction':<24}{'n':>10}{'actuel (ns)':>14}{'réf. (ratio)':>14}{'actuel (ratio)':>16}"
+          f"{'ratio norm.':>13}")
+    for key, (current, ratio) in results.items():
+        name, n = key.rsplit("@", 1)
+        base = reference.get(key)
+        base_text = f"{base:.3f}" if base else "-"
+        ratio_text = f"{ratio / base:.2f}" if base else "-"
+        if base and int(n) < GATE_MIN_SIZE:
+            ratio_text += "*"
+        print(f"{name:<24}{n:>10}{current:>14.1f}{base_text:>14}{ratio:>16.3f}{ratio_text:>13}")
+    print(f"  ratio : temps du cas / temps de la boucle de référence, par entrée")
+    print(f"  ratio norm. : actuel (ratio) / réf. (ratio)")
+    print(f"  * non jugé (< {GATE_MIN_SIZE} entrées)")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        reference.update({key: round(ratio, 5) for key, (_, ratio) in results.items()})
+        baselines = {"format": BASELINE_FORMAT, "python": platform.python_version(),
+                     "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                     "results": dict(sorted(reference.items()))}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\n[Bench] {len(results)} références enregistrées dans {args.baseline}")
+        return 0
+
+    gates = gate_ratios(normalized, reference)
+    print(f"\n{'fonction':<24}{'ratio':>8}  statut")
+    regressions = []
+    for name in names:
+        if name not in gates:
+            print(f"{name:<24}{'-':>8}  nouveau")
+            continue
+        ratio = gates[name]
+        if ratio > 1 + args.threshold:
+            status = "RÉGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - args.threshold:
+            status = "gain"
+        else:
+            status = "ok"
+        print(f"{name:<24}{ratio:>8.2f}  {status}")
+
+    if regressions:
+        print(f"\n[Bench] {len(regressions)} régression(s) au-delà de +{args.threshold:.0%} : "
+              f"{', '.join(regressions)}")
+        return 1
+    print(f"\n[Bench] Aucune régression au-delà de +{args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Micro-benchmark : extract_labeled_value (un parcours par champ) contre
+LabelExtractor (un seul parcours compilé pour tous les champs).
+
+Utilise les pages de data/archive si elles existent, sinon des pages
+synthétiques de taille comparable.
+
+    python benchmarks/bench_label_extractor.py --repeat 20
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from scrapers.archive import PageArchive, ARCHIVE_DIR
+from scrapers.vidiq_enrich import (
+    CHANNEL_PAGE_EXTRACTOR,
+    FIELD_LABELS,
+    extract_labeled_value,
+)
+
+
+def load_archived_pages(root: str, limit: int):
+    archive = PageArchive(root)
+    pages = []
+    for entry in archive.entries():
+        pages.append(archive.load(entry["sha256"]).get("body_text") or "")
+        if len(pages) >= limit:
+            break
+    return pages
+
+
+def synthetic_pages(count: int, lines_per_page: int = 400):
+    rng = random.Random(42)
+    filler = ["Accueil", "Chaînes", "Vidéos", "Top 100", "Connexion", "Partager", "Voir plus"]
+    pages = []
+    for _ in range(count):
+        lines = [f"{rng.choice(filler)} {rng.randint(0, 10_000)}" for _ in range(lines_per_page)]
+        for field, labels in FIELD_LABELS.items():
+            pos = rng.randrange(len(lines))
+            lines.insert(pos, rng.choice(labels))
+            lines.insert(pos + 1, f"{rng.randint(1, 999)}K")
+        pages.append("\n".join(lines))
+    return pages
+
+
+def legacy_extract(text: str):
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return {field: extract_labeled_value(lines, labels) for field, labels in FIELD_LABELS.items()}
+
+
+def bench(fn, pages, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in pages:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction des labels")
+    parser.add_argument("--archive", default=ARCHIVE_DIR, help="Dossier de l'archive")
+    parser.add_argument("--pages", type=int, default=200, help="Nombre de pages")
+    parser.add_argument("--repeat", type=int, default=10, help="Répétitions")
+    args = parser.parse_args()
+
+    pages = load_archived_pages(args.archive, args.pages)
+    source = "archive"
+    if not pages:
+        pages = synthetic_pages(args.pages)
+        source = "synthétique"
+
+    legacy = bench(legacy_extract, pages, args.repeat)
+    compiled = bench(CHANNEL_PAGE_EXTRACTOR.extract, pages, args.repeat)
+
+    print(f"{len(pages)} pages ({source}), {len(FIELD_LABELS)} champs, {args.repeat} répétitions")
+    print(f"{'extracteur':<24}{'µs / page':>12}")
+    print(f"{'extract_labeled_value':<24}{legacy * 1e6:>12.1f}")
+    print(f"{'LabelExtractor':<24}{compiled * 1e6:>12.1f}")
+    print(f"gain x{legacy / compiled:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Benchmark du parcours parallèle des classements paginés
+(VidIQPlaywrightParser.iter_lists) sur des listes statiques locales
+(fixture_server.py), sans vidiq.com.
+
+Chaque nombre de workers parcourt les mêmes listes ; le débit (pages et
+chaînes par seconde) est comparé au premier. Le dédoublonnage est vérifié :
+chaque chaîne sort une fois, avec toutes ses listes.
+
+    python benchmarks/bench_lists.py --lists 4 --pages 3 --workers 1 --workers 4 \\
+        --latency-ms 200
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import scrapers.vidiq_playwright_parser as vidiq_playwright_parser
+from benchmarks.fixture_server import FixtureServer
+from scrapers.browser_pool import BrowserPool
+from scrapers.fetch_policy import FetchPolicy
+from scrapers.telemetry import RunTelemetry
+from scrapers.vidiq_playwright_parser import VidIQPlaywrightParser
+
+
+def run(server: FixtureServer, urls, workers: int, pool: BrowserPool, policy: FetchPolicy):
+    telemetry = RunTelemetry(f"bench_lists_{workers}")
+    completed = []
+    start = time.perf_counter()
+    channels = list(VidIQPlaywrightParser.iter_lists(
+        urls, workers=workers, pool=pool, policy=policy, telemetry=telemetry, completed=completed))
+    wall = time.perf_counter() - start
+
+    memberships = sum(len(ch["lists"]) for ch in channels)
+    errors = []
+    if len({ch["channel_url"] for ch in channels}) != len(channels):
+        errors.append("chaînes en double")
+    if len(channels) != server.expected_channels:
+        errors.append(f"{len(channels)} chaînes au lieu de {server.expected_channels}")
+    if memberships != len(urls) * server.pages * server.per_page:
+        errors.append(f"{memberships} appartenances au lieu de {len(urls) * server.pages * server.per_page}")
+    if sorted(completed) != sorted(urls):
+        errors.append(f"{len(completed)}/{len(urls)} listes complètes")
+    return {
+        "workers": workers,
+        "pages": telemetry.pages,
+        "channels": len(channels),
+        "wall_seconds": wall,
+        "pages_per_second": telemetry.pages / wall if wall else 0.0,
+        "channels_per_second": len(channels) / wall if wall else 0.0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du parcours parallèle des classements")
+    parser.add_argument("--lists", type=int, default=4, help="Classements servis")
+    parser.add_argument("--pages", type=int, default=3, help="Pages par classement")
+    parser.add_argument("--per-page", type=int, default=100, help="Chaînes par page")
+    parser.add_argument("--overlap", type=float, default=0.5,
+                        help="Part des chaînes commune à deux listes consécutives")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latence par document")
+    parser.add_argument("--settle-ms", type=int, default=0,
+                        help="Délai de rendu React après la table (5000 en production)")
+    parser.add_argument("--workers", type=int, action="append", default=None,
+                        help="Workers parallèles (répétable, défaut : 1 et nb de listes)")
+    args = parser.parse_args()
+
+    vidiq_playwright_parser.SETTLE_MS = args.settle_ms
+    workers = args.workers or sorted({1, args.lists})
+    policy = FetchPolicy(base_delay=0.1, max_delay=1.0)
+    pool = BrowserPool()
+    results = []
+    try:
+        with FixtureServer(args.lists, args.pages, args.per_page, args.overlap,
+                           args.latency_ms) as server:
+            urls = [server.list_url(i) for i in range(args.lists)]
+            for n in workers:
+                results.append(run(server, urls, n, pool, policy))
+    finally:
+        pool.close()
+
+    base = results[0]
+    print(f"\n{'workers':<9}{'pages':>7}{'chaînes':>9}{'temps (s)':>11}{'pages/s':>9}"
+          f"{'chaînes/s':>11}{'gain':>7}")
+    for r in results:
+        gain = r["pages_per_second"] / base["pages_per_second"] if base["pages_per_second"] else 0.0
+        print(f"{r['workers']:<9}{r['pages']:>7}{r['channels']:>9}{r['wall_seconds']:>11.2f}"
+              f"{r['pages_per_second']:>9.2f}{r['channels_per_second']:>11.1f}{gain:>6.1f}x")
+
+    failed = [r for r in results if r["errors"]]
+    for r in failed:
+        print(f"[Bench] ✗ {r['workers']} workers : {', '.join(r['errors'])}")
+    if failed:
+        return 1
+    print(f"[Bench] ✓ {base['channels']} chaînes uniques, listes complètes à chaque exécution")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
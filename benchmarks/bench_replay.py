@@ -0,0 +1,79 @@
+"""
+Benchmark hors ligne des scrapers : Top 100 puis enrichissement, servis
+depuis des HAR enregistrés (scrapers.replay), sans Mongo ni vidiq.com.
+
+Enregistrer d'abord les pages une fois :
+    VIDIQ_RECORD_HAR_DIR=data/replay/top100 python seed_db.py --limit 20
+
+Puis :
+    python benchmarks/bench_replay.py --har-dir data/replay/top100 --limit 20 \\
+        --latency-ms 100 --error-rate 0.05
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import scrapers.vidiq_enrich as vidiq_enrich
+from scrapers.browser_pool import BrowserPool
+from scrapers.fetch_policy import FetchPolicy
+from scrapers.replay import HarReplayer, REPLAY_DIR
+from scrapers.telemetry import RunTelemetry
+from scrapers.vidiq_playwright_parser import VidIQPlaywrightParser, DEFAULT_LIST_URL
+
+
+def run_phase(name: str, fn):
+    telemetry = RunTelemetry(f"bench_{name}")
+    start = time.perf_counter()
+    result = fn(telemetry)
+    wall = time.perf_counter() - start
+    return result, {
+        "phase": name,
+        "pages": telemetry.pages,
+        "wall_seconds": wall,
+        "pages_per_second": telemetry.pages / wall if wall else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des scrapers sur rejeu HAR")
+    parser.add_argument("--har-dir", default=os.path.join(REPLAY_DIR, "top100"),
+                        help="Dossier des HAR enregistrés")
+    parser.add_argument("--url", default=DEFAULT_LIST_URL, help="Classement rejoué")
+    parser.add_argument("--limit", type=int, default=20, help="Chaînes enrichies")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latence par document")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proportion de 503 injectées")
+    parser.add_argument("--seed", type=int, default=42, help="Graine du tirage des erreurs")
+    args = parser.parse_args()
+
+    replayer = HarReplayer(args.har_dir, args.latency_ms, args.error_rate, seed=args.seed)
+    pool = BrowserPool(har=replayer)
+    # Backoff court : les erreurs sont injectées localement
+    policy = FetchPolicy(base_delay=0.1, max_delay=1.0)
+    vidiq_enrich.POLITE_PAUSE_SECONDS = (0.0, 0.0)
+
+    try:
+        channels, top100 = run_phase("top100", lambda telemetry: VidIQPlaywrightParser.scrape_top100(
+            args.url, pool=pool, policy=policy, telemetry=telemetry))
+        enriched, enrich = run_phase("enrich", lambda telemetry: vidiq_enrich.enrich_channels(
+            channels[:args.limit], pool=pool, policy=policy, telemetry=telemetry))
+    finally:
+        pool.close()
+
+    print(f"\n{'phase':<10}{'pages':>8}{'temps (s)':>12}{'pages/s':>10}")
+    for phase in (top100, enrich):
+        print(f"{phase['phase']:<10}{phase['pages']:>8}{phase['wall_seconds']:>12.2f}"
+              f"{phase['pages_per_second']:>10.2f}")
+    print(f"\nChaînes : {len(channels)} extraites, {len(enriched)} enrichies, "
+          f"{sum(1 for d in enriched if d.get('failure_class'))} en échec, "
+          f"{sum(d.get('retries', 0) for d in enriched)} retries")
+    print(f"Rejeu : {replayer.stats['documents']} documents, "
+          f"{replayer.stats['injected_errors']} erreurs injectées")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Benchmark de l'extraction du Top 100 sur une page statique locale
+(fixture_server.py) : lecture cellule par cellule (inner_text, un appel
+Playwright par cellule et par lien) contre un seul page.evaluate de
+_SNAPSHOT_JS (vidiq_playwright_parser).
+
+Pour chaque méthode : nombre d'appels Playwright et temps médian de
+l'extraction seule, page déjà chargée (rechargée entre deux tours).
+
+    python benchmarks/bench_snapshot.py --rows 100 --rounds 5
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.fixture_server import FixtureServer
+from scrapers.browser_pool import BrowserPool
+from scrapers.vidiq_playwright_parser import _SNAPSHOT_JS
+
+
+LINK_SELECTOR = 'a[href*="/youtube-stats/channel/"]'
+
+
+def extract_inner_text(page, rpc):
+    """Ancienne extraction : handles Playwright, puis inner_text par cellule et par lien."""
+
+    def call(fn, *args, **kwargs):
+        rpc["calls"] += 1
+        return fn(*args, **kwargs)
+
+    rows = []
+    for tr in call(page.query_selector_all, "table tbody tr"):
+        cells = call(tr.query_selector_all, "td")
+        rows.append([call(td.inner_text).strip() for td in cells])
+
+    links = {}
+    for a in call(page.query_selector_all, LINK_SELECTOR):
+        href = call(a.get_attribute, "href")
+        text = call(a.inner_text).strip()
+        rank = text[1:].split(" ")[0]
+        if text.startswith("#") and rank.isdigit() and href:
+            links[rank] = f"https://vidiq.com{href}" if href.startswith("/") else href
+    return rows, links
+
+
+def extract_snapshot(page, rpc):
+    """Extraction actuelle : lignes et liens en un seul aller-retour."""
+    rpc["calls"] += 1
+    snapshot = page.evaluate(_SNAPSHOT_JS, {"scroll": False, "delay": 0})
+    return [row["cells"] for row in snapshot["rows"]], snapshot["links"]
+
+
+METHODS = {
+    "inner_text": extract_inner_text,
+    "_SNAPSHOT_JS": extract_snapshot,
+}
+
+
+def measure(page, url, fn, rounds):
+    """(appels Playwright par extraction, temps médian en ms, résultat)"""
+    timings = []
+    calls = 0
+    result = None
+    for _ in range(rounds):
+        # Page neuve à chaque tour : l'observer de _SNAPSHOT_JS repart de zéro
+        page.goto(url, wait_until="domcontentloaded")
+        page.wait_for_selector("table tbody tr")
+        rpc = {"calls": 0}
+        start = time.perf_counter()
+        result = fn(page, rpc)
+        timings.append((time.perf_counter() - start) * 1000)
+        calls = rpc["calls"]
+    return calls, statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inner_text contre _SNAPSHOT_JS")
+    parser.add_argument("--rows", type=int, default=100, help="Lignes du classement servi")
+    parser.add_argument("--rounds", type=int, default=5, help="Tours par méthode (médiane)")
+    args = parser.parse_args()
+
+    pool = BrowserPool()
+    results = {}
+    try:
+        with FixtureServer(per_page=args.rows) as server, pool.page() as page:
+            url = server.list_url(0)
+            # Tour à blanc : démarrage du navigateur et premier rendu hors mesure
+            page.goto(url, wait_until="domcontentloaded")
+            for name, fn in METHODS.items():
+                results[name] = measure(page, url, fn, args.rounds)
+    finally:
+        pool.close()
+
+    print(f"\n{'méthode':<16}{'appels':>10}{'médiane (ms)':>16}")
+    for name, (calls, median_ms, _) in results.items():
+        print(f"{name:<16}{calls:>10}{median_ms:>16.1f}")
+
+    (old_calls, old_ms, old), (new_calls, new_ms, new) = results["inner_text"], results["_SNAPSHOT_JS"]
+    print(f"\n{args.rows} lignes : {old_calls / new_calls:.0f}x moins d'appels, "
+          f"{old_ms / new_ms if new_ms else float('inf'):.1f}x plus rapide")
+    if old != new:
+        print("[Bench] ✗ Les deux extractions ne renvoient pas les mêmes lignes et liens")
+        return 1
+    print(f"[Bench] ✓ Extractions identiques ({len(new[0])} lignes, {len(new[1])} liens)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
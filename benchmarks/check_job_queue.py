@@ -0,0 +1,216 @@
+"""
+Vérification de la file enrich_jobs (scrapers/job_queue.py) avec de vrais
+processus JobWorker concurrents sur la base Mongo des variables MONGO_*.
+
+L'enrichissement est remplacé par une tâche factice (sans navigateur) qui
+journalise chaque traitement ; le reste du worker (réservation, bail,
+heartbeat, retries, dead-letter) est celui de production. Le scénario :
+- `--jobs` chaînes en attente, `--max-attempts` tentatives chacune ;
+- une chaîne sur 10 échoue toujours (doit finir `dead`), une sur 7 échoue
+  à sa première tentative seulement (doit finir `done`) ;
+- `--crashed` jobs réservés puis abandonnés par un worker « mort » (bail
+  jamais prolongé) : ils doivent être repris après expiration du bail ;
+- `--workers` processus traitent la file jusqu'à ce qu'elle soit vide.
+
+Vérifié ensuite :
+- aucun job traité par deux workers en même temps (double réservation) ;
+- chaque job termine `done` ou `dead`, dans l'état attendu ;
+- chaque bail abandonné est repris par un autre worker après expiration.
+
+La base MONGO_DB est remplacée par `--db` (défaut : vidiq_job_queue_check),
+vidée au début et supprimée à la fin sauf --keep.
+
+    MONGO_HOST=localhost python benchmarks/check_job_queue.py --workers 4 --jobs 200
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+from contextlib import contextmanager
+from datetime import timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Avant les imports : ni pré-rendu ni pause de politesse dans les workers
+os.environ["PRERENDER"] = "0"
+os.environ["VIDIQ_POLITE_PAUSE_SECONDS"] = "0,0"
+
+from scrapers.db import get_db
+from scrapers.fetch_policy import TIMEOUT
+from scrapers.job_queue import (
+    DEAD, DONE, JOBS_COLLECTION, JobWorker, claim, enqueue, queue_status,
+)
+import scrapers.vidiq_enrich as vidiq_enrich
+
+
+RUNS_COLLECTION = "job_queue_check_runs"
+CRASHED_WORKER = "check:crashed"
+
+
+def always_fails(rank: int) -> bool:
+    return rank % 10 == 0
+
+
+def fails_once(rank: int) -> bool:
+    return rank % 7 == 0 and not always_fails(rank)
+
+
+class _NoBrowser:
+    """Pool sans navigateur : la tâche factice n'ouvre aucune page."""
+
+    @contextmanager
+    def page(self):
+        yield None
+
+    def close(self):
+        pass
+
+
+def _worker_process(index: int, lease_seconds: float, work_ms: float):
+    worker = JobWorker(
+        worker_id=f"check:{index}",
+        lease_seconds=lease_seconds,
+        poll_seconds=0.2,
+        exit_when_empty=True,
+        retry_delay=0.1,
+        pool=_NoBrowser(),
+    )
+    runs = worker.db[RUNS_COLLECTION]
+
+    def enrich_channel(page, ch, archive=None, policy=None, telemetry=None):
+        url = ch["channel_url"]
+        attempt = worker.jobs.find_one({"_id": url}, {"attempts": 1})["attempts"]
+        run_id = runs.insert_one({
+            "job": url, "worker": worker.worker_id, "attempt": attempt, "start": time.time(),
+        }).inserted_id
+        time.sleep(work_ms / 1000.0)
+        runs.update_one({"_id": run_id}, {"$set": {"end": time.time()}})
+        rank = ch["rank"]
+        if always_fails(rank) or (fails_once(rank) and attempt == 1):
+            return {**ch, "failure_class": TIMEOUT, "error": f"échec simulé (tentative {attempt})"}
+        return {**ch, "failure_class": None, "error": None, "retries": 0}
+
+    vidiq_enrich.enrich_channel = enrich_channel
+    worker.run()
+
+
+def check(db, crashed, args):
+    """Liste des anomalies constatées (vide si tout est conforme)."""
+    errors = []
+    jobs = {job["_id"]: job for job in db[JOBS_COLLECTION].find()}
+    runs = {}
+    for run in db[RUNS_COLLECTION].find().sort("start", 1):
+        runs.setdefault(run["job"], []).append(run)
+
+    # Double réservation : deux traitements du même job qui se chevauchent
+    for url, job_runs in runs.items():
+        for before, after in zip(job_runs, job_runs[1:]):
+            if after["start"] < before.get("end", float("inf")):
+                errors.append(f"{url} traité en même temps par {before['worker']} et {after['worker']}")
+        attempts = [run["attempt"] for run in job_runs]
+        if len(set(attempts)) != len(attempts):
+            errors.append(f"{url} : même tentative réservée deux fois {attempts}")
+
+    # États finaux
+    for url, job in jobs.items():
+        rank = job["channel"]["rank"]
+        expected = DEAD if always_fails(rank) else DONE
+        if job["state"] != expected:
+            errors.append(f"{url} (rank {rank}) : {job['state']} au lieu de {expected}")
+        elif expected == DEAD and job["attempts"] != args.max_attempts:
+            errors.append(f"{url} : dead après {job['attempts']}/{args.max_attempts} tentatives")
+
+    # Baux abandonnés : repris par un vrai worker, après expiration
+    for url, expires_at in crashed.items():
+        resumed = [run for run in runs.get(url, []) if run["worker"] != CRASHED_WORKER]
+        if not resumed:
+            errors.append(f"{url} : bail abandonné jamais repris")
+        elif resumed[0]["start"] < expires_at:
+            errors.append(f"{url} : repris avant l'expiration du bail")
+
+    done = sum(1 for job in jobs.values() if job["state"] == DONE)
+    # Les jobs dead laissent une chaîne avec failure_class (record_failure)
+    enriched = db["channels_enriched"].count_documents({"failure_class": {"$exists": False}})
+    if enriched != done:
+        errors.append(f"{enriched} chaînes enrichies pour {done} jobs done")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérification de la file enrich_jobs multi-processus")
+    parser.add_argument("--workers", type=int, default=4, help="Processus JobWorker")
+    parser.add_argument("--jobs", type=int, default=200, help="Jobs en file")
+    parser.add_argument("--crashed", type=int, default=5, help="Baux abandonnés par un worker mort")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Tentatives avant dead-letter")
+    parser.add_argument("--lease-seconds", type=float, default=2.0, help="Durée du bail")
+    parser.add_argument("--work-ms", type=float, default=20.0, help="Durée d'un traitement factice")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Durée maximale de la vérification")
+    parser.add_argument("--db", default="vidiq_job_queue_check", help="Base Mongo utilisée (vidée)")
+    parser.add_argument("--keep", action="store_true", help="Garder la base à la fin")
+    args = parser.parse_args()
+
+    os.environ["MONGO_DB"] = args.db
+    db = get_db()
+    db.client.drop_database(args.db)
+
+    channels = [
+        {"rank": rank, "channel_name": f"Channel {rank}",
+         "channel_url": f"https://vidiq.com/fr/youtube-stats/channel/UC{rank:022d}/"}
+        for rank in range(1, args.jobs + 1)
+    ]
+    enqueue(db[JOBS_COLLECTION], channels, args.max_attempts)
+
+    # Worker mort : réserve des jobs puis disparaît sans heartbeat
+    crashed = {}
+    for _ in range(args.crashed):
+        job = claim(db[JOBS_COLLECTION], CRASHED_WORKER, args.lease_seconds)
+        if job is None:
+            break
+        db[RUNS_COLLECTION].insert_one({
+            "job": job["_id"], "worker": CRASHED_WORKER, "attempt": job["attempts"],
+            "start": time.time(), "end": time.time(),
+        })
+        # pymongo renvoie des datetimes UTC naïfs
+        crashed[job["_id"]] = job["lease_expires_at"].replace(tzinfo=timezone.utc).timestamp()
+    print(f"[Check] {args.jobs} jobs, {len(crashed)} baux abandonnés, {args.workers} workers")
+
+    start = time.perf_counter()
+    processes = [
+        multiprocessing.Process(target=_worker_process, args=(i + 1, args.lease_seconds, args.work_ms))
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    deadline = time.monotonic() + args.timeout
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()))
+    hung = [process for process in processes if process.is_alive()]
+    for process in hung:
+        process.kill()
+        process.join()
+    wall = time.perf_counter() - start
+
+    errors = check(db, crashed, args)
+    if hung:
+        errors.insert(0, f"{len(hung)} workers encore actifs après {args.timeout:.0f}s")
+    crashed_workers = [p.exitcode for p in processes if p.exitcode not in (0, None) and p not in hung]
+    if crashed_workers:
+        errors.insert(0, f"{len(crashed_workers)} workers sortis en erreur (codes {crashed_workers})")
+
+    print(f"\n[Check] États : {queue_status(db[JOBS_COLLECTION])} en {wall:.1f}s")
+    if not args.keep:
+        db.client.drop_database(args.db)
+    if errors:
+        for error in errors[:20]:
+            print(f"[Check] ✗ {error}")
+        if len(errors) > 20:
+            print(f"[Check] ... {len(errors) - 20} autres anomalies")
+        return 1
+    print("[Check] ✓ Aucune double réservation, tous les jobs done/dead, baux expirés repris")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
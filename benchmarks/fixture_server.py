@@ -0,0 +1,117 @@
+"""
+Serveur HTTP local de classements Top 100 statiques, pour mesurer
+l'extraction navigateur sans vidiq.com (bench_snapshot.py, bench_lists.py).
+
+Chaque page reprend la structure lue par VidIQPlaywrightParser : une table
+de lignes (rang, nom, vidéos, abonnés, vues), les liens "#<rang> ..." vers
+les pages chaînes hors de la table, et un lien rel="next" tant qu'il reste
+des pages :
+    /top/<liste>/<page>/
+
+Deux listes consécutives partagent une fraction `overlap` de leurs chaînes,
+pour exercer le dédoublonnage par channel_url.
+"""
+
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+LINK_PATH = "/fr/youtube-stats/channel/UC{:022d}/"
+
+
+class FixtureServer:
+    """Classements servis depuis la mémoire, sur 127.0.0.1 (port libre)."""
+
+    def __init__(self, lists: int = 1, pages: int = 1, per_page: int = 100,
+                 overlap: float = 0.5, latency_ms: float = 0.0):
+        self.lists = lists
+        self.pages = pages
+        self.per_page = per_page
+        self.latency = latency_ms / 1000.0
+        total = pages * per_page
+        # Décalage des identifiants d'une liste à la suivante
+        self.shift = max(1, round(total * (1.0 - overlap)))
+        self.stats = {"documents": 0}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def list_url(self, index: int) -> str:
+        return f"{self.base_url}/top/{index}/1/"
+
+    @property
+    def expected_channels(self) -> int:
+        """Chaînes uniques sur l'ensemble des listes."""
+        total = self.pages * self.per_page
+        return total + (self.lists - 1) * min(self.shift, total)
+
+    def render(self, list_index: int, page: int) -> str:
+        links = []
+        rows = []
+        for i in range(self.per_page):
+            rank = (page - 1) * self.per_page + i + 1
+            channel_id = rank + list_index * self.shift
+            name = f"Channel {channel_id}"
+            links.append(f'<a href="{LINK_PATH.format(channel_id)}">#{rank} {name}</a>')
+            rows.append(
+                f"<tr><td>#{rank}</td><td>{name}</td><td>{channel_id % 5000 + 1}</td>"
+                f"<td>{channel_id % 900 + 1}.{channel_id % 10}M</td>"
+                f"<td>{channel_id % 90 + 1}.{channel_id % 7}B</td></tr>"
+            )
+        next_link = ""
+        if page < self.pages:
+            next_link = f'<a rel="next" href="/top/{list_index}/{page + 1}/">Suivant</a>'
+        return (
+            "<!doctype html><html><head><meta charset=\"utf-8\"><title>Top 100</title></head><body>"
+            f"<div class=\"cards\">{''.join(links)}</div>"
+            f"<table><tbody>{''.join(rows)}</tbody></table>"
+            f"<nav>{next_link}</nav></body></html>"
+        )
+
+    def _handler(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = [p for p in self.path.split("?")[0].split("/") if p]
+                if len(parts) != 3 or parts[0] != "top" or not (parts[1].isdigit() and parts[2].isdigit()):
+                    self.send_error(404)
+                    return
+                list_index, page = int(parts[1]), int(parts[2])
+                if list_index >= fixture.lists or not 1 <= page <= fixture.pages:
+                    self.send_error(404)
+                    return
+                if fixture.latency:
+                    time.sleep(fixture.latency)
+                body = fixture.render(list_index, page).encode("utf-8")
+                with fixture._lock:
+                    fixture.stats["documents"] += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
@@ -1,5 +1,6 @@
 #!/bin/bash
-# Script d'initialisation pour orchestrer le scraping avant le web
+# Script d'initialisation du conteneur scraper :
+# seed complet si la base est vide, puis rafraîchissement continu
 
 set -e
 
@@ -9,22 +10,34 @@ echo "=================================================="
 
 # Attendre que MongoDB soit prêt
 echo "⏳ Attente de MongoDB..."
-while ! mongosh --host mongo --username $MONGO_USER --password $MONGO_PASSWORD --eval "db.adminCommand('ping')" &> /dev/null; do
+while ! python -c "from scrapers.db import get_db; get_db()" &> /dev/null; do
     echo "  MongoDB pas encore prêt, attente 2s..."
     sleep 2
 done
 echo " MongoDB est opérationnel"
 
-# Vérifier si les données existent déjà
+# Vérifier si les données existent déjà (collection lue par l'application web)
 echo "Vérification des données..."
-COLLECTION_COUNT=$(mongosh --host mongo --username $MONGO_USER --password $MONGO_PASSWORD --eval "use $MONGO_DB; db.channels.countDocuments({})" --quiet)
+COLLECTION_COUNT=$(python -c "from scrapers.db import get_db; print(get_db()['channels_enriched'].count_documents({}))")
 
 if [ "$COLLECTION_COUNT" -eq 0 ]; then
-    echo " Lancement du scraper..."
-    python seed_db.py
+    # Snapshot récent dans data/ : rechargement direct, sinon crawl complet
+    if python -m scrapers.bootstrap; then
+        echo " Données rechargées depuis le snapshot"
+    else
+        echo " Lancement du scraper..."
+        python seed_db.py
+    fi
 else
     echo "Données déjà présentes ($COLLECTION_COUNT documents)"
+    # Champs dérivés (filtres de /api/channels) des documents plus anciens
+    python -m scrapers.backfill
+    # Pages statiques de l'application web (rien à faire si déjà à jour)
+    python -c "from scrapers.prerender import trigger_prerender; trigger_prerender()"
 fi
 
 echo " Initialisation terminée !"
 
+# Rafraîchissement continu selon l'ancienneté et l'importance des chaînes
+echo " Démarrage du planificateur de rafraîchissement..."
+exec python -m scrapers.scheduler
@@ -0,0 +1,213 @@
+"""
+Archive compressée des pages chaînes visitées pendant l'enrichissement.
+
+Chaque page (texte visible + HTML) est stockée une seule fois, compressée
+en gzip et adressée par son empreinte SHA-256 :
+    data/archive/objects/<2 premiers caractères>/<sha256>.json.gz
+Un index JSONL (data/archive/index.jsonl) relie channel_url, date de
+récupération et empreinte.
+
+La commande `reparse` relance les parseurs sur l'archive avec un pool de
+processus et met à jour Mongo en bulk, sans repasser par Chromium :
+    python -m scrapers.archive reparse --workers 8
+"""
+
+import os
+import sys
+import gzip
+import json
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from scrapers.db import get_db, stamp_data_version
+from scrapers.prerender import trigger_prerender
+
+
+ARCHIVE_DIR = os.path.join("data", "archive")
+
+
+class PageArchive:
+    """Stockage content-addressed des pages récupérées."""
+
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, "index.jsonl")
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.json.gz")
+
+    def store(self, channel_url: str, body_text: str, html: Optional[str] = None,
+              fetched_at: Optional[str] = None) -> str:
+        """
+        Archive une page et ajoute une entrée à l'index.
+
+        Returns:
+            Empreinte SHA-256 du contenu
+        """
+        payload = json.dumps(
+            {"body_text": body_text, "html": html},
+            ensure_ascii=False,
+            sort_keys=True,
+        ).encode("utf-8")
+        digest = hashlib.sha256(payload).hexdigest()
+        path = self.object_path(digest)
+
+        # Contenu identique déjà archivé : seule l'entrée d'index est ajoutée
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+        entry = {
+            "channel_url": channel_url,
+            "fetched_at": fetched_at or datetime.now(timezone.utc).isoformat(),
+            "sha256": digest,
+            "size": len(payload),
+        }
+        with self._lock:
+            with open(self.index_path, mode="a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        return digest
+
+    def load(self, digest: str) -> Dict[str, Optional[str]]:
+        """Relit une page archivée."""
+        with gzip.open(self.object_path(digest), "rb") as f:
+            return json.loads(f.read().decode("utf-8"))
+
+    def entries(self, latest_only: bool = True) -> Iterator[Dict]:
+        """
+        Parcourt l'index. Par défaut, ne garde que la dernière récupération
+        de chaque chaîne.
+        """
+        if not os.path.exists(self.index_path):
+            return
+
+        with open(self.index_path, mode="r", encoding="utf-8") as f:
+            if not latest_only:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+                return
+
+            latest: Dict[str, Dict] = {}
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                current = latest.get(entry["channel_url"])
+                if current is None or entry["fetched_at"] >= current["fetched_at"]:
+                    latest[entry["channel_url"]] = entry
+        yield from latest.values()
+
+
+def _reparse_entry(args: Tuple[str, Dict]) -> Tuple[str, Optional[Dict], Optional[str]]:
+    """
+    Worker du pool : relit une page archivée et relance le parseur.
+
+    Returns:
+        (channel_url, champs, None), ou (channel_url, None, erreur) si
+        l'objet est absent, tronqué ou illisible
+    """
+    # Import ici : vidiq_enrich importe lui-même ce module
+    from scrapers.vidiq_enrich import parse_channel_text, derived_fields
+
+    root, entry = args
+    try:
+        page = PageArchive(root).load(entry["sha256"])
+    except (OSError, EOFError, ValueError) as e:
+        # OSError : objet manquant ou gzip corrompu ; EOFError : gzip
+        # tronqué ; ValueError : JSON ou UTF-8 invalide
+        return entry["channel_url"], None, f"{type(e).__name__}: {e}"
+    fields = parse_channel_text(page.get("body_text") or "")
+    return entry["channel_url"], {**fields, **derived_fields(fields)}, None
+
+
+def reparse(root: str = ARCHIVE_DIR, workers: Optional[int] = None,
+            batch_size: int = 1000, dry_run: bool = False) -> int:
+    """
+    Re-parse toutes les pages archivées et met à jour channels_enriched.
+
+    Une page illisible est comptée, signalée et ignorée : le reste de
+    l'archive est re-parsé.
+
+    Returns:
+        Nombre de chaînes re-parsées
+    """
+    archive = PageArchive(root)
+    entries = list(archive.entries())
+    if not entries:
+        print(f"[Reparse] Archive vide : {root}")
+        return 0
+
+    collection = None if dry_run else get_db()["channels_enriched"]
+    reparsed_at = datetime.now(timezone.utc).isoformat()
+    batch: List[UpdateOne] = []
+    count = 0
+    skipped = 0
+
+    print(f"[Reparse] {len(entries)} pages à re-parser")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(
+            _reparse_entry,
+            ((root, entry) for entry in entries),
+            chunksize=64,
+        )
+        for channel_url, fields, error in results:
+            if error is not None:
+                skipped += 1
+                print(f"[Reparse] Page ignorée ({channel_url}) : {error}")
+                continue
+            count += 1
+            if collection is None:
+                continue
+            batch.append(UpdateOne(
+                {"channel_url": channel_url},
+                {"$set": {**fields, "reparsed_at": reparsed_at}},
+            ))
+            if len(batch) >= batch_size:
+                collection.bulk_write(batch, ordered=False)
+                batch = []
+
+    if batch:
+        collection.bulk_write(batch, ordered=False)
+    if collection is not None:
+        stamp_data_version(collection.database, source="reparse")
+
+    print(f"[Reparse] ✓ {count} chaînes re-parsées")
+    if skipped:
+        print(f"[Reparse] ⚠ {skipped} pages illisibles ignorées")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive des pages VidIQ")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_reparse = sub.add_parser("reparse", help="Re-parser l'archive et mettre à jour Mongo")
+    p_reparse.add_argument("--root", default=ARCHIVE_DIR, help="Dossier de l'archive")
+    p_reparse.add_argument("--workers", type=int, default=None, help="Processus (défaut : nb de CPU)")
+    p_reparse.add_argument("--batch-size", type=int, default=1000, help="Taille des bulk_write")
+    p_reparse.add_argument("--dry-run", action="store_true", help="Ne pas écrire dans Mongo")
+
+    args = parser.parse_args()
+
+    if args.command == "reparse":
+        reparse(args.root, args.workers, args.batch_size, args.dry_run)
+        if not args.dry_run:
+            trigger_prerender()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Calcule les champs dérivés (scrapers.vidiq_enrich.derived_fields) des
+chaînes enrichies qui ne les ont pas encore, par bulk_write.
+
+Les écritures courantes (upsert_mongo, bootstrap, reparse) les calculent
+déjà ; ce rattrapage sert aux documents écrits avant leur introduction.
+
+    python -m scrapers.backfill           # documents sans name_key / url_key
+    python -m scrapers.backfill --all     # tous les documents
+"""
+
+import sys
+import argparse
+from typing import List
+
+from pymongo import UpdateOne
+
+from scrapers.db import get_db, stamp_data_version
+from scrapers.vidiq_enrich import derived_fields
+
+
+def backfill_derived(collection, recompute_all: bool = False, batch_size: int = 1000) -> int:
+    """
+    Returns:
+        Nombre de documents mis à jour
+    """
+    query = {} if recompute_all else {"$or": [
+        {"name_key": {"$exists": False}},
+        {"url_key": {"$exists": False}},
+    ]}
+    projection = {
+        "channel_name": 1, "channel_url": 1, "estimated_monthly_earnings": 1,
+        "subscribers": 1, "total_views": 1, "videos": 1,
+    }
+    batch: List[UpdateOne] = []
+    count = 0
+    for doc in collection.find(query, projection):
+        # Champs absents = None, pour que tous les dérivés soient calculés
+        for field in projection:
+            doc.setdefault(field, None)
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": derived_fields(doc)}))
+        if len(batch) >= batch_size:
+            count += collection.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        count += collection.bulk_write(batch, ordered=False).modified_count
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rattrapage des champs dérivés des chaînes enrichies")
+    parser.add_argument("--all", action="store_true", help="Recalculer tous les documents")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Taille des bulk_write")
+    args = parser.parse_args()
+
+    db = get_db()
+    count = backfill_derived(db["channels_enriched"], args.all, args.batch_size)
+    if count:
+        stamp_data_version(db, source="backfill")
+    print(f"[Backfill] {count} documents mis à jour")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
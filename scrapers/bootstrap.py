@@ -0,0 +1,168 @@
+"""
+Démarrage à froid depuis le dernier snapshot exporté dans data/.
+
+Sur un volume Mongo vide, recharge channels_enriched et channels_top100
+depuis les CSV exportés au lieu de re-crawler VidIQ :
+- insertions par lots (insert_many non ordonné), en parallèle
+- chargement dans une collection temporaire, index créés après le
+  chargement, puis renommage atomique vers la collection finale
+- version des données estampillée dans la collection `meta`
+
+    python -m scrapers.bootstrap --max-age-hours 72
+
+Code de sortie : 0 si chargé, 2 si le snapshot est absent ou trop ancien.
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from scrapers.db import get_db, ensure_indexes, stamp_data_version
+from scrapers.prerender import trigger_prerender
+from scrapers.vidiq_enrich import ENRICHED_CSV_PATH, _to_int, derived_fields
+from scrapers.vidiq_scraper import RAW_CSV_PATH
+
+
+INT_FIELDS = {"rank", "videos", "subscribers", "total_views", "retries"}
+JSON_FIELDS = {"lists", "failure_classes"}
+
+EXIT_LOADED = 0
+EXIT_NO_SNAPSHOT = 2
+
+
+def _convert_row(row: Dict[str, str], datetime_fields=()) -> Dict:
+    """Retype une ligne CSV (entiers, listes JSON, dates) ; les vides deviennent None."""
+    doc = {}
+    for key, value in row.items():
+        if value == "" or value is None:
+            doc[key] = None
+        elif key in INT_FIELDS:
+            doc[key] = _to_int(value)
+        elif key in JSON_FIELDS:
+            doc[key] = json.loads(value)
+        elif key in datetime_fields:
+            doc[key] = datetime.fromisoformat(value)
+        else:
+            doc[key] = value
+    return doc
+
+
+def _convert_enriched_row(row: Dict[str, str]) -> Dict:
+    """Ligne du CSV enrichi + champs dérivés (ratios, revenus, nom normalisé)."""
+    doc = _convert_row(row)
+    doc.update(derived_fields(doc))
+    return doc
+
+
+def read_snapshot(path: str, convert: Callable[[Dict], Dict],
+                  batch_size: int) -> Iterator[List[Dict]]:
+    """Lit un CSV par lots de documents typés."""
+    with open(path, mode="r", encoding="utf-8", newline="") as f:
+        batch = []
+        for row in csv.DictReader(f):
+            batch.append(convert(row))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def snapshot_age_hours(path: str) -> Optional[float]:
+    """Âge du fichier en heures, None s'il n'existe pas."""
+    if not os.path.exists(path):
+        return None
+    return (time.time() - os.path.getmtime(path)) / 3600
+
+
+def load_collection(db, name: str, path: str, convert: Callable[[Dict], Dict],
+                    batch_size: int = 10_000, parallel: int = 4) -> int:
+    """
+    Charge un snapshot CSV dans `name` via une collection temporaire.
+
+    Returns:
+        Nombre de documents chargés
+    """
+    staging = db[f"{name}__bootstrap"]
+    staging.drop()
+
+    start = time.perf_counter()
+    count = 0
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        pending = []
+        for batch in read_snapshot(path, convert, batch_size):
+            count += len(batch)
+            pending.append(pool.submit(staging.insert_many, batch, ordered=False))
+            # Borne la mémoire : pas plus de 2 lots en attente par thread
+            if len(pending) >= parallel * 2:
+                pending.pop(0).result()
+        for future in pending:
+            future.result()
+    loaded = time.perf_counter() - start
+
+    # Index après le chargement : une construction en bloc au lieu d'une
+    # mise à jour par insertion
+    start = time.perf_counter()
+    ensure_indexes(staging)
+    indexed = time.perf_counter() - start
+
+    staging.rename(name, dropTarget=True)
+    print(f"[Bootstrap] {name}: {count} documents "
+          f"(chargement {loaded:.1f}s, index {indexed:.1f}s)")
+    return count
+
+
+def bootstrap(max_age_hours: Optional[float] = None, batch_size: int = 10_000,
+              parallel: int = 4) -> bool:
+    """
+    Recharge les collections depuis les snapshots de data/.
+
+    Returns:
+        True si les données ont été chargées
+    """
+    age = snapshot_age_hours(ENRICHED_CSV_PATH)
+    if age is None:
+        print(f"[Bootstrap] Snapshot introuvable : {ENRICHED_CSV_PATH}")
+        return False
+    if max_age_hours is not None and age > max_age_hours:
+        print(f"[Bootstrap] Snapshot trop ancien ({age:.1f}h > {max_age_hours}h)")
+        return False
+
+    db = get_db()
+    start = time.perf_counter()
+
+    load_collection(db, "channels_enriched", ENRICHED_CSV_PATH,
+                    _convert_enriched_row, batch_size, parallel)
+    if os.path.exists(RAW_CSV_PATH):
+        load_collection(db, "channels_top100", RAW_CSV_PATH,
+                        lambda row: _convert_row(row, datetime_fields={"scraped_at"}),
+                        batch_size, parallel)
+
+    version = stamp_data_version(db, source="bootstrap")
+    print(f"[Bootstrap] ✓ Terminé en {time.perf_counter() - start:.1f}s (version {version})")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chargement rapide depuis le dernier snapshot")
+    parser.add_argument("--max-age-hours", type=float,
+                        default=float(os.getenv("BOOTSTRAP_MAX_AGE_HOURS", "72")),
+                        help="Âge max du snapshot (heures)")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Documents par insert_many")
+    parser.add_argument("--parallel", type=int, default=4, help="Insertions en parallèle")
+    args = parser.parse_args()
+
+    loaded = bootstrap(args.max_age_hours, args.batch_size, args.parallel)
+    if loaded:
+        trigger_prerender()
+    return EXIT_LOADED if loaded else EXIT_NO_SNAPSHOT
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,377 @@
+"""
+Pool de navigateurs partagé entre les phases de scraping.
+
+Un seul serveur Chromium est lancé (ou rejoint) par exécution, au lieu d'un
+démarrage à froid par phase :
+- PLAYWRIGHT_WS_ENDPOINT défini : connexion à un serveur déjà lancé
+  (réutilisé d'une exécution à l'autre, cache HTTP conservé côté serveur)
+- sinon : `playwright launch-server` est démarré une fois par le pool
+
+L'API sync de Playwright est liée au thread qui l'a créée : chaque thread
+ouvre donc sa propre connexion au serveur (quelques ms) et reçoit un
+contexte isolé, recyclé après N pages ou si la mémoire du navigateur
+(mesurée au plus toutes les quelques secondes) dépasse un seuil. Les assets statiques peuvent être servis depuis un
+cache disque persistant.
+
+Les contextes peuvent aussi enregistrer leur trafic en HAR ou être servis
+depuis des HAR enregistrés (scrapers.replay), pour travailler hors ligne.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import resource
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from playwright.sync_api import sync_playwright
+
+from scrapers.replay import har_from_env
+
+
+STATIC_RESOURCE_TYPES = {"stylesheet", "script", "font", "image"}
+# Le corps mis en cache est déjà décodé : ces en-têtes de transport ne
+# décrivent plus ce qui est renvoyé
+HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+def _replayable_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    return {name: value for name, value in headers.items() if name.lower() not in HOP_HEADERS}
+
+
+def _child_pids(pid: int) -> Optional[list]:
+    """Enfants directs d'un processus (/proc/<pid>/task/*/children), None si non exposé."""
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return []
+    children = []
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/children", encoding="utf-8") as f:
+                children.extend(int(child) for child in f.read().split())
+        except FileNotFoundError:
+            # Noyau sans CONFIG_PROC_CHILDREN
+            return None
+        except OSError:
+            continue
+    return children
+
+
+def _children_by_scan() -> Dict[int, list]:
+    """Parents -> enfants pour tout /proc (repli si children n'est pas exposé)."""
+    children: Dict[int, list] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8") as f:
+                # pid (comm) état ppid ... : comm peut contenir des espaces
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _process_tree_rss_mb(root_pid: int) -> Optional[float]:
+    """RSS cumulée (Mo) d'un processus et de ses descendants, via /proc (Linux)."""
+    if not os.path.isdir("/proc"):
+        return None
+
+    scanned = None
+    total, stack = 0, [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += _rss_kb(pid)
+        children = _child_pids(pid) if scanned is None else None
+        if children is None:
+            if scanned is None:
+                scanned = _children_by_scan()
+            children = scanned.get(pid, [])
+        stack.extend(children)
+    return total / 1024
+
+
+class StaticAssetCache:
+    """Cache disque des assets statiques (JS, CSS, polices, images)."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _paths(self, url: str):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.root, key[:2], key)
+        return f"{base}.body", f"{base}.json"
+
+    def handle(self, route):
+        """Handler pour context.route : sert depuis le disque ou remplit le cache."""
+        request = route.request
+        if request.method != "GET" or request.resource_type not in STATIC_RESOURCE_TYPES:
+            route.continue_()
+            return
+
+        body_path, meta_path = self._paths(request.url)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+            self.hits += 1
+            # Filtré aussi à la lecture : entrées écrites avant HOP_HEADERS
+            route.fulfill(status=200, headers=_replayable_headers(meta["headers"]), body=body)
+            return
+
+        response = route.fetch()
+        body = response.body()
+        if response.status == 200:
+            os.makedirs(os.path.dirname(body_path), exist_ok=True)
+            with open(body_path, "wb") as f:
+                f.write(body)
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"headers": _replayable_headers(response.headers)}, f)
+        self.misses += 1
+        route.fulfill(response=response, body=body)
+
+
+class BrowserPool:
+    """
+    Distribue des contextes Chromium isolés à partir d'un serveur partagé.
+
+    Usage :
+        pool = BrowserPool()
+        with pool.page() as page:
+            page.goto(url)
+        pool.release()   # dans chaque thread qui a utilisé le pool
+        pool.close()     # une fois, à la fin de l'exécution
+    """
+
+    def __init__(self, ws_endpoint: Optional[str] = None, pages_per_context: int = 50,
+                 max_rss_mb: Optional[float] = None, cache_dir: Optional[str] = None,
+                 headless: bool = True, har=None, rss_sample_seconds: float = 5.0):
+        """
+        Args:
+            ws_endpoint: Serveur Playwright à rejoindre (défaut : PLAYWRIGHT_WS_ENDPOINT)
+            pages_per_context: Pages servies avant de recycler un contexte
+            max_rss_mb: Seuil mémoire du navigateur déclenchant un recyclage.
+                La RSS n'est mesurable que pour un serveur lancé par le pool
+                (/proc) : avec PLAYWRIGHT_WS_ENDPOINT, seul pages_per_context
+                recycle les contextes
+            cache_dir: Dossier du cache disque des assets statiques
+            headless: Mode headless du serveur lancé par le pool
+            har: HarRecorder / HarReplayer appliqué à chaque contexte
+                (défaut : selon VIDIQ_RECORD_HAR_DIR / VIDIQ_REPLAY_HAR_DIR)
+            rss_sample_seconds: Intervalle minimal entre deux mesures de la
+                RSS du navigateur (une mesure parcourt /proc)
+        """
+        self.ws_endpoint = ws_endpoint or os.getenv("PLAYWRIGHT_WS_ENDPOINT") or None
+        self.pages_per_context = pages_per_context
+        self.max_rss_mb = max_rss_mb
+        self.rss_sample_seconds = rss_sample_seconds
+        self.headless = headless
+        self.asset_cache = StaticAssetCache(cache_dir) if cache_dir else None
+        self.har = har if har is not None else har_from_env()
+        if max_rss_mb is not None and (self.ws_endpoint or not os.path.isdir("/proc")):
+            print(f"[BrowserPool] ⚠ RSS du navigateur non mesurable (serveur distant ou sans /proc) : "
+                  f"max_rss_mb={max_rss_mb} ignoré, recyclage toutes les {pages_per_context} pages")
+        if self.har is not None:
+            print(f"[BrowserPool] {type(self.har).__name__} : {self.har.root}")
+
+        self._server: Optional[subprocess.Popen] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._next_rss_sample = 0.0
+        self.stats = {
+            "server_launch_seconds": 0.0,
+            "connect_seconds": 0.0,
+            "connections": 0,
+            "contexts": 0,
+            "recycled_contexts": 0,
+            "pages": 0,
+            "peak_browser_rss_mb": None,
+        }
+
+    # ------------------------------------------------------------------
+    # Serveur
+    # ------------------------------------------------------------------
+
+    def _ensure_server(self) -> str:
+        with self._lock:
+            if self.ws_endpoint:
+                return self.ws_endpoint
+
+            start = time.perf_counter()
+            config = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+            json.dump({"headless": self.headless}, config)
+            config.close()
+
+            self._server = subprocess.Popen(
+                [sys.executable, "-m", "playwright", "launch-server",
+                 "--browser", "chromium", "--config", config.name],
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            endpoint = self._server.stdout.readline().strip()
+            os.unlink(config.name)
+            if not endpoint.startswith("ws"):
+                self._server.kill()
+                raise RuntimeError(f"Serveur Playwright non démarré (sortie : {endpoint!r})")
+
+            # Le serveur peut encore écrire : un tube jamais lu finirait par le bloquer
+            threading.Thread(target=self._drain, args=(self._server.stdout,), daemon=True).start()
+            self.ws_endpoint = endpoint
+            self.stats["server_launch_seconds"] = round(time.perf_counter() - start, 3)
+            print(f"[BrowserPool] Serveur Chromium lancé : {endpoint}")
+            return endpoint
+
+    @staticmethod
+    def _drain(stream):
+        for _ in stream:
+            pass
+        stream.close()
+
+    # ------------------------------------------------------------------
+    # Contextes par thread
+    # ------------------------------------------------------------------
+
+    def _slot(self):
+        slot = getattr(self._local, "slot", None)
+        if slot is not None:
+            return slot
+
+        endpoint = self._ensure_server()
+        start = time.perf_counter()
+        playwright = sync_playwright().start()
+        browser = playwright.chromium.connect(endpoint)
+        with self._lock:
+            self.stats["connect_seconds"] += time.perf_counter() - start
+            self.stats["connections"] += 1
+
+        slot = {"playwright": playwright, "browser": browser, "context": None,
+                "page": None, "served": 0}
+        self._local.slot = slot
+        return slot
+
+    def _open_context(self, slot):
+        context = slot["browser"].new_context(**(self.har.context_options() if self.har else {}))
+        if self.asset_cache:
+            context.route("**/*", self.asset_cache.handle)
+        if self.har:
+            # Enregistré après le cache : ses handlers passent en premier
+            self.har.install(context)
+        slot["context"] = context
+        slot["page"] = context.new_page()
+        slot["served"] = 0
+        with self._lock:
+            self.stats["contexts"] += 1
+
+    def _close_context(self, slot):
+        if slot["context"] is not None:
+            try:
+                slot["context"].close()
+            except Exception as e:
+                print(f"[BrowserPool] ⚠ Fermeture contexte : {e}")
+        slot["context"] = None
+        slot["page"] = None
+
+    def _sample_rss(self) -> Optional[float]:
+        """RSS du serveur si une mesure est due (une par rss_sample_seconds), sinon None."""
+        server = self._server
+        if server is None:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_rss_sample:
+                return None
+            self._next_rss_sample = now + self.rss_sample_seconds
+        rss = _process_tree_rss_mb(server.pid)
+        if rss is not None:
+            with self._lock:
+                peak = self.stats["peak_browser_rss_mb"] or 0
+                self.stats["peak_browser_rss_mb"] = round(max(peak, rss), 1)
+        return rss
+
+    @contextmanager
+    def page(self):
+        """Fournit la page du contexte courant du thread, recyclé si nécessaire."""
+        slot = self._slot()
+        if slot["context"] is None:
+            self._open_context(slot)
+        try:
+            yield slot["page"]
+        finally:
+            slot["served"] += 1
+            with self._lock:
+                self.stats["pages"] += 1
+
+            rss = self._sample_rss()
+            too_big = self.max_rss_mb is not None and rss is not None and rss > self.max_rss_mb
+            if slot["served"] >= self.pages_per_context or too_big:
+                self._close_context(slot)
+                with self._lock:
+                    self.stats["recycled_contexts"] += 1
+
+    def release(self):
+        """Ferme le contexte et la connexion du thread appelant."""
+        slot = getattr(self._local, "slot", None)
+        if slot is None:
+            return
+        self._close_context(slot)
+        try:
+            slot["browser"].close()
+        finally:
+            slot["playwright"].stop()
+            self._local.slot = None
+
+    def close(self):
+        """Libère le thread courant et arrête le serveur lancé par le pool."""
+        self.release()
+        if self._server is not None:
+            self._server.terminate()
+            try:
+                self._server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._server.kill()
+            self._server = None
+
+    # ------------------------------------------------------------------
+    # Rapport
+    # ------------------------------------------------------------------
+
+    def report(self) -> Dict:
+        """Coût de lancement, contextes servis et pic mémoire de l'exécution."""
+        report = dict(self.stats)
+        report["connect_seconds"] = round(report["connect_seconds"], 3)
+        report["peak_python_rss_mb"] = round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        )
+        if self.asset_cache:
+            report["asset_cache_hits"] = self.asset_cache.hits
+            report["asset_cache_misses"] = self.asset_cache.misses
+        if getattr(self.har, "stats", None):
+            report.update({f"replay_{key}": value for key, value in self.har.stats.items()})
+        return report
+
+    def print_report(self):
+        print("\n[BrowserPool] Rapport navigateur")
+        for key, value in self.report().items():
+            print(f"  {key:<24} {value}")
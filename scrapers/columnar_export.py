@@ -0,0 +1,255 @@
+"""
+Export colonnaire (Parquet) des chaînes enrichies, en plus du CSV.
+
+- colonnes typées, schéma stable (ordre fixe, mêmes types à chaque export)
+- montants, durées et pourcentages déjà convertis en nombres
+- compression zstd, écriture en flux par row groups (mémoire bornée)
+- partitionné par date de scraping (scraped_at de chaque ligne) :
+    data/enriched/parquet/scrape_date=YYYY-MM-DD/channels_enriched.parquet
+- relu avec memory mapping (read_enriched)
+
+    python -m scrapers.columnar_export --compare
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from scrapers.vidiq_enrich import (
+    ENRICHED_CSV_PATH,
+    ENRICHED_DIR,
+    _to_int,
+    parse_duration_seconds,
+    parse_earnings_range,
+    parse_percent,
+)
+
+
+PARQUET_DIR = os.path.join(ENRICHED_DIR, "parquet")
+PARQUET_FILENAME = "channels_enriched.parquet"
+
+LIST_MEMBERSHIP = pa.struct([("list", pa.string()), ("rank", pa.int32())])
+
+SCHEMA = pa.schema([
+    ("rank", pa.int32()),
+    ("channel_name", pa.string()),
+    ("channel_url", pa.string()),
+    ("videos", pa.int64()),
+    ("subscribers", pa.int64()),
+    ("total_views", pa.int64()),
+    ("estimated_monthly_earnings", pa.string()),
+    ("earnings_monthly_low", pa.float64()),
+    ("earnings_monthly_high", pa.float64()),
+    ("avg_video_duration", pa.string()),
+    ("avg_video_duration_seconds", pa.int32()),
+    ("subscribers_gained", pa.string()),
+    ("upload_frequency", pa.string()),
+    ("engagement_rate", pa.string()),
+    ("engagement_rate_pct", pa.float64()),
+    ("lists", pa.list_(LIST_MEMBERSHIP)),
+    ("retries", pa.int16()),
+    ("failure_classes", pa.list_(pa.string())),
+    ("failure_class", pa.string()),
+    ("error", pa.string()),
+    ("scraped_at", pa.timestamp("us", tz="UTC")),
+    ("enriched_at", pa.timestamp("us", tz="UTC")),
+])
+
+
+def _to_timestamp(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def to_record(row: Dict) -> Dict:
+    """Convertit une ligne enrichie (dict Python ou ligne CSV) au schéma colonnaire."""
+    low, high = parse_earnings_range(row.get("estimated_monthly_earnings"))
+    lists = row.get("lists") or []
+    if isinstance(lists, str):
+        lists = json.loads(lists)
+    failure_classes = row.get("failure_classes") or []
+    if isinstance(failure_classes, str):
+        failure_classes = json.loads(failure_classes)
+
+    return {
+        "rank": _to_int(row.get("rank")),
+        "channel_name": row.get("channel_name") or None,
+        "channel_url": row.get("channel_url") or None,
+        "videos": _to_int(row.get("videos")),
+        "subscribers": _to_int(row.get("subscribers")),
+        "total_views": _to_int(row.get("total_views")),
+        "estimated_monthly_earnings": row.get("estimated_monthly_earnings") or None,
+        "earnings_monthly_low": low,
+        "earnings_monthly_high": high,
+        "avg_video_duration": row.get("avg_video_duration") or None,
+        "avg_video_duration_seconds": parse_duration_seconds(row.get("avg_video_duration")),
+        "subscribers_gained": row.get("subscribers_gained") or None,
+        "upload_frequency": row.get("upload_frequency") or None,
+        "engagement_rate": row.get("engagement_rate") or None,
+        "engagement_rate_pct": parse_percent(row.get("engagement_rate")),
+        "lists": lists,
+        "retries": _to_int(row.get("retries")),
+        "failure_classes": failure_classes,
+        "failure_class": row.get("failure_class") or None,
+        "error": row.get("error") or None,
+        "scraped_at": _to_timestamp(row.get("scraped_at")),
+        "enriched_at": _to_timestamp(row.get("enriched_at")),
+    }
+
+
+def partition_path(scrape_date: str, root: str = PARQUET_DIR) -> str:
+    return os.path.join(root, f"scrape_date={scrape_date}", PARQUET_FILENAME)
+
+
+def export_parquet(rows: Iterable[Dict], scrape_date: Optional[str] = None,
+                   root: str = PARQUET_DIR, row_group_size: int = 50_000) -> List[str]:
+    """
+    Écrit les chaînes enrichies en Parquet, un row group à la fois.
+
+    Chaque ligne va dans la partition de la date (UTC) de son scraped_at :
+    un export qui mélange des listes scrapées à des jours différents
+    produit une partition par jour.
+
+    Args:
+        rows: Lignes enrichies (liste ou générateur)
+        scrape_date: Partition YYYY-MM-DD imposée à toutes les lignes
+                     (défaut : date du scraped_at de chaque ligne,
+                     aujourd'hui si elle manque)
+        root: Dossier racine des partitions
+        row_group_size: Lignes gardées en mémoire par partition avant écriture
+
+    Returns:
+        Chemins des fichiers écrits (vide si aucune ligne)
+    """
+    today = datetime.now(timezone.utc).date().isoformat()
+    writers: Dict[str, pq.ParquetWriter] = {}
+    batches: Dict[str, List[Dict]] = {}
+
+    def flush(partition):
+        if partition not in writers:
+            path = partition_path(partition, root)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            writers[partition] = pq.ParquetWriter(f"{path}.tmp", SCHEMA, compression="zstd")
+        writers[partition].write_batch(pa.RecordBatch.from_pylist(batches.pop(partition), schema=SCHEMA))
+
+    try:
+        for row in rows:
+            record = to_record(row)
+            scraped_at = record["scraped_at"]
+            partition = scrape_date or (
+                scraped_at.astimezone(timezone.utc).date().isoformat() if scraped_at else today
+            )
+            batch = batches.setdefault(partition, [])
+            batch.append(record)
+            if len(batch) >= row_group_size:
+                flush(partition)
+        for partition in list(batches):
+            flush(partition)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    paths = []
+    for partition in sorted(writers):
+        path = partition_path(partition, root)
+        os.replace(f"{path}.tmp", path)
+        paths.append(path)
+    return paths
+
+
+def read_enriched(scrape_date: Optional[str] = None, root: str = PARQUET_DIR,
+                  columns: Optional[List[str]] = None) -> pa.Table:
+    """
+    Relit une partition (ou toutes si scrape_date est None) avec memory mapping.
+    """
+    path = partition_path(scrape_date, root) if scrape_date else root
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+
+def iter_csv_rows(path: str = ENRICHED_CSV_PATH) -> Iterator[Dict]:
+    with open(path, mode="r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def compare(csv_path: str = ENRICHED_CSV_PATH, root: str = PARQUET_DIR) -> Dict:
+    """
+    Compare taille et temps de chargement typé : CSV (relu + reconverti à
+    chaque chargement) contre Parquet (memory mapping).
+
+    Raises:
+        ValueError: CSV absent ou sans lignes, ou Parquet relu incomplet
+    """
+    try:
+        csv_bytes = os.path.getsize(csv_path)
+    except OSError as e:
+        raise ValueError(f"CSV enrichi introuvable ({csv_path}) : lancer d'abord vidiq_enrich") from e
+
+    paths = export_parquet(iter_csv_rows(csv_path), scrape_date="compare", root=root)
+    if not paths:
+        raise ValueError(f"CSV enrichi vide ({csv_path}) : rien à comparer")
+    parquet_path = paths[0]
+
+    try:
+        start = time.perf_counter()
+        csv_rows = [to_record(row) for row in iter_csv_rows(csv_path)]
+        csv_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        table = pq.read_table(parquet_path, memory_map=True)
+        parquet_seconds = time.perf_counter() - start
+
+        result = {
+            "rows": len(csv_rows),
+            "csv_bytes": csv_bytes,
+            "parquet_bytes": os.path.getsize(parquet_path),
+            "csv_load_seconds": round(csv_seconds, 4),
+            "parquet_load_seconds": round(parquet_seconds, 4),
+        }
+    finally:
+        os.remove(parquet_path)
+        os.rmdir(os.path.dirname(parquet_path))
+    if table.num_rows != result["rows"]:
+        raise ValueError(f"Parquet relu incomplet : {table.num_rows} lignes sur {result['rows']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Parquet des chaînes enrichies")
+    parser.add_argument("--csv", default=ENRICHED_CSV_PATH, help="CSV enrichi source")
+    parser.add_argument("--scrape-date", default=None, help="Partition YYYY-MM-DD")
+    parser.add_argument("--compare", action="store_true",
+                        help="Comparer taille et temps de chargement CSV / Parquet")
+    args = parser.parse_args()
+
+    if args.compare:
+        try:
+            result = compare(args.csv)
+        except ValueError as e:
+            print(f"[Parquet] ✗ {e}")
+            return 1
+        print(f"{'format':<10}{'octets':>14}{'chargement (s)':>18}")
+        print(f"{'CSV':<10}{result['csv_bytes']:>14}{result['csv_load_seconds']:>18.4f}")
+        print(f"{'Parquet':<10}{result['parquet_bytes']:>14}{result['parquet_load_seconds']:>18.4f}")
+        print(f"{result['rows']} lignes")
+        return 0
+
+    for path in export_parquet(iter_csv_rows(args.csv), args.scrape_date):
+        print(f"Parquet exporté : {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
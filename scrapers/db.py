@@ -4,7 +4,9 @@ Utilisé par tous les scrapers et services.
 """
 
 import os
-from pymongo import MongoClient
+import uuid
+from datetime import datetime, timezone
+from pymongo import MongoClient, ASCENDING, DESCENDING, IndexModel
 
 
 def get_db():
@@ -39,3 +41,45 @@ def get_db():
     client.admin.command("ping")  # Vérifie la connexion immédiatement
     
     return client[mongo_db]
+
+
+# Index de base des collections de chaînes
+CHANNEL_INDEXES = [
+    IndexModel(
+        [("channel_url", ASCENDING)],
+        name="channel_url_unique",
+        unique=True,
+        partialFilterExpression={"channel_url": {"$type": "string"}},
+    ),
+    IndexModel([("rank", ASCENDING)], name="rank"),
+    IndexModel([("subscribers", DESCENDING)], name="subscribers"),
+    IndexModel([("total_views", DESCENDING)], name="total_views"),
+    IndexModel([("videos", DESCENDING)], name="videos"),
+]
+
+
+def ensure_indexes(collection):
+    """Crée les index de base d'une collection de chaînes (idempotent)."""
+    return collection.create_indexes(CHANNEL_INDEXES)
+
+
+def stamp_data_version(db, source: str) -> str:
+    """
+    Enregistre une nouvelle version des données dans la collection `meta`.
+
+    Les lecteurs (application web) s'en servent pour savoir quand recharger.
+
+    Returns:
+        Identifiant de la nouvelle version
+    """
+    version = uuid.uuid4().hex
+    db["meta"].update_one(
+        {"_id": "data_version"},
+        {"$set": {
+            "version": version,
+            "source": source,
+            "updated_at": datetime.now(timezone.utc),
+        }},
+        upsert=True,
+    )
+    return version
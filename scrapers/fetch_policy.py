@@ -0,0 +1,221 @@
+"""
+Politique de récupération des pages : classification des échecs,
+retries avec backoff exponentiel + jitter, budget de retries et
+disjoncteur global.
+
+Classes d'échec :
+- timeout      : délai Playwright dépassé (navigation, sélecteur)
+- throttled    : HTTP 429
+- server_error : HTTP 5xx
+- client_error : autre HTTP 4xx (non rejoué)
+- parse_miss   : page chargée mais aucune donnée reconnue (non rejoué)
+- error        : toute autre exception
+"""
+
+import time
+import random
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+
+TIMEOUT = "timeout"
+THROTTLED = "throttled"
+SERVER_ERROR = "server_error"
+CLIENT_ERROR = "client_error"
+PARSE_MISS = "parse_miss"
+OTHER = "error"
+
+RETRYABLE = {TIMEOUT, THROTTLED, SERVER_ERROR, OTHER}
+# Page servie normalement mais sans donnée reconnue : ni rejouée, ni
+# comptée comme un échec par le disjoncteur (le site répond bien)
+BREAKER_NEUTRAL = {PARSE_MISS}
+
+
+class FetchError(Exception):
+    """Échec classé d'une récupération de page."""
+
+    def __init__(self, failure_class: str, message: str = "",
+                 retry_after: Optional[float] = None, payload: Any = None):
+        super().__init__(message or failure_class)
+        self.failure_class = failure_class
+        self.retry_after = retry_after
+        # Résultat partiel (ex. page chargée mais parse_miss)
+        self.payload = payload
+
+
+class FetchFailed(Exception):
+    """Levée quand tous les essais ont échoué (ou que le budget est épuisé)."""
+
+    def __init__(self, last_error: Exception, meta: Dict):
+        super().__init__(str(last_error))
+        self.last_error = last_error
+        self.meta = meta
+        self.failure_class = classify(last_error)
+        self.payload = getattr(last_error, "payload", None)
+
+
+def classify(error: Exception) -> str:
+    """Retourne la classe d'échec d'une exception."""
+    if isinstance(error, FetchError):
+        return error.failure_class
+    if isinstance(error, PlaywrightTimeoutError):
+        return TIMEOUT
+    return OTHER
+
+
+def check_response(response):
+    """Lève une FetchError classée si la réponse HTTP n'est pas exploitable."""
+    if response is None or response.status < 400:
+        return
+
+    status = response.status
+    retry_after = None
+    header = response.headers.get("retry-after")
+    if header and header.isdigit():
+        retry_after = float(header)
+
+    if status == 429:
+        raise FetchError(THROTTLED, f"HTTP 429 sur {response.url}", retry_after)
+    if status >= 500:
+        raise FetchError(SERVER_ERROR, f"HTTP {status} sur {response.url}", retry_after)
+    raise FetchError(CLIENT_ERROR, f"HTTP {status} sur {response.url}")
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur partagé par tous les workers.
+
+    Si le taux d'erreur sur les `window` dernières requêtes dépasse
+    `error_rate`, le circuit s'ouvre : toutes les requêtes attendent
+    `cooldown` secondes. Un échec juste après réouverture double la pause
+    (plafonnée à `max_cooldown`), un succès la réinitialise.
+    """
+
+    def __init__(self, window: int = 20, min_samples: int = 10, error_rate: float = 0.5,
+                 cooldown: float = 60.0, max_cooldown: float = 900.0):
+        self.window = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.error_rate = error_rate
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.open_until = 0.0
+        self.half_open = False
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Bloque tant que le circuit est ouvert."""
+        with self._lock:
+            delay = self.open_until - time.monotonic()
+        if delay > 0:
+            print(f"[FetchPolicy] Circuit ouvert, pause globale de {delay:.0f}s")
+            time.sleep(delay)
+
+    def record(self, success: bool):
+        with self._lock:
+            now = time.monotonic()
+            if self.half_open and now >= self.open_until:
+                self.half_open = False
+                if success:
+                    self.cooldown = self.base_cooldown
+                else:
+                    self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                    self._trip(now)
+                    return
+
+            self.window.append(success)
+            failures = self.window.count(False)
+            if (len(self.window) >= self.min_samples
+                    and failures / len(self.window) >= self.error_rate):
+                self._trip(now)
+
+    def _trip(self, now: float):
+        self.open_until = now + self.cooldown
+        self.half_open = True
+        self.trips += 1
+        self.window.clear()
+
+
+class RetryBudget:
+    """Limite les retries à une fraction des requêtes (plus une réserve fixe)."""
+
+    def __init__(self, ratio: float = 0.2, reserve: int = 10):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.requests = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.retries >= self.reserve + self.ratio * self.requests:
+                return False
+            self.retries += 1
+            return True
+
+
+class FetchPolicy:
+    """Exécute une récupération selon la politique de retry et le disjoncteur."""
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 2.0, max_delay: float = 60.0,
+                 budget: Optional[RetryBudget] = None, breaker: Optional[CircuitBreaker] = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """Backoff exponentiel « full jitter », ou Retry-After si fourni."""
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def run(self, fetch: Callable[[], Any]) -> Tuple[Any, Dict]:
+        """
+        Appelle `fetch` jusqu'à réussite.
+
+        Returns:
+            (résultat, meta) avec meta = {"retries", "failure_classes"}
+
+        Raises:
+            FetchFailed: après le dernier essai, un échec non rejouable ou
+                l'épuisement du budget de retries
+        """
+        failure_classes: List[str] = []
+        self.budget.record_request()
+
+        for attempt in range(self.max_attempts):
+            self.breaker.wait()
+            try:
+                result = fetch()
+            except Exception as e:
+                failure_class = classify(e)
+                failure_classes.append(failure_class)
+                if failure_class not in BREAKER_NEUTRAL:
+                    self.breaker.record(False)
+
+                meta = {"retries": attempt, "failure_classes": failure_classes}
+                if (failure_class not in RETRYABLE
+                        or attempt + 1 >= self.max_attempts
+                        or not self.budget.take()):
+                    raise FetchFailed(e, meta) from e
+
+                delay = self.backoff(attempt, e)
+                print(f"[FetchPolicy] {failure_class} ({e}) → nouvel essai dans {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self.breaker.record(True)
+            return result, {"retries": attempt, "failure_classes": failure_classes}
+
+        raise AssertionError("unreachable")
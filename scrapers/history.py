@@ -0,0 +1,63 @@
+"""
+Historique des métriques des chaînes (collection time-series Mongo).
+
+Les upserts de channels_top100 / channels_enriched écrasent les compteurs ;
+chaque scraping de classement ajoute donc aussi un point par chaîne dans
+`channel_metrics` (timeField "ts", metaField "channel_url"). Mongo stocke
+ces points en buckets compressés, et l'index (channel_url, ts) sert les
+requêtes par plage de dates de l'application web.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from pymongo import ASCENDING
+from pymongo.errors import CollectionInvalid
+
+
+HISTORY_COLLECTION = "channel_metrics"
+HISTORY_METRICS = ("rank", "subscribers", "total_views", "videos")
+
+
+def ensure_history_collection(db):
+    """Crée la collection time-series et son index si besoin (idempotent)."""
+    if HISTORY_COLLECTION not in db.list_collection_names():
+        try:
+            db.create_collection(
+                HISTORY_COLLECTION,
+                timeseries={
+                    "timeField": "ts",
+                    "metaField": "channel_url",
+                    "granularity": "hours",
+                },
+            )
+        except CollectionInvalid:
+            # Créée entre-temps par un autre processus
+            pass
+    collection = db[HISTORY_COLLECTION]
+    collection.create_index([("channel_url", ASCENDING), ("ts", ASCENDING)])
+    return collection
+
+
+def append_snapshots(db, channels: Iterable[Dict], ts: Optional[datetime] = None) -> int:
+    """
+    Ajoute un point d'historique par chaîne (avec URL).
+
+    Returns:
+        Nombre de points insérés
+    """
+    ts = ts or datetime.utcnow()
+    points = []
+    for channel in channels:
+        if not channel.get("channel_url"):
+            continue
+        point = {"ts": ts, "channel_url": channel["channel_url"]}
+        for metric in HISTORY_METRICS:
+            if channel.get(metric) is not None:
+                point[metric] = channel[metric]
+        points.append(point)
+
+    if not points:
+        return 0
+    ensure_history_collection(db).insert_many(points, ordered=False)
+    return len(points)
@@ -0,0 +1,388 @@
+"""
+File de jobs d'enrichissement dans Mongo (collection `enrich_jobs`).
+
+Chaque chaîne devient un job (_id = channel_url). N'importe quel nombre de
+processus ou de conteneurs workers se partagent la file :
+- réservation atomique par find_one_and_update (bail = lease avec échéance)
+- heartbeat pendant le traitement pour prolonger le bail
+- un bail expiré (worker mort) est repris par un autre worker
+- après max_attempts tentatives, le job passe en dead-letter (`dead`)
+
+    python -m scrapers.job_queue enqueue
+    python -m scrapers.job_queue work --exit-when-empty    # x N processus
+    python -m scrapers.job_queue status
+    python -m scrapers.job_queue requeue-dead
+
+En Docker : docker compose --profile workers up --scale worker=4
+"""
+
+import os
+import sys
+import signal
+import socket
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from scrapers.db import get_db, stamp_data_version
+from scrapers.archive import PageArchive
+from scrapers.browser_pool import BrowserPool
+from scrapers.fetch_policy import FetchPolicy, OTHER, PARSE_MISS
+from scrapers.prerender import trigger_prerender
+import scrapers.vidiq_enrich as vidiq_enrich
+
+
+JOBS_COLLECTION = "enrich_jobs"
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+
+DUPLICATE_KEY = 11000
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def ensure_job_indexes(collection):
+    """Index utilisés par la réservation et le ramassage des baux expirés."""
+    collection.create_index(
+        [("state", ASCENDING), ("available_at", ASCENDING), ("priority", ASCENDING)],
+        name="claim",
+    )
+    collection.create_index(
+        [("state", ASCENDING), ("lease_expires_at", ASCENDING)],
+        name="lease_expiry",
+    )
+
+
+def enqueue(collection, channels: Iterable[Dict], max_attempts: int = 5) -> int:
+    """
+    Crée (ou remet en attente) un job par chaîne.
+
+    Les jobs en cours de traitement ne sont pas touchés : ils se
+    terminent avec les données déjà réservées.
+
+    Returns:
+        Nombre de jobs mis en attente
+    """
+    ensure_job_indexes(collection)
+    now = _now()
+    ops = []
+    for channel in channels:
+        channel_url = channel.get("channel_url")
+        if not channel_url:
+            continue
+        channel = {k: v for k, v in channel.items() if k != "_id"}
+        if isinstance(channel.get("scraped_at"), datetime):
+            channel["scraped_at"] = channel["scraped_at"].isoformat()
+        ops.append(UpdateOne(
+            {"_id": channel_url, "state": {"$ne": LEASED}},
+            {"$set": {
+                "channel": channel,
+                "state": PENDING,
+                "priority": channel.get("rank") or 0,
+                "attempts": 0,
+                "max_attempts": max_attempts,
+                "available_at": now,
+                "enqueued_at": now,
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "last_error": None,
+            }},
+            upsert=True,
+        ))
+    if not ops:
+        return 0
+
+    try:
+        result = collection.bulk_write(ops, ordered=False)
+        return result.upserted_count + result.modified_count
+    except BulkWriteError as e:
+        # Clé dupliquée = job en cours (filtre non satisfait -> tentative d'insertion)
+        others = [err for err in e.details["writeErrors"] if err["code"] != DUPLICATE_KEY]
+        if others:
+            raise
+        return e.details["nUpserted"] + e.details["nModified"]
+
+
+def reap_expired(collection) -> int:
+    """Passe en dead-letter les baux expirés qui ont épuisé leurs tentatives."""
+    now = _now()
+    result = collection.update_many(
+        {
+            "state": LEASED,
+            "lease_expires_at": {"$lt": now},
+            "$expr": {"$gte": ["$attempts", "$max_attempts"]},
+        },
+        {"$set": {
+            "state": DEAD,
+            "lease_owner": None,
+            "last_error": "bail expiré après la dernière tentative",
+            "dead_at": now,
+        }},
+    )
+    return result.modified_count
+
+
+def claim(collection, worker_id: str, lease_seconds: float) -> Optional[Dict]:
+    """
+    Réserve atomiquement le prochain job : en attente et disponible, ou
+    réservé par un worker dont le bail a expiré.
+    """
+    now = _now()
+    return collection.find_one_and_update(
+        {"$or": [
+            {"state": PENDING, "available_at": {"$lte": now}},
+            {"state": LEASED, "lease_expires_at": {"$lt": now},
+             "$expr": {"$lt": ["$attempts", "$max_attempts"]}},
+        ]},
+        {
+            "$set": {
+                "state": LEASED,
+                "lease_owner": worker_id,
+                "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                "heartbeat_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("priority", ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def heartbeat(collection, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+    """Prolonge le bail ; False si le job a été repris par un autre worker."""
+    now = _now()
+    result = collection.update_one(
+        {"_id": job_id, "state": LEASED, "lease_owner": worker_id},
+        {"$set": {
+            "lease_expires_at": now + timedelta(seconds=lease_seconds),
+            "heartbeat_at": now,
+        }},
+    )
+    return result.matched_count == 1
+
+
+def complete(collection, job_id: str, worker_id: str) -> bool:
+    result = collection.update_one(
+        {"_id": job_id, "state": LEASED, "lease_owner": worker_id},
+        {"$set": {"state": DONE, "done_at": _now(), "lease_owner": None,
+                  "lease_expires_at": None}},
+    )
+    return result.matched_count == 1
+
+
+def fail(collection, job: Dict, worker_id: str, error: str,
+         base_delay: float = 60.0, retry: bool = True) -> str:
+    """
+    Remet le job en attente avec un délai croissant, ou le passe en
+    dead-letter si les tentatives sont épuisées (ou si retry est False).
+
+    Returns:
+        Nouvel état du job
+    """
+    now = _now()
+    if not retry or job["attempts"] >= job["max_attempts"]:
+        update = {"state": DEAD, "dead_at": now}
+    else:
+        delay = base_delay * 2 ** (job["attempts"] - 1)
+        update = {"state": PENDING, "available_at": now + timedelta(seconds=delay)}
+    update.update({"lease_owner": None, "lease_expires_at": None, "last_error": error})
+    collection.update_one(
+        {"_id": job["_id"], "state": LEASED, "lease_owner": worker_id},
+        {"$set": update},
+    )
+    return update["state"]
+
+
+def requeue_dead(collection) -> int:
+    result = collection.update_many(
+        {"state": DEAD},
+        {"$set": {"state": PENDING, "attempts": 0, "available_at": _now()}},
+    )
+    return result.modified_count
+
+
+def queue_status(collection) -> Dict[str, int]:
+    counts = {state: 0 for state in (PENDING, LEASED, DONE, DEAD)}
+    for row in collection.aggregate([{"$group": {"_id": "$state", "count": {"$sum": 1}}}]):
+        counts[row["_id"]] = row["count"]
+    return counts
+
+
+class _Heartbeat(threading.Thread):
+    """Prolonge le bail du job en cours tant que le traitement dure."""
+
+    def __init__(self, collection, job_id: str, worker_id: str, lease_seconds: float):
+        super().__init__(daemon=True, name=f"heartbeat-{job_id}")
+        self.collection = collection
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        while not self.stopped.wait(self.lease_seconds / 3):
+            if not heartbeat(self.collection, self.job_id, self.worker_id, self.lease_seconds):
+                self.lost = True
+                print(f"[JobWorker] ⚠ Bail perdu : {self.job_id}")
+                return
+
+
+class JobWorker:
+    """Worker d'enrichissement alimenté par la file enrich_jobs."""
+
+    def __init__(self, worker_id: Optional[str] = None, lease_seconds: float = 120,
+                 poll_seconds: float = 5, exit_when_empty: bool = False,
+                 retry_delay: float = 60.0, archive: Optional[PageArchive] = None,
+                 pool: Optional[BrowserPool] = None, policy: Optional[FetchPolicy] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.exit_when_empty = exit_when_empty
+        self.retry_delay = retry_delay
+        self.archive = archive
+        self.pool = pool or BrowserPool()
+        self.policy = policy or FetchPolicy()
+
+        self.db = get_db()
+        self.jobs = self.db[JOBS_COLLECTION]
+        self.stop = threading.Event()
+        self.stats = {"done": 0, "retried": 0, "dead": 0, "lost": 0}
+
+    def process(self, job: Dict):
+        url = job["_id"]
+        ch = dict(job["channel"])
+        print(f"[JobWorker {self.worker_id}] rank {ch.get('rank')} {url} "
+              f"(tentative {job['attempts']}/{job['max_attempts']})")
+
+        beat = _Heartbeat(self.jobs, url, self.worker_id, self.lease_seconds)
+        beat.start()
+        try:
+            with self.pool.page() as page:
+                doc = vidiq_enrich.enrich_channel(page, ch, self.archive, self.policy)
+        except Exception as e:
+            doc = {**ch, "failure_class": OTHER, "error": str(e)}
+        finally:
+            beat.stopped.set()
+            beat.join()
+
+        if beat.lost:
+            # Repris par un autre worker : son résultat fera foi
+            self.stats["lost"] += 1
+            return
+
+        failure_class = doc.get("failure_class")
+        if failure_class:
+            # Échec : l'enrichissement déjà stocké reste en place. parse_miss
+            # (page chargée mais sans label) passe directement en dead-letter :
+            # la retenter ne changera rien avant une correction du parseur
+            vidiq_enrich.record_failure(doc, self.db["channels_enriched"])
+            state = fail(self.jobs, job, self.worker_id, doc.get("error") or failure_class,
+                         self.retry_delay, retry=failure_class != PARSE_MISS)
+            self.stats["dead" if state == DEAD else "retried"] += 1
+            return
+
+        vidiq_enrich.upsert_mongo([dict(doc)], self.db["channels_enriched"])
+        if complete(self.jobs, url, self.worker_id):
+            self.stats["done"] += 1
+
+    def run(self) -> Dict[str, int]:
+        print(f"[JobWorker {self.worker_id}] Démarrage (bail {self.lease_seconds:.0f}s)")
+        stamped = 0
+        try:
+            while not self.stop.is_set():
+                reap_expired(self.jobs)
+                job = claim(self.jobs, self.worker_id, self.lease_seconds)
+                if job is not None:
+                    try:
+                        self.process(job)
+                    finally:
+                        vidiq_enrich.polite_pause()
+                    continue
+
+                # File vide : publier ce qui a été fait, puis attendre ou sortir
+                if self.stats["done"] != stamped:
+                    stamp_data_version(self.db, source="job_queue")
+                    trigger_prerender(wait=False)
+                    stamped = self.stats["done"]
+                status = queue_status(self.jobs)
+                if self.exit_when_empty and not status[PENDING] and not status[LEASED]:
+                    break
+                self.stop.wait(self.poll_seconds)
+        finally:
+            self.pool.close()
+            if self.stats["done"] != stamped:
+                stamp_data_version(self.db, source="job_queue")
+                trigger_prerender(wait=False)
+        print(f"[JobWorker {self.worker_id}] Arrêt : {self.stats}")
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="File de jobs d'enrichissement (Mongo)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_enqueue = sub.add_parser("enqueue", help="Créer un job par chaîne de channels_top100")
+    p_enqueue.add_argument("--limit", type=int, default=None, help="Limiter le nombre de chaînes")
+    p_enqueue.add_argument("--max-attempts", type=int, default=5,
+                           help="Tentatives avant dead-letter")
+
+    p_work = sub.add_parser("work", help="Lancer un worker")
+    p_work.add_argument("--lease-seconds", type=float, default=120, help="Durée du bail")
+    p_work.add_argument("--poll-seconds", type=float, default=5, help="Attente si la file est vide")
+    p_work.add_argument("--retry-delay", type=float, default=60,
+                        help="Délai avant la 2e tentative (doublé ensuite)")
+    p_work.add_argument("--exit-when-empty", action="store_true",
+                        help="S'arrêter quand plus aucun job n'est en attente ou en cours")
+    p_work.add_argument("--archive", action="store_true",
+                        help="Archiver les pages visitées (data/archive)")
+
+    sub.add_parser("status", help="Nombre de jobs par état")
+    sub.add_parser("requeue-dead", help="Remettre les jobs dead-letter en attente")
+
+    args = parser.parse_args()
+    jobs = get_db()[JOBS_COLLECTION]
+
+    if args.command == "enqueue":
+        cursor = jobs.database["channels_top100"].find(
+            {"channel_url": {"$type": "string"}}, sort=[("rank", ASCENDING)]
+        )
+        if args.limit:
+            cursor = cursor.limit(args.limit)
+        count = enqueue(jobs, cursor, args.max_attempts)
+        print(f"[JobQueue] {count} jobs en attente")
+    elif args.command == "work":
+        worker = JobWorker(
+            lease_seconds=args.lease_seconds,
+            poll_seconds=args.poll_seconds,
+            exit_when_empty=args.exit_when_empty,
+            retry_delay=args.retry_delay,
+            archive=PageArchive() if args.archive else None,
+        )
+
+        def shutdown(signum, frame):
+            print(f"\n[JobWorker] Signal {signum} reçu, arrêt après le job en cours...")
+            worker.stop.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        worker.run()
+    elif args.command == "status":
+        for state, count in queue_status(jobs).items():
+            print(f"  {state:<8} {count}")
+    elif args.command == "requeue-dead":
+        print(f"[JobQueue] {requeue_dead(jobs)} jobs remis en attente")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""
+Pipeline scraping -> enrichissement en flux.
+
+Au lieu d'attendre la fin de la Phase 1 puis de relire le CSV raw,
+le scraper Top 100 pousse chaque chaîne dans une file bornée dès que
+son URL est résolue, et des workers d'enrichissement la consomment
+immédiatement. Les deux phases se chevauchent.
+
+Les sorties restent les mêmes :
+- collection channels_top100 + data/raw/channels_top100.csv
+- collection channels_enriched + data/enriched/channels_enriched.csv
+"""
+
+import copy
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from scrapers.db import get_db, stamp_data_version
+from scrapers.history import append_snapshots
+from scrapers.archive import PageArchive
+from scrapers.browser_pool import BrowserPool
+from scrapers.fetch_policy import FetchPolicy, OTHER
+from scrapers.telemetry import RunTelemetry
+from scrapers.vidiq_playwright_parser import VidIQPlaywrightParser, DEFAULT_LIST_URL
+from scrapers.vidiq_scraper import store_channel, export_raw_csv, prune_stale
+import scrapers.vidiq_enrich as vidiq_enrich
+from scrapers.columnar_export import export_parquet
+
+
+# Marqueur de fin de flux envoyé à chaque worker
+_END = object()
+
+# Attente max d'une place dans la file avant de vérifier que des workers vivent encore
+PUT_TIMEOUT_SECONDS = 1.0
+
+
+class NoConsumerLeft(RuntimeError):
+    """Tous les workers d'enrichissement sont arrêtés : la file ne se videra plus."""
+
+
+def _put(out: "queue.Queue", item, consumers: List[threading.Thread]):
+    """put() bloquant, mais abandonné si plus aucun worker ne consomme."""
+    while True:
+        try:
+            out.put(item, timeout=PUT_TIMEOUT_SECONDS)
+            return
+        except queue.Full:
+            if not any(t.is_alive() for t in consumers):
+                raise NoConsumerLeft("Plus aucun worker d'enrichissement actif")
+
+
+class StageTimer:
+    """Mesure le temps mural (début / fin) de chaque étape du pipeline."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.starts: Dict[str, float] = {}
+        self.ends: Dict[str, float] = {}
+
+    def start(self, stage: str):
+        with self._lock:
+            self.starts.setdefault(stage, time.perf_counter())
+
+    def stop(self, stage: str):
+        with self._lock:
+            self.ends[stage] = time.perf_counter()
+
+    def durations(self) -> Dict[str, float]:
+        return {
+            stage: round(self.ends.get(stage, start) - start, 2)
+            for stage, start in self.starts.items()
+        }
+
+
+def _produce(urls: List[str], max_pages: Optional[int], pool: BrowserPool,
+             policy: FetchPolicy, out: "queue.Queue", raw: List[Dict], timer: StageTimer, workers: int,
+             limit: Optional[int], errors: List[str], telemetry: RunTelemetry,
+             consumers: List[threading.Thread]):
+    """Phase 1 : scrape les classements et alimente la file au fil de l'eau."""
+    timer.start("scrape")
+    try:
+        collection = get_db()["channels_top100"]
+        scraped_at = datetime.utcnow()
+        completed: List[str] = []
+
+        for channel in VidIQPlaywrightParser.iter_lists(urls, max_pages=max_pages, pool=pool,
+                                                       policy=policy, telemetry=telemetry,
+                                                       completed=completed):
+            channel["scraped_at"] = scraped_at
+            with telemetry.span("write", channel.get("channel_url")):
+                store_channel(collection, channel)
+            raw.append(channel)
+
+            # put() bloque si la file est pleine : les workers imposent le rythme.
+            # Copie profonde : iter_lists complète encore `lists` en place
+            _put(out, copy.deepcopy(channel), consumers)
+
+            if limit and len(raw) >= limit:
+                break
+
+        if raw:
+            with telemetry.span("write"):
+                # Réécrit les chaînes avec la liste complète des classements où elles
+                # apparaissent (connue seulement une fois tous les classements lus)
+                if len(urls) > 1:
+                    for channel in raw:
+                        store_channel(collection, channel)
+                if not limit and len(completed) == len(set(urls)):
+                    prune_stale(collection, scraped_at, completed)
+                elif not limit:
+                    print(f"[Pipeline] ⚠ {len(set(urls)) - len(completed)} classement(s) "
+                          f"incomplet(s) : aucune suppression")
+                append_snapshots(collection.database, raw, scraped_at)
+                csv_path = export_raw_csv(raw, scraped_at)
+            print(f"[Pipeline] CSV raw exporté: {csv_path}")
+    except Exception as e:
+        print(f"[Pipeline] ✗ Erreur scraping classements: {e}")
+        errors.append(str(e))
+    finally:
+        timer.stop("scrape")
+        try:
+            for _ in range(workers):
+                _put(out, _END, consumers)
+        except NoConsumerLeft:
+            pass
+
+
+def _consume(worker_id: int, pool: BrowserPool, policy: FetchPolicy, inbox: "queue.Queue",
+             enriched: List[Dict], lock: threading.Lock, timer: StageTimer,
+             archive: Optional[PageArchive], telemetry: RunTelemetry):
+    """Phase 2 : enrichit les chaînes reçues, avec un contexte du pool partagé."""
+    try:
+        while True:
+            ch = inbox.get()
+            if ch is _END:
+                break
+
+            timer.start("enrich")
+            channel_url = ch.get("channel_url")
+            if not channel_url:
+                print(f"[Enrich:{worker_id}] ⚠ URL manquante (rank {ch.get('rank')})")
+                continue
+
+            # Les champs datetime ne doivent pas partir tels quels dans le CSV enrichi
+            ch["scraped_at"] = ch["scraped_at"].isoformat()
+
+            print(f"[Enrich:{worker_id}] rank {ch.get('rank')} {channel_url}")
+            try:
+                with pool.page() as page:
+                    doc = vidiq_enrich.enrich_channel(page, ch, archive, policy, telemetry)
+            except Exception as e:
+                # Erreur hors politique de retry (pool, navigateur...) : la chaîne
+                # est marquée en échec et le worker continue de vider la file
+                print(f"[Enrich:{worker_id}] ✗ Erreur sur {channel_url}: {e}")
+                doc = {
+                    **ch,
+                    **dict.fromkeys(vidiq_enrich.FIELD_LABELS),
+                    "failure_class": OTHER,
+                    "retries": 0,
+                    "failure_classes": [OTHER],
+                    "enriched_at": datetime.now(timezone.utc).isoformat(),
+                    "error": str(e),
+                }
+            finally:
+                vidiq_enrich.polite_pause()
+            with lock:
+                enriched.append(doc)
+    finally:
+        pool.release()
+        timer.stop("enrich")
+
+
+def run_pipeline(urls: Optional[List[str]] = None, workers: int = 2,
+                 queue_size: int = 20, limit: Optional[int] = None,
+                 max_pages: Optional[int] = None, archive: bool = False,
+                 pool: Optional[BrowserPool] = None,
+                 policy: Optional[FetchPolicy] = None,
+                 trace_slowest: int = 0) -> Dict:
+    """
+    Lance scraping et enrichissement en parallèle.
+
+    Args:
+        urls: Classements VidIQ à parcourir (Top 100 mondial par défaut)
+        workers: Nombre de navigateurs d'enrichissement
+        queue_size: Taille max de la file entre les deux phases
+        limit: Limiter le nombre de chaînes
+        max_pages: Pages max suivies par classement
+        archive: Archiver les pages chaînes (data/archive) pour re-parsing
+        pool: Pool de navigateurs partagé par les deux phases (créé et
+            fermé ici si absent)
+        policy: Politique de retry partagée (un seul disjoncteur pour
+            toutes les requêtes de l'exécution)
+        trace_slowest: Garder la trace Playwright des N pages les plus lentes
+
+    Returns:
+        Dict avec les compteurs et la durée de chaque étape (secondes) ;
+        le résumé de télémétrie est aussi stocké dans scrape_runs
+    """
+    urls = list(urls or [DEFAULT_LIST_URL])
+    timer = StageTimer()
+    timer.start("total")
+
+    handoff: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    raw: List[Dict] = []
+    enriched: List[Dict] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+    page_archive = PageArchive() if archive else None
+    owned_pool = pool is None
+    pool = pool or BrowserPool()
+    policy = policy or FetchPolicy()
+    telemetry = RunTelemetry("pipeline", trace_slowest=trace_slowest)
+
+    consumers = [
+        threading.Thread(
+            target=_consume,
+            args=(i + 1, pool, policy, handoff, enriched, lock, timer, page_archive, telemetry),
+            name=f"enrich-{i + 1}",
+        )
+        for i in range(workers)
+    ]
+    threads = [
+        threading.Thread(
+            target=_produce,
+            args=(urls, max_pages, pool, policy, handoff, raw, timer, workers, limit, errors,
+                  telemetry, consumers),
+            name="scrape",
+        )
+    ] + consumers
+
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Les workers ont reçu une copie faite à la première apparition de la
+    # chaîne : rang et classements définitifs repris du scraping
+    final = {ch["channel_url"]: ch for ch in raw if ch.get("channel_url")}
+    for doc in enriched:
+        channel = final.get(doc.get("channel_url"))
+        if channel is not None:
+            doc["rank"] = channel.get("rank")
+            doc["lists"] = copy.deepcopy(channel.get("lists"))
+
+    # Tri par rang pour garder un CSV enrichi lisible
+    enriched.sort(key=lambda d: d.get("rank") or 0)
+
+    timer.start("write")
+    with telemetry.span("write"):
+        vidiq_enrich.export_csv(enriched)
+        parquet_paths = export_parquet(enriched)
+        vidiq_enrich.upsert_mongo(enriched)
+    for parquet_path in parquet_paths:
+        print(f"[Pipeline] Parquet exporté: {parquet_path}")
+    db = get_db()
+    if enriched:
+        stamp_data_version(db, source="pipeline")
+    timer.stop("write")
+    timer.stop("total")
+
+    report = {
+        "scraped": len(raw),
+        "enriched": len(enriched),
+        "retries": sum(d.get("retries", 0) for d in enriched),
+        "failed": sum(1 for d in enriched if d.get("failure_class")),
+        "circuit_trips": policy.breaker.trips,
+        "errors": errors,
+        "stages": timer.durations(),
+        "browser": pool.report(),
+    }
+    if owned_pool:
+        pool.close()
+    print_report(report)
+    report["run_id"] = telemetry.finish(db, extra=report)["_id"]
+    return report
+
+
+def print_report(report: Dict):
+    """Affiche le temps mural par étape."""
+    print("\n" + "-" * 60)
+    print(" Temps par étape (s)")
+    print("-" * 60)
+    for stage, seconds in report["stages"].items():
+        print(f"  {stage:<10} {seconds:>8.2f}")
+    print(f"  Chaînes scrapées : {report['scraped']}")
+    print(f"  Chaînes enrichies : {report['enriched']}")
+    print(f"  Retries : {report['retries']}, échecs : {report['failed']}, "
+          f"disjoncteur : {report['circuit_trips']}")
+    print("\n Navigateur")
+    for key, value in report["browser"].items():
+        print(f"  {key:<24} {value}")
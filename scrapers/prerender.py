@@ -0,0 +1,62 @@
+"""
+Déclenche le pré-rendu statique des pages web (app/prerender.py) après
+un rafraîchissement des données.
+
+Le rendu tourne dans un processus séparé, lancé depuis app/ (main.py y
+importe ses modules à plat). Les rendus concurrents sont sérialisés par
+app/prerender.py, qui ne rend rien si la version servie est déjà à jour.
+
+    PRERENDER=0 désactive le déclenchement.
+"""
+
+import os
+import sys
+import threading
+import subprocess
+from typing import Optional
+
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+PRERENDER_ENABLED = os.getenv("PRERENDER", "1") != "0"
+
+# Rendu lancé sans attente (wait=False), récupéré au déclenchement suivant
+_background: Optional[subprocess.Popen] = None
+_lock = threading.Lock()
+
+
+def trigger_prerender(wait: bool = True) -> Optional[int]:
+    """
+    Args:
+        wait: Attendre la fin du rendu (fin de script) ; False pour les
+              processus longs (planificateur, workers)
+
+    Un rendu lancé sans attente est récupéré (poll) au déclenchement
+    suivant, qui est ignoré s'il tourne encore : le processus long ne
+    garde ni zombie ni rendus qui se chevauchent.
+
+    Returns:
+        Code de retour du rendu si wait, sinon None
+    """
+    global _background
+    if not PRERENDER_ENABLED:
+        return None
+    if not os.path.exists(os.path.join(APP_DIR, "prerender.py")):
+        print(f"[Prerender] {APP_DIR}/prerender.py introuvable, pré-rendu ignoré")
+        return None
+    with _lock:
+        if _background is not None:
+            code = _background.poll()
+            if code is None:
+                print("[Prerender] Rendu précédent en cours, déclenchement ignoré")
+                return None
+            if code:
+                print(f"[Prerender] Échec du pré-rendu précédent (code {code})")
+            _background = None
+        process = subprocess.Popen([sys.executable, "prerender.py"], cwd=APP_DIR)
+        if not wait:
+            _background = process
+            return None
+    code = process.wait()
+    if code:
+        print(f"[Prerender] Échec du pré-rendu (code {code})")
+    return code
@@ -0,0 +1,119 @@
+"""
+Enregistrement / rejeu hors ligne des pages VidIQ (fichiers HAR).
+
+- enregistrement : chaque contexte du BrowserPool enregistre son trafic
+  dans data/replay/<nom>/context-<n>.zip (HAR + contenus en pièces jointes)
+- rejeu : les contextes sont servis depuis ces HAR via route_from_har,
+  sans aucune requête vers vidiq.com ; latence et taux d'erreur
+  configurables sur les documents pour exercer retries et disjoncteur
+
+Activation sans changer le code appelant (scrape_top100, enrich_channels,
+seed_db.py créent leur BrowserPool avec har_from_env()) :
+
+    VIDIQ_RECORD_HAR_DIR=data/replay/top100 python seed_db.py --limit 20
+    VIDIQ_REPLAY_HAR_DIR=data/replay/top100 VIDIQ_REPLAY_LATENCY_MS=200 \\
+        VIDIQ_REPLAY_ERROR_RATE=0.05 VIDIQ_POLITE_PAUSE_SECONDS=0,0 \\
+        python seed_db.py --limit 20
+
+    python benchmarks/bench_replay.py --har-dir data/replay/top100
+"""
+
+import os
+import glob
+import time
+import random
+import itertools
+import threading
+from typing import Dict, Optional
+
+
+REPLAY_DIR = os.path.join("data", "replay")
+
+
+class HarRecorder:
+    """Un fichier HAR par contexte ouvert, écrit à la fermeture du contexte."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._ids = itertools.count(len(glob.glob(os.path.join(root, "context-*.zip"))) + 1)
+        self._lock = threading.Lock()
+
+    def context_options(self) -> Dict:
+        with self._lock:
+            path = os.path.join(self.root, f"context-{next(self._ids):04d}.zip")
+        return {"record_har_path": path, "record_har_mode": "full"}
+
+    def install(self, context):
+        pass
+
+
+class HarReplayer:
+    """Sert les contextes depuis les HAR enregistrés, avec fautes injectées."""
+
+    def __init__(self, root: str, latency_ms: float = 0.0, error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            root: Dossier des HAR (produits par HarRecorder)
+            latency_ms: Latence ajoutée à chaque document servi
+            error_rate: Proportion de documents remplacés par une réponse 503
+            seed: Graine du tirage des erreurs (rejeu reproductible)
+        """
+        self.har_paths = sorted(glob.glob(os.path.join(root, "*.zip"))
+                                + glob.glob(os.path.join(root, "*.har")))
+        if not self.har_paths:
+            raise FileNotFoundError(f"Aucun HAR à rejouer dans {root}")
+        self.root = root
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"documents": 0, "injected_errors": 0}
+
+    def context_options(self) -> Dict:
+        return {}
+
+    def install(self, context):
+        # Les handlers sont appelés du dernier enregistré au premier :
+        # fautes injectées -> HAR (un par fichier) -> abandon
+        context.route("**/*", lambda route: route.abort("internetdisconnected"))
+        for path in self.har_paths:
+            context.route_from_har(path, not_found="fallback")
+        context.route("**/*", self._inject)
+
+    def _inject(self, route):
+        if route.request.resource_type != "document":
+            route.fallback()
+            return
+
+        with self._lock:
+            self.stats["documents"] += 1
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.stats["injected_errors"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            route.fulfill(status=503, body="Injected error")
+        else:
+            route.fallback()
+
+
+def har_from_env():
+    """
+    HarRecorder / HarReplayer selon VIDIQ_RECORD_HAR_DIR ou
+    VIDIQ_REPLAY_HAR_DIR, None pour un scraping en direct.
+    """
+    replay_dir = os.getenv("VIDIQ_REPLAY_HAR_DIR")
+    if replay_dir:
+        return HarReplayer(
+            replay_dir,
+            latency_ms=float(os.getenv("VIDIQ_REPLAY_LATENCY_MS", "0")),
+            error_rate=float(os.getenv("VIDIQ_REPLAY_ERROR_RATE", "0")),
+            seed=int(os.environ["VIDIQ_REPLAY_SEED"]) if os.getenv("VIDIQ_REPLAY_SEED") else None,
+        )
+    record_dir = os.getenv("VIDIQ_RECORD_HAR_DIR")
+    if record_dir:
+        return HarRecorder(record_dir)
+    return None
@@ -0,0 +1,397 @@
+"""
+Planificateur de rafraîchissement en continu (remplace le seed_db one-shot).
+
+Chaque chaîne a une importance (meilleur rang et forte croissance = plus
+importante). Elle devient due quand staleness × importance atteint
+l'intervalle de base, c'est-à-dire à :
+    dernier_rafraîchissement + intervalle_de_base / importance
+Les chaînes sont gardées dans un tas trié par cette échéance ; la plus en
+retard part aux workers d'enrichissement dès qu'un jeton du budget de
+pages par heure est disponible.
+
+Les classements sont re-scrapés périodiquement pour découvrir les
+nouvelles chaînes et mettre à jour rangs et compteurs.
+
+La télémétrie est découpée en fenêtres : un résumé scrape_runs est écrit
+à chaque nouvelle version des données et à l'arrêt.
+
+    python -m scrapers.scheduler --pages-per-hour 120
+"""
+
+import os
+import sys
+import math
+import time
+import heapq
+import queue
+import signal
+import argparse
+import itertools
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from scrapers.db import get_db, stamp_data_version
+from scrapers.browser_pool import BrowserPool
+from scrapers.fetch_policy import FetchPolicy
+from scrapers.telemetry import RunTelemetry
+from scrapers.vidiq_playwright_parser import VidIQPlaywrightParser, DEFAULT_LIST_URL
+from scrapers.vidiq_scraper import store_channel
+from scrapers.history import append_snapshots
+from scrapers.prerender import trigger_prerender
+import scrapers.vidiq_enrich as vidiq_enrich
+
+
+# Premier délai avant de retenter une chaîne en échec (doublé ensuite)
+RETRY_BASE_SECONDS = 15 * 60
+
+
+class TokenBucket:
+    """Budget de pages : `rate_per_hour` jetons par heure, rafale limitée à `burst`."""
+
+    def __init__(self, rate_per_hour: float, burst: int = 5):
+        self.rate = rate_per_hour / 3600.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, stop: threading.Event, tokens: float = 1.0) -> bool:
+        """Attend un jeton ; retourne False si l'arrêt est demandé entre-temps."""
+        while not stop.is_set():
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.rate
+            stop.wait(min(wait, 5.0))
+        return False
+
+
+def _parse_time(value) -> float:
+    """Timestamp (s) d'un datetime ou d'une chaîne ISO, 0 si absent."""
+    if not value:
+        return 0.0
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value))
+        except ValueError:
+            return 0.0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def importance(doc: Dict, growth_weight: float = 10.0) -> float:
+    """
+    Importance d'une chaîne :
+    - rang : rang 1 → x10, rang 100 → x1.9, au-delà → proche de 1
+    - croissance : abonnés gagnés rapportés aux abonnés
+    """
+    rank = doc.get("rank") or 0
+    score = 1.0 + (9.0 / math.sqrt(rank) if rank > 0 else 0.0)
+
+    subscribers = doc.get("subscribers") or 0
+    gained = doc.get("subscribers_gained")
+    if subscribers and gained:
+        try:
+            gained = VidIQPlaywrightParser._parse_number(str(gained).lstrip("+"))
+        except Exception:
+            gained = 0
+        growth = min(max(gained / subscribers, 0.0), 1.0)
+        score *= 1.0 + growth_weight * growth
+
+    return score
+
+
+class RefreshScheduler:
+    """Tas d'échéances + budget de pages + workers d'enrichissement."""
+
+    def __init__(self, pages_per_hour: float = 120, base_interval_hours: float = 24,
+                 workers: int = 2, list_urls: Optional[List[str]] = None,
+                 rankings_every_hours: float = 24, reload_every_minutes: float = 15,
+                 pool: Optional[BrowserPool] = None, policy: Optional[FetchPolicy] = None):
+        self.base_interval = base_interval_hours * 3600
+        self.workers = workers
+        self.list_urls = list(list_urls or [DEFAULT_LIST_URL])
+        self.rankings_every = rankings_every_hours * 3600
+        self.reload_every = reload_every_minutes * 60
+        self.bucket = TokenBucket(pages_per_hour)
+        self.pool = pool or BrowserPool()
+        self.policy = policy or FetchPolicy()
+
+        self.db = get_db()
+        self.stop = threading.Event()
+        self._lock = threading.Lock()
+        self._heap: List = []
+        self._seq = itertools.count()
+        self._state: Dict[str, Dict] = {}
+        self._inflight = set()
+        self._work: "queue.Queue" = queue.Queue(maxsize=workers)
+        self.refreshed = 0
+        self._stamped = 0
+        self.telemetry = RunTelemetry("scheduler")
+
+    # ------------------------------------------------------------------
+    # Tas d'échéances
+    # ------------------------------------------------------------------
+
+    def _schedule(self, doc: Dict, last_refresh: float, due_at: Optional[float] = None):
+        """(Re)place une chaîne dans le tas. Appelé sous verrou."""
+        url = doc["channel_url"]
+        state = self._state.setdefault(url, {"version": 0, "failures": 0, "retry_at": None})
+        state["version"] += 1
+        state["doc"] = doc
+        state["last_refresh"] = last_refresh
+        if due_at is None:
+            due_at = last_refresh + self.base_interval / importance(doc)
+        heapq.heappush(self._heap, (due_at, next(self._seq), url, state["version"]))
+
+    def _retry_later(self, doc: Dict):
+        """
+        Replace une chaîne en échec avec un délai croissant (RETRY_BASE_SECONDS,
+        doublé à chaque échec consécutif, plafonné à l'intervalle de base),
+        sans changer sa date de dernier rafraîchissement réussi. Appelé sous verrou.
+        """
+        url = doc["channel_url"]
+        state = self._state.setdefault(url, {"version": 0, "failures": 0, "retry_at": None,
+                                             "last_refresh": 0.0})
+        state["failures"] += 1
+        delay = min(RETRY_BASE_SECONDS * 2 ** (state["failures"] - 1), self.base_interval)
+        state["retry_at"] = time.time() + delay
+        self._schedule(doc, state["last_refresh"], state["retry_at"])
+
+    def _peek(self):
+        """Première entrée valide du tas (les entrées périmées sont jetées)."""
+        while self._heap:
+            due_at, _, url, version = self._heap[0]
+            state = self._state.get(url)
+            if state and state["version"] == version and url not in self._inflight:
+                return due_at, url
+            heapq.heappop(self._heap)
+        return None
+
+    def reload(self):
+        """
+        Synchronise le tas avec channels_top100 (+ date du dernier
+        enrichissement). Les chaînes sorties des classements ne sont plus
+        suivies (sauf rafraîchissement en cours) ; leurs entrées du tas
+        sont jetées par _peek.
+        """
+        enriched = {
+            doc["channel_url"]: doc
+            for doc in self.db["channels_enriched"].find(
+                {}, {"channel_url": 1, "enriched_at": 1, "subscribers_gained": 1}
+            )
+            if doc.get("channel_url")
+        }
+        added = 0
+        listed = set()
+        with self._lock:
+            for doc in self.db["channels_top100"].find({"channel_url": {"$ne": None}}):
+                doc.pop("_id", None)
+                url = doc["channel_url"]
+                listed.add(url)
+                if url in self._inflight:
+                    continue
+                known = self._state.get(url)
+                if known:
+                    # Nouveau rang / compteurs, même date de rafraîchissement
+                    doc.setdefault("subscribers_gained", known["doc"].get("subscribers_gained"))
+                    self._schedule(doc, known["last_refresh"], known["retry_at"])
+                else:
+                    previous = enriched.get(url, {})
+                    doc.setdefault("subscribers_gained", previous.get("subscribers_gained"))
+                    self._schedule(doc, _parse_time(previous.get("enriched_at")))
+                    added += 1
+            dropped = [url for url in self._state if url not in listed and url not in self._inflight]
+            for url in dropped:
+                del self._state[url]
+        print(f"[Scheduler] {len(self._state)} chaînes suivies ({added} nouvelles, "
+              f"{len(dropped)} retirées)")
+
+        # Nouvelle version des données si des chaînes ont été rafraîchies
+        if self.refreshed != self._stamped:
+            stamp_data_version(self.db, source="scheduler")
+            trigger_prerender(wait=False)
+            self.rotate_telemetry()
+
+    def rotate_telemetry(self):
+        """Clôt la fenêtre de télémétrie en cours et en ouvre une nouvelle."""
+        with self._lock:
+            telemetry, self.telemetry = self.telemetry, RunTelemetry("scheduler")
+            refreshed, self._stamped = self.refreshed - self._stamped, self.refreshed
+        telemetry.finish(self.db, extra={"refreshed": refreshed})
+
+    # ------------------------------------------------------------------
+    # Classements
+    # ------------------------------------------------------------------
+
+    def refresh_rankings(self):
+        """Re-scrape les classements pour les rangs et les nouvelles chaînes."""
+        print(f"[Scheduler] Rafraîchissement de {len(self.list_urls)} classement(s)")
+        collection = self.db["channels_top100"]
+        scraped_at = datetime.utcnow()
+        channels = []
+        try:
+            # Un jeton par page de classement chargée, comme pour les chaînes
+            for channel in VidIQPlaywrightParser.iter_lists(
+                self.list_urls, pool=self.pool, policy=self.policy, telemetry=self.telemetry,
+                before_page=lambda: self.bucket.acquire(self.stop),
+            ):
+                channel["scraped_at"] = scraped_at
+                with self.telemetry.span("write", channel.get("channel_url")):
+                    store_channel(collection, channel)
+                channels.append(channel)
+            if len(self.list_urls) > 1:
+                # Rang et classements complétés en place après la première écriture
+                with self.telemetry.span("write"):
+                    for channel in channels:
+                        store_channel(collection, channel)
+        except Exception as e:
+            print(f"[Scheduler] ⚠ Classements non rafraîchis : {e}")
+        append_snapshots(self.db, channels, scraped_at)
+        self.reload()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _worker(self, worker_id: int):
+        try:
+            while True:
+                ch = self._work.get()
+                if ch is None:
+                    break
+                url = ch["channel_url"]
+                if isinstance(ch.get("scraped_at"), datetime):
+                    ch["scraped_at"] = ch["scraped_at"].isoformat()
+                print(f"[Scheduler:{worker_id}] rank {ch.get('rank')} {url}")
+                doc = ch
+                failed = True
+                try:
+                    telemetry = self.telemetry
+                    with self.pool.page() as page:
+                        doc = vidiq_enrich.enrich_channel(page, ch, policy=self.policy,
+                                                          telemetry=telemetry)
+                    with telemetry.span("write", url):
+                        if doc.get("failure_class"):
+                            # Échec : l'enrichissement déjà stocké reste en place
+                            vidiq_enrich.record_failure(doc, self.db["channels_enriched"])
+                        else:
+                            vidiq_enrich.upsert_mongo([dict(doc)], self.db["channels_enriched"])
+                            failed = False
+                except Exception as e:
+                    print(f"[Scheduler:{worker_id}] ⚠ {url}: {e}")
+                finally:
+                    with self._lock:
+                        self._inflight.discard(url)
+                        if failed:
+                            self._retry_later(ch)
+                        else:
+                            self._schedule(doc, time.time())
+                            self._state[url].update(failures=0, retry_at=None)
+                            self.refreshed += 1
+        finally:
+            self.pool.release()
+
+    # ------------------------------------------------------------------
+    # Boucle principale
+    # ------------------------------------------------------------------
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self._worker, args=(i + 1,), name=f"refresh-{i + 1}")
+            for i in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+
+        # Pas de re-scraping immédiat si les classements sont récents (ex. seed)
+        latest = self.db["channels_top100"].find_one(sort=[("scraped_at", -1)])
+        next_rankings = _parse_time(latest.get("scraped_at")) + self.rankings_every if latest else 0.0
+        next_reload = 0.0
+        try:
+            while not self.stop.is_set():
+                now = time.time()
+                if now >= next_rankings:
+                    self.refresh_rankings()
+                    next_rankings = now + self.rankings_every
+                    next_reload = now + self.reload_every
+                elif now >= next_reload:
+                    self.reload()
+                    next_reload = now + self.reload_every
+
+                with self._lock:
+                    top = self._peek()
+                if top is None or top[0] > now:
+                    wait = 30.0 if top is None else min(top[0] - now, 30.0)
+                    self.stop.wait(wait)
+                    continue
+
+                if not self.bucket.acquire(self.stop):
+                    break
+                with self._lock:
+                    top = self._peek()
+                    if top is None:
+                        continue
+                    url = top[1]
+                    self._inflight.add(url)
+                    ch = dict(self._state[url]["doc"])
+                # Bloque tant que tous les workers sont occupés
+                self._work.put(ch)
+        finally:
+            for _ in threads:
+                self._work.put(None)
+            for t in threads:
+                t.join()
+            self.pool.print_report()
+            self.pool.close()
+            self.rotate_telemetry()
+            print(f"[Scheduler] Arrêt après {self.refreshed} rafraîchissements")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rafraîchissement continu des chaînes VidIQ")
+    parser.add_argument("--pages-per-hour", type=float,
+                        default=float(os.getenv("SCHEDULER_PAGES_PER_HOUR", "120")),
+                        help="Budget de pages visitées par heure")
+    parser.add_argument("--base-interval-hours", type=float,
+                        default=float(os.getenv("SCHEDULER_BASE_INTERVAL_HOURS", "24")),
+                        help="Intervalle de rafraîchissement d'une chaîne d'importance 1")
+    parser.add_argument("--workers", type=int, default=2, help="Workers d'enrichissement")
+    parser.add_argument("--list", dest="urls", action="append", default=None,
+                        help="URL d'un classement à suivre (répétable)")
+    parser.add_argument("--rankings-every-hours", type=float, default=24,
+                        help="Fréquence de re-scraping des classements")
+    args = parser.parse_args()
+
+    scheduler = RefreshScheduler(
+        pages_per_hour=args.pages_per_hour,
+        base_interval_hours=args.base_interval_hours,
+        workers=args.workers,
+        list_urls=args.urls,
+        rankings_every_hours=args.rankings_every_hours,
+    )
+
+    def shutdown(signum, frame):
+        print(f"\n[Scheduler] Signal {signum} reçu, arrêt en cours...")
+        scheduler.stop.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    scheduler.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
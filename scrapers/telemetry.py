@@ -0,0 +1,247 @@
+"""
+Télémétrie des exécutions de scraping.
+
+Chaque exécution mesure des spans (navigate, wait, extract, write) par
+chaîne, le nombre de pages, les octets reçus et le débit. En fin
+d'exécution, un document résumé est écrit dans la collection
+`scrape_runs` et dans data/runs/<run_id>.json, et comparé à l'exécution
+précédente du même type pour rendre visibles les régressions de débit.
+
+Optionnellement, une trace Playwright est gardée pour les N pages les
+plus lentes (data/runs/traces/<run_id>/), à ouvrir avec
+`playwright show-trace`.
+"""
+
+import os
+import json
+import time
+import heapq
+import uuid
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+RUNS_DIR = os.path.join("data", "runs")
+RUNS_COLLECTION = "scrape_runs"
+
+# État posé sur les objets Playwright eux-mêmes (et non indexé par id(),
+# réutilisé après le recyclage d'un contexte) : il vit et meurt avec eux
+# et reste partagé entre les fenêtres de télémétrie successives
+_PAGE_TELEMETRY = "_vidiq_telemetry"
+_CONTEXT_TRACING = "_vidiq_tracing_started"
+
+
+def _route_response(page):
+    """Listener unique par page : compte la réponse dans la télémétrie courante de la page."""
+    def on_response(response):
+        telemetry = getattr(page, _PAGE_TELEMETRY, None)
+        if telemetry is not None:
+            telemetry._on_response(response)
+    return on_response
+
+
+class NullTelemetry:
+    """Télémétrie désactivée : mêmes méthodes, aucun effet."""
+
+    def span(self, name: str, channel: Optional[str] = None):
+        return nullcontext()
+
+    def page(self, page, channel: str):
+        return nullcontext()
+
+
+class RunTelemetry:
+    """Collecte les mesures d'une exécution (thread-safe)."""
+
+    def __init__(self, run_type: str, trace_slowest: int = 0, runs_dir: str = RUNS_DIR):
+        """
+        Args:
+            run_type: Type d'exécution (pipeline, enrich, scheduler...)
+            trace_slowest: Nombre de pages les plus lentes dont garder la trace Playwright
+            runs_dir: Dossier des résumés JSON et des traces
+        """
+        self.run_type = run_type
+        self.run_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self.runs_dir = runs_dir
+        self.trace_slowest = trace_slowest
+        self.trace_dir = os.path.join(runs_dir, "traces", self.run_id)
+
+        self._lock = threading.Lock()
+        self.phases: Dict[str, Dict] = {}
+        self.channels: Dict[str, Dict[str, float]] = {}
+        self.pages = 0
+        self.bytes = 0
+        self._slowest: List = []
+
+    # ------------------------------------------------------------------
+    # Mesures
+    # ------------------------------------------------------------------
+
+    def record(self, name: str, seconds: float, channel: Optional[str] = None):
+        with self._lock:
+            phase = self.phases.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            phase["count"] += 1
+            phase["total"] += seconds
+            phase["max"] = max(phase["max"], seconds)
+            if channel:
+                spans = self.channels.setdefault(channel, {})
+                spans[name] = round(spans.get(name, 0.0) + seconds, 4)
+
+    @contextmanager
+    def span(self, name: str, channel: Optional[str] = None):
+        """Mesure la durée d'un bloc (navigate, wait, extract, write...)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, channel)
+
+    def _on_response(self, response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            with self._lock:
+                self.bytes += int(length)
+
+    @contextmanager
+    def page(self, page, channel: str):
+        """
+        Encadre la visite d'une page : compte la page, les octets reçus
+        (content-length) et garde la trace Playwright si elle est parmi
+        les plus lentes.
+        """
+        if not hasattr(page, _PAGE_TELEMETRY):
+            page.on("response", _route_response(page))
+        # Les réponses suivantes de cette page comptent pour cette exécution
+        setattr(page, _PAGE_TELEMETRY, self)
+
+        tracing = None
+        if self.trace_slowest:
+            tracing = page.context.tracing
+            try:
+                if not getattr(page.context, _CONTEXT_TRACING, False):
+                    tracing.start(snapshots=True, screenshots=True)
+                    setattr(page.context, _CONTEXT_TRACING, True)
+                tracing.start_chunk()
+            except Exception as e:
+                # La trace est un bonus : elle ne doit pas faire échouer la page
+                print(f"[Telemetry] ⚠ Trace non démarrée : {e}")
+                tracing = None
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.pages += 1
+            self.record("page", seconds, channel)
+            if tracing is not None:
+                self._keep_trace(tracing, channel, seconds)
+
+    def _keep_trace(self, tracing, channel: str, seconds: float):
+        """Sauvegarde la trace si la page entre dans les N plus lentes."""
+        with self._lock:
+            keep = (len(self._slowest) < self.trace_slowest
+                    or seconds > self._slowest[0][0])
+            path = None
+            evicted = None
+            if keep:
+                os.makedirs(self.trace_dir, exist_ok=True)
+                path = os.path.join(self.trace_dir, f"{uuid.uuid4().hex[:10]}.zip")
+                entry = (seconds, path, channel)
+                if len(self._slowest) < self.trace_slowest:
+                    heapq.heappush(self._slowest, entry)
+                else:
+                    evicted = heapq.heapreplace(self._slowest, entry)
+
+        try:
+            tracing.stop_chunk(path=path) if path else tracing.stop_chunk()
+        except Exception as e:
+            print(f"[Telemetry] ⚠ Trace non enregistrée : {e}")
+        if evicted and os.path.exists(evicted[1]):
+            os.remove(evicted[1])
+
+    # ------------------------------------------------------------------
+    # Résumé
+    # ------------------------------------------------------------------
+
+    def summary(self, extra: Optional[Dict] = None) -> Dict:
+        wall = time.perf_counter() - self._start
+        with self._lock:
+            phases = {
+                name: {
+                    "count": p["count"],
+                    "total_seconds": round(p["total"], 3),
+                    "mean_seconds": round(p["total"] / p["count"], 3),
+                    "max_seconds": round(p["max"], 3),
+                }
+                for name, p in self.phases.items()
+            }
+            slowest = sorted(
+                (
+                    {"channel": channel, "seconds": round(spans.get("page", 0.0), 3), "spans": spans}
+                    for channel, spans in self.channels.items()
+                ),
+                key=lambda c: c["seconds"],
+                reverse=True,
+            )[:10]
+            traces = [
+                {"channel": channel, "seconds": round(seconds, 3), "path": path}
+                for seconds, path, channel in sorted(self._slowest, reverse=True)
+            ]
+            summary = {
+                "_id": self.run_id,
+                "run_type": self.run_type,
+                "started_at": self.started_at.isoformat(),
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+                "wall_seconds": round(wall, 3),
+                "pages": self.pages,
+                "pages_per_second": round(self.pages / wall, 4) if wall else 0.0,
+                "bytes": self.bytes,
+                "phases": phases,
+                "slowest_pages": slowest,
+                "traces": traces,
+            }
+        if extra:
+            summary["extra"] = extra
+        return summary
+
+    def finish(self, db=None, extra: Optional[Dict] = None) -> Dict:
+        """
+        Écrit le résumé (JSON + collection scrape_runs) et affiche l'écart
+        de débit avec l'exécution précédente du même type.
+        """
+        summary = self.summary(extra)
+
+        os.makedirs(self.runs_dir, exist_ok=True)
+        path = os.path.join(self.runs_dir, f"{self.run_id}.json")
+        with open(path, mode="w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, default=str)
+
+        previous = None
+        if db is not None:
+            try:
+                collection = db[RUNS_COLLECTION]
+                previous = collection.find_one(
+                    {"run_type": self.run_type}, sort=[("started_at", -1)]
+                )
+                collection.insert_one(dict(summary))
+            except Exception as e:
+                print(f"[Telemetry] ⚠ Résumé non stocké dans Mongo : {e}")
+
+        print(f"\n[Telemetry] Exécution {self.run_id} ({self.run_type}) : "
+              f"{summary['pages']} pages en {summary['wall_seconds']:.1f}s, "
+              f"{summary['pages_per_second']:.3f} pages/s, {summary['bytes'] / 1e6:.1f} Mo")
+        for name, phase in summary["phases"].items():
+            print(f"  {name:<16} n={phase['count']:<6} moy={phase['mean_seconds']:.3f}s "
+                  f"max={phase['max_seconds']:.3f}s")
+        if summary["pages"] and previous and previous.get("pages_per_second"):
+            change = summary["pages_per_second"] / previous["pages_per_second"] - 1
+            flag = "  ⚠ RÉGRESSION" if change < -0.2 else ""
+            print(f"  Débit vs exécution {previous['_id']} : {change:+.0%}{flag}")
+        print(f"  Résumé : {path}")
+        return summary
@@ -1,26 +1,46 @@
 """
 Phase 2 - Enrichissement VidIQ avec Playwright.
 Lit data/raw/channels_top100.csv, visite chaque channel_url,
-extrait revenus mensuels estimés et durée moyenne des vidéos,
+extrait revenus mensuels estimés, durée moyenne des vidéos,
+abonnés gagnés, fréquence de publication et taux d'engagement,
 upsert Mongo et exporte data/enriched/channels_enriched.csv.
 """
 
 import os
+import re
 import csv
+import json
 import time
 import random
 import argparse
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
-
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
-from scrapers.db import get_db
+from typing import Dict, List, Optional, Tuple
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from app.search_keys import normalize_name, normalize_url
+from scrapers.db import get_db, stamp_data_version
+from scrapers.archive import PageArchive
+from scrapers.browser_pool import BrowserPool
+from scrapers.telemetry import NullTelemetry, RunTelemetry
+from scrapers.prerender import trigger_prerender
+from scrapers.fetch_policy import (
+    FetchPolicy,
+    FetchError,
+    FetchFailed,
+    PARSE_MISS,
+    check_response,
+)
 
 
 RAW_CSV_PATH = os.path.join("data", "raw", "channels_top100.csv")
 ENRICHED_DIR = os.path.join("data", "enriched")
 ENRICHED_CSV_PATH = os.path.join(ENRICHED_DIR, "channels_enriched.csv")
 
+# Pause entre deux pages (min, max en secondes) ; "0,0" pour un rejeu hors ligne
+POLITE_PAUSE_SECONDS = tuple(
+    float(x) for x in os.getenv("VIDIQ_POLITE_PAUSE_SECONDS", "1,3").split(",")
+)
+
 
 def _to_int(value):
     """Convertit une valeur en int si possible, sinon retourne None."""
@@ -35,7 +55,95 @@ def _to_int(value):
         return int(float(text))
     except ValueError:
         return None
-        
+
+
+_MONEY_MULTIPLIERS = {"K": 1_000, "M": 1_000_000, "B": 1_000_000_000}
+
+
+def parse_money(text) -> Optional[float]:
+    """Convertit un montant '$865K', '$6M', '$1.2B' en dollars, None si illisible."""
+    if not text:
+        return None
+    text = str(text).strip().replace("$", "").replace(",", "").upper()
+    multiplier = _MONEY_MULTIPLIERS.get(text[-1:], 1)
+    if multiplier != 1:
+        text = text[:-1]
+    try:
+        return float(text) * multiplier
+    except ValueError:
+        return None
+
+
+def parse_earnings_range(text) -> Tuple[Optional[float], Optional[float]]:
+    """Convertit '$6M - $18M' en (6e6, 18e6) ; une valeur seule donne (v, v)."""
+    if not text:
+        return None, None
+    parts = str(text).split(" - ")
+    low = parse_money(parts[0])
+    high = parse_money(parts[1]) if len(parts) > 1 else low
+    return low, high
+
+
+def parse_duration_seconds(text) -> Optional[int]:
+    """Convertit une durée '14:32', '1:02:03' ou '12 min 5 s' en secondes."""
+    if not text:
+        return None
+    text = str(text).strip().lower()
+    if ":" in text:
+        try:
+            seconds = 0
+            for part in text.split(":"):
+                seconds = seconds * 60 + int(part)
+            return seconds
+        except ValueError:
+            return None
+    units = {"h": 3600, "m": 60, "s": 1}
+    matches = re.findall(r"(\d+(?:[.,]\d+)?)\s*(h|m|s)", text)
+    if not matches:
+        return None
+    return int(sum(float(value.replace(",", ".")) * units[unit] for value, unit in matches))
+
+
+def parse_percent(text) -> Optional[float]:
+    """Convertit '4.2%' (ou '4,2 %') en 4.2."""
+    if not text:
+        return None
+    try:
+        return float(str(text).replace("%", "").replace(",", ".").strip())
+    except ValueError:
+        return None
+
+
+def _ratio(numerator, denominator) -> float:
+    return (numerator or 0) / denominator if denominator else 0.0
+
+
+def derived_fields(doc: Dict) -> Dict:
+    """
+    Champs dérivés stockés avec la chaîne pour être filtrés / triés par
+    index côté API : bornes des revenus, ratios vues/abonnés/vidéos (0 si
+    dénominateur nul, comme l'application), nom et URL normalisés.
+
+    Seuls les champs calculables à partir de `doc` sont renvoyés.
+    """
+    derived = {}
+    if "estimated_monthly_earnings" in doc:
+        low, high = parse_earnings_range(doc["estimated_monthly_earnings"])
+        derived["earnings_monthly_low"] = low
+        derived["earnings_monthly_high"] = high
+    if "channel_name" in doc:
+        derived["name_key"] = normalize_name(doc["channel_name"])
+    if "channel_url" in doc:
+        derived["url_key"] = normalize_url(doc["channel_url"])
+    if all(key in doc for key in ("subscribers", "total_views", "videos")):
+        subscribers = _to_int(doc["subscribers"])
+        views = _to_int(doc["total_views"])
+        videos = _to_int(doc["videos"])
+        derived["views_per_subscriber"] = _ratio(views, subscribers)
+        derived["views_per_video"] = _ratio(views, videos)
+        derived["subs_per_video"] = _ratio(subscribers, videos)
+    return derived
+
 
 def read_channels(limit: Optional[int] = None) -> List[Dict]:
     """Lit le CSV source et retourne la liste des chaînes."""
@@ -49,6 +157,8 @@ def read_channels(limit: Optional[int] = None) -> List[Dict]:
             for key in ("rank", "videos", "subscribers", "total_views"):
                 if key in row:
                     row[key] = _to_int(row.get(key))
+            if row.get("lists"):
+                row["lists"] = json.loads(row["lists"])
             channels.append(row)
             if limit and len(channels) >= limit:
                 break
@@ -73,46 +183,238 @@ def extract_labeled_value(lines: List[str], labels: List[str]) -> Optional[str]:
     return None
 
 
-def parse_channel_page(page) -> Dict[str, Optional[str]]:
-    """Parse la page d'une chaîne VidIQ et extrait les infos d'enrichissement."""
-    labels_monthly = [
-        "Estimated Monthly Earnings",
-        "Monthly Earnings",
-        "Revenus mensuels estimés",
-        "Revenus mensuels",
-        "Gains mensuels",
-    ]
-    labels_duration = [
-        "Average Video Duration",
-        "Avg. Video Duration",
-        "Durée moyenne des vidéos",
-        "Durée moyenne",
-    ]
+LABELS_MONTHLY = [
+    "Estimated Monthly Earnings",
+    "Monthly Earnings",
+    "Revenus mensuels estimés",
+    "Revenus mensuels",
+    "Gains mensuels",
+]
+LABELS_DURATION = [
+    "Average Video Duration",
+    "Avg. Video Duration",
+    "Durée moyenne des vidéos",
+    "Durée moyenne",
+]
+LABELS_SUBSCRIBERS_GAINED = [
+    "Subscribers Gained",
+    "New Subscribers",
+    "Abonnés gagnés",
+    "Nouveaux abonnés",
+]
+LABELS_UPLOAD_FREQUENCY = [
+    "Upload Frequency",
+    "Uploads per week",
+    "Fréquence de publication",
+    "Fréquence d'upload",
+]
+LABELS_ENGAGEMENT = [
+    "Engagement Rate",
+    "Average Engagement",
+    "Taux d'engagement",
+    "Engagement moyen",
+]
+
+# Champ enrichi -> variantes FR/EN du label sur la page chaîne
+FIELD_LABELS = {
+    "estimated_monthly_earnings": LABELS_MONTHLY,
+    "avg_video_duration": LABELS_DURATION,
+    "subscribers_gained": LABELS_SUBSCRIBERS_GAINED,
+    "upload_frequency": LABELS_UPLOAD_FREQUENCY,
+    "engagement_rate": LABELS_ENGAGEMENT,
+}
+
+
+class LabelExtractor:
+    """
+    Extracteur compilé : une seule alternance regex sur toutes les variantes
+    de labels (en minuscules), un seul parcours du texte mis en minuscules
+    pour tous les champs.
+
+    Même règle que extract_labeled_value : la valeur est le reste de la
+    ligne du label, ou à défaut la ligne non vide suivante.
+    """
+
+    def __init__(self, field_labels: Dict[str, List[str]]):
+        self.fields = list(field_labels)
+        self._field_by_label = {
+            label.lower(): field
+            for field, labels in field_labels.items()
+            for label in labels
+        }
+        # Variantes les plus longues d'abord ("Estimated Monthly Earnings"
+        # avant "Monthly Earnings")
+        alternation = "|".join(
+            re.escape(label)
+            for label in sorted(self._field_by_label, key=len, reverse=True)
+        )
+        self._pattern = re.compile(alternation)
+        self._pattern_ignorecase = re.compile(alternation, re.IGNORECASE)
+
+    def extract(self, text: str) -> Dict[str, Optional[str]]:
+        """Retourne la valeur de chaque champ (None si absent)."""
+        result: Dict[str, Optional[str]] = dict.fromkeys(self.fields)
+        missing = len(self.fields)
+
+        # Les positions trouvées dans le texte en minuscules servent à découper
+        # le texte original ; si lower() change la longueur (rare, ex. "İ"),
+        # on retombe sur la regex insensible à la casse, plus lente.
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            matches = self._pattern.finditer(lowered)
+        else:
+            matches = self._pattern_ignorecase.finditer(text)
+
+        for match in matches:
+            field = self._field_by_label[match.group(0).lower()]
+            if result[field] is not None:
+                continue
+
+            line_start = text.rfind("\n", 0, match.start()) + 1
+            line_end = text.find("\n", match.end())
+            if line_end == -1:
+                line_end = len(text)
+
+            value = (
+                text[line_start:match.start()] + text[match.end():line_end]
+            ).strip().strip(" :–-\t")
+            if not value:
+                value = self._next_line(text, line_end)
+            if not value:
+                continue
+
+            result[field] = value
+            missing -= 1
+            if not missing:
+                break
 
+        return result
+
+    @staticmethod
+    def _next_line(text: str, pos: int) -> Optional[str]:
+        """Première ligne non vide après la position `pos` (fin de ligne)."""
+        while pos < len(text):
+            start = pos + 1
+            end = text.find("\n", start)
+            if end == -1:
+                end = len(text)
+            line = text[start:end].strip()
+            if line:
+                return line
+            pos = end
+        return None
+
+
+CHANNEL_PAGE_EXTRACTOR = LabelExtractor(FIELD_LABELS)
+
+
+def read_page_content(page, with_html: bool = False) -> Tuple[str, Optional[str]]:
+    """Retourne le texte visible de la page (et son HTML si demandé)."""
     try:
         body_text = page.locator("body").inner_text(timeout=15000)
     except PlaywrightTimeoutError:
         body_text = ""
+    html = page.content() if with_html else None
+    return body_text, html
 
-    lines = [line.strip() for line in body_text.splitlines() if line.strip()]
 
-    monthly_earnings = extract_labeled_value(lines, labels_monthly)
-    avg_video_duration = extract_labeled_value(lines, labels_duration)
+def parse_channel_text(body_text: str) -> Dict[str, Optional[str]]:
+    """Extrait les infos d'enrichissement du texte d'une page chaîne (sans navigateur)."""
+    return CHANNEL_PAGE_EXTRACTOR.extract(body_text)
+
+
+def parse_channel_page(page) -> Dict[str, Optional[str]]:
+    """Parse la page d'une chaîne VidIQ et extrait les infos d'enrichissement."""
+    body_text, _ = read_page_content(page)
+    return parse_channel_text(body_text)
+
+
+def enrich_channel(page, ch: Dict, archive=None,
+                   policy: Optional[FetchPolicy] = None, telemetry=None) -> Dict:
+    """
+    Visite la page d'une chaîne et retourne le document enrichi.
+
+    La récupération passe par `policy` (retries, backoff, disjoncteur) ;
+    le nombre de retries et les classes d'échec rencontrées sont ajoutés
+    au document.
+
+    Si `archive` (PageArchive) est fourni, le texte et le HTML de la page
+    sont archivés pour pouvoir être re-parsés plus tard sans navigateur.
+
+    Si `telemetry` (RunTelemetry) est fourni, les spans navigate, wait et
+    extract de la chaîne y sont enregistrés.
+    """
+    channel_url = ch.get("channel_url")
+    policy = policy or FetchPolicy()
+    telemetry = telemetry or NullTelemetry()
+
+    def fetch():
+        with telemetry.span("navigate", channel_url):
+            response = page.goto(channel_url, wait_until="domcontentloaded", timeout=60000)
+        check_response(response)
+        with telemetry.span("wait", channel_url):
+            page.wait_for_timeout(2000)
+            body_text, html = read_page_content(page, with_html=archive is not None)
+
+        with telemetry.span("extract", channel_url):
+            extracted = parse_channel_text(body_text)
+        if not any(extracted.values()):
+            raise FetchError(PARSE_MISS, f"Aucun label reconnu sur {channel_url}",
+                             payload=(body_text, html, extracted))
+        return body_text, html, extracted
 
-    return {
-        "estimated_monthly_earnings": monthly_earnings,
-        "avg_video_duration": avg_video_duration,
+    try:
+        with telemetry.page(page, channel_url):
+            (body_text, html, extracted), meta = policy.run(fetch)
+        error = None
+    except FetchFailed as e:
+        print(f"[Enrich] ⚠ Erreur sur {channel_url} ({e.failure_class}): {e}")
+        meta = {**e.meta, "failure_class": e.failure_class}
+        error = str(e)
+        if e.payload is None:
+            return {
+                **ch,
+                **dict.fromkeys(FIELD_LABELS),
+                **meta,
+                "enriched_at": datetime.now(timezone.utc).isoformat(),
+                "error": error,
+            }
+        # parse_miss : la page a bien été chargée, on la garde pour un re-parsing
+        body_text, html, extracted = e.payload
+
+    enriched_at = datetime.now(timezone.utc).isoformat()
+    if archive is not None:
+        archive.store(channel_url, body_text, html, fetched_at=enriched_at)
+
+    doc = {
+        **ch,
+        **extracted,
+        **meta,
+        "enriched_at": enriched_at,
     }
+    if error:
+        doc["error"] = error
+    return doc
 
 
-def enrich_channels(channels: List[Dict]) -> List[Dict]:
-    """Enrichit les chaînes via Playwright."""
-    enriched = []
+def polite_pause():
+    """Pause aléatoire entre deux pages pour ne pas surcharger VidIQ."""
+    low, high = POLITE_PAUSE_SECONDS
+    if high > 0:
+        time.sleep(random.uniform(low, high))
+
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+def enrich_channels(channels: List[Dict], archive=None,
+                    pool: Optional[BrowserPool] = None,
+                    policy: Optional[FetchPolicy] = None,
+                    telemetry=None) -> List[Dict]:
+    """Enrichit les chaînes via Playwright (contextes fournis par `pool`)."""
+    enriched = []
+    policy = policy or FetchPolicy()
+    owned = pool is None
+    pool = pool or BrowserPool()
 
+    try:
         for idx, ch in enumerate(channels, start=1):
             channel_url = ch.get("channel_url")
             if not channel_url:
@@ -121,32 +423,14 @@ def enrich_channels(channels: List[Dict]) -> List[Dict]:
 
             print(f"[Enrich] ({idx}/{len(channels)}) {channel_url}")
             try:
-                page.goto(channel_url, wait_until="domcontentloaded", timeout=60000)
-                page.wait_for_timeout(2000)
-
-                extracted = parse_channel_page(page)
-                enriched_at = datetime.now(timezone.utc).isoformat()
-
-                enriched_doc = {
-                    **ch,
-                    **extracted,
-                    "enriched_at": enriched_at,
-                }
-                enriched.append(enriched_doc)
-            except Exception as e:
-                print(f"[Enrich] ⚠ Erreur sur {channel_url}: {e}")
-                enriched_doc = {
-                    **ch,
-                    "estimated_monthly_earnings": None,
-                    "avg_video_duration": None,
-                    "enriched_at": datetime.now(timezone.utc).isoformat(),
-                    "error": str(e),
-                }
-                enriched.append(enriched_doc)
+                with pool.page() as page:
+                    enriched.append(enrich_channel(page, ch, archive, policy, telemetry))
             finally:
-                time.sleep(random.uniform(1, 3))
-
-        browser.close()
+                polite_pause()
+    finally:
+        if owned:
+            pool.print_report()
+            pool.close()
 
     return enriched
 
@@ -168,29 +452,73 @@ def export_csv(rows: List[Dict]):
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         for row in rows:
-            writer.writerow(row)
+            writer.writerow({
+                key: json.dumps(value) if isinstance(value, list) else value
+                for key, value in row.items()
+            })
 
 
-def upsert_mongo(rows: List[Dict]):
-    """Upsert des données enrichies dans MongoDB (clé channel_url)."""
-    db = get_db()
-    collection = db["channels_enriched"]
+FAILURE_FIELDS = ("error", "failure_class")
+
+
+def upsert_mongo(rows: List[Dict], collection=None):
+    """
+    Upsert des données enrichies dans MongoDB (clé channel_url), champs dérivés inclus.
+
+    Pour une chaîne en échec (failure_class), les champs extraits vides ne
+    sont pas écrits : l'enrichissement d'une exécution précédente (et ses
+    champs dérivés) reste en place.
+    """
+    if collection is None:
+        collection = get_db()["channels_enriched"]
 
     for row in rows:
         channel_url = row.get("channel_url")
         if not channel_url:
             continue
         row.pop("_id", None)
-        collection.update_one(
-            {"channel_url": channel_url},
-            {"$set": row},
-            upsert=True,
-        )
+        if row.get("failure_class"):
+            row = {k: v for k, v in row.items() if not (k in FIELD_LABELS and v is None)}
+        # Enrichissement réussi : effacer l'échec d'une exécution précédente
+        cleared = {field: "" for field in FAILURE_FIELDS if not row.get(field)}
+        update = {"$set": {**{k: v for k, v in row.items() if k not in cleared}, **derived_fields(row)}}
+        if cleared:
+            update["$unset"] = cleared
+        collection.update_one({"channel_url": channel_url}, update, upsert=True)
+
+
+def record_failure(doc: Dict, collection=None):
+    """
+    Enregistre l'échec d'un enrichissement (erreur, classes d'échec,
+    retries) sans toucher aux champs déjà extraits. Une chaîne encore
+    absente est créée avec ses données de classement.
+    """
+    if collection is None:
+        collection = get_db()["channels_enriched"]
+
+    channel_url = doc.get("channel_url")
+    if not channel_url:
+        return
+    failure = {field: doc.get(field) for field in FAILURE_FIELDS + ("failure_classes", "retries")}
+    failure["failed_at"] = doc.get("enriched_at") or datetime.now(timezone.utc).isoformat()
+    listing = {
+        k: v for k, v in doc.items()
+        if k not in FIELD_LABELS and k not in failure and k not in ("_id", "enriched_at")
+    }
+    collection.update_one(
+        {"channel_url": channel_url},
+        {"$set": failure, "$setOnInsert": {**listing, **derived_fields(listing)}},
+        upsert=True,
+    )
 
 
 def main():
     parser = argparse.ArgumentParser(description="Enrichissement VidIQ (Phase 2)")
     parser.add_argument("--limit", type=int, default=None, help="Limiter le nombre de chaînes")
+    parser.add_argument("--archive", action="store_true",
+                        help="Archiver les pages visitées (data/archive) pour re-parsing")
+    parser.add_argument("--trace-slowest", type=int, default=0,
+                        help="Garder la trace Playwright des N pages les plus lentes")
     args = parser.parse_args()
 
     print("\n" + "=" * 60)
@@ -202,11 +530,25 @@ def main():
         print("✗ Aucun channel dans le CSV")
         return 1
 
-    enriched = enrich_channels(channels)
-    export_csv(enriched)
-    upsert_mongo(enriched)
+    archive = PageArchive() if args.archive else None
+    telemetry = RunTelemetry("vidiq_enrich", trace_slowest=args.trace_slowest)
+    enriched = enrich_channels(channels, archive, telemetry=telemetry)
+    with telemetry.span("write"):
+        export_csv(enriched)
+        # Import local : columnar_export réutilise les convertisseurs de ce module
+        from scrapers.columnar_export import export_parquet
+        parquet_paths = export_parquet(enriched)
+        upsert_mongo(enriched)
+    db = get_db()
+    stamp_data_version(db, source="vidiq_enrich")
+    trigger_prerender()
+    telemetry.finish(db, extra={
+        "enriched": len(enriched),
+        "failed": sum(1 for d in enriched if d.get("failure_class")),
+    })
 
     print(f"\n CSV enrichi: {ENRICHED_CSV_PATH}")
+    print(f" Parquet: {', '.join(parquet_paths) or '-'}")
     print(" MongoDB: collection channels_enriched")
     return 0
 
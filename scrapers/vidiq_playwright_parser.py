@@ -2,9 +2,89 @@
 Parser VidIQ utilisant directement Playwright pour extraire les données.
 """
 
-from typing import List, Dict
-import re
-from playwright.sync_api import sync_playwright
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Iterator, Iterable, Optional
+from scrapers.browser_pool import BrowserPool
+from scrapers.fetch_policy import FetchPolicy, check_response
+from scrapers.telemetry import NullTelemetry
+
+
+DEFAULT_LIST_URL = "https://vidiq.com/fr/youtube-stats/top/100/"
+
+# Délai laissé au rendu React après l'apparition de la table (ms)
+SETTLE_MS = 5000
+
+# Lien vers la page suivante d'un classement paginé
+_NEXT_PAGE_JS = """
+() => {
+    const next = document.querySelector('a[rel="next"], link[rel="next"], nav[aria-label*="agination"] a[aria-label*="ext"]');
+    return next ? next.href : null;
+}
+"""
+
+
+# Exécuté dans la page. Au premier appel, installe un MutationObserver qui
+# accumule dans window.__vidiqLinks les liens "#<rank>..." vers les pages
+# chaînes. Chaque appel peut ensuite scroller le conteneur des liens,
+# attendre le rendu, puis renvoyer en une fois lignes de la table et liens.
+_SNAPSHOT_JS = """
+async ({ scroll, delay }) => {
+    const LINK_SELECTOR = 'a[href*="/youtube-stats/channel/"]';
+
+    if (!window.__vidiqLinks) {
+        const links = {};
+        const add = (a) => {
+            const text = (a.innerText || '').trim();
+            const m = text.match(/^#(\\d+)/);
+            const href = a.getAttribute('href');
+            if (m && href) {
+                links[m[1]] = href.startsWith('/') ? `https://vidiq.com${href}` : href;
+            }
+        };
+        document.querySelectorAll(LINK_SELECTOR).forEach(add);
+        new MutationObserver((mutations) => {
+            for (const mutation of mutations) {
+                if (mutation.type === 'attributes') {
+                    if (mutation.target.matches(LINK_SELECTOR)) add(mutation.target);
+                    continue;
+                }
+                for (const node of mutation.addedNodes) {
+                    if (node.nodeType !== Node.ELEMENT_NODE) continue;
+                    if (node.matches(LINK_SELECTOR)) add(node);
+                    node.querySelectorAll(LINK_SELECTOR).forEach(add);
+                }
+            }
+        }).observe(document.body, {
+            childList: true, subtree: true, attributes: true, attributeFilter: ['href'],
+        });
+        window.__vidiqLinks = links;
+    }
+
+    if (scroll) {
+        // Conteneur scrollable des cartes/liens, sinon la page entière
+        let el = document.querySelector(LINK_SELECTOR);
+        el = el ? el.parentElement : null;
+        while (el) {
+            const style = window.getComputedStyle(el);
+            if ((style.overflowY === 'auto' || style.overflowY === 'scroll') && el.scrollHeight > el.clientHeight) {
+                break;
+            }
+            el = el.parentElement;
+        }
+        el = el || document.scrollingElement || document.documentElement;
+        el.scrollTo(0, el.scrollHeight);
+        await new Promise((resolve) => setTimeout(resolve, delay));
+    }
+
+    const rows = Array.from(document.querySelectorAll('table tbody tr')).map((tr, index) => ({
+        index,
+        cells: Array.from(tr.querySelectorAll('td')).map((td) => td.innerText.trim()),
+    }));
+    return { rowCount: rows.length, rows, links: { ...window.__vidiqLinks } };
+}
+"""
 
 
 class VidIQPlaywrightParser:
@@ -16,181 +96,325 @@ class VidIQPlaywrightParser:
     - channel_name  
     - channel_url (lien VidIQ vers la page détail)
     - subscribers, videos, total_views
+    - lists (classements où la chaîne apparaît, avec son rang dans chacun)
     """
     
     @staticmethod
-    def scrape_top100(url: str = "https://vidiq.com/fr/youtube-stats/top/100/") -> List[Dict]:
+    def scrape_top100(url: str = DEFAULT_LIST_URL, pool: Optional[BrowserPool] = None,
+                      policy: Optional[FetchPolicy] = None, telemetry=None) -> List[Dict]:
         """
         Scrape le Top 100 VidIQ avec Playwright
         """
-        channels = []
-        
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            
+        channels = list(VidIQPlaywrightParser.iter_top100(url, pool, policy, telemetry))
+        print(f"[VidIQPlaywrightParser] ✓ {len(channels)} chaînes extraites avec succès")
+        return channels
+
+    @staticmethod
+    def iter_top100(url: str = DEFAULT_LIST_URL, pool: Optional[BrowserPool] = None,
+                    policy: Optional[FetchPolicy] = None, telemetry=None) -> Iterator[Dict]:
+        """
+        Variante générateur de scrape_top100 : chaque chaîne est renvoyée
+        dès que son URL est résolue, pour que l'enrichissement démarre
+        sans attendre la fin de la Phase 1.
+
+        Sans `pool`, un BrowserPool est créé puis fermé pour l'occasion.
+        """
+        owned = pool is None
+        pool = pool or BrowserPool()
+        try:
+            with pool.page() as page:
+                yield from VidIQPlaywrightParser.extract_top100(page, url, policy, telemetry)
+        finally:
+            if owned:
+                pool.close()
+
+    @staticmethod
+    def scrape_lists(urls: Iterable[str], max_pages: Optional[int] = None,
+                     workers: int = 4, pool: Optional[BrowserPool] = None,
+                     policy: Optional[FetchPolicy] = None, telemetry=None,
+                     completed: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Scrape plusieurs classements VidIQ (paginés) et dédoublonne par channel_url.
+
+        `completed` (voir iter_lists) reçoit les classements lus jusqu'au bout.
+        """
+        channels = list(VidIQPlaywrightParser.iter_lists(urls, max_pages, workers, pool, policy,
+                                                         telemetry, completed))
+        print(f"[VidIQPlaywrightParser] ✓ {len(channels)} chaînes uniques extraites")
+        return channels
+
+    @staticmethod
+    def iter_lists(urls: Iterable[str], max_pages: Optional[int] = None,
+                   workers: int = 4, pool: Optional[BrowserPool] = None,
+                   policy: Optional[FetchPolicy] = None, telemetry=None,
+                   completed: Optional[List[str]] = None,
+                   before_page: Optional[Callable[[], bool]] = None) -> Iterator[Dict]:
+        """
+        Parcourt chaque classement page par page, en parallèle (un contexte
+        navigateur par liste en cours), et renvoie chaque chaîne à sa
+        première apparition.
+
+        Une chaîne déjà vue voit simplement son champ `lists` complété ; le
+        dict renvoyé plus tôt est mis à jour en place. `rank` est le rang
+        dans le premier classement de `urls` (None pour une chaîne absente
+        de celui-ci), quel que soit l'ordre d'arrivée des listes. Une chaîne
+        sans URL n'est gardée que dans ce premier classement (clé : rank).
+
+        `completed`, si fourni, reçoit l'URL de chaque classement lu jusqu'à
+        sa dernière page (ni erreur, ni arrêt par max_pages ou par
+        l'appelant) : seuls ces classements permettent de supprimer les
+        chaînes disparues.
+
+        `before_page` est transmis à crawl_list (budget de pages par page
+        réellement chargée).
+        """
+        urls = list(dict.fromkeys(urls))
+        primary = urls[0] if urls else None
+        events: "queue.Queue" = queue.Queue()
+        stop = threading.Event()
+        done = object()
+        owned = pool is None
+        pool = pool or BrowserPool()
+        policy = policy or FetchPolicy()
+
+        def crawl(list_url: str):
+            progress: Dict = {}
+            try:
+                with pool.page() as page:
+                    for channel in VidIQPlaywrightParser.crawl_list(page, list_url, max_pages, policy,
+                                                                     telemetry, progress, before_page):
+                        if stop.is_set():
+                            break
+                        events.put((list_url, channel))
+                if progress.get("complete") and not stop.is_set() and completed is not None:
+                    completed.append(list_url)
+            except Exception as e:
+                print(f"[VidIQPlaywrightParser] ✗ Erreur sur la liste {list_url}: {e}")
+            finally:
+                pool.release()
+                events.put((list_url, done))
+
+        by_url: Dict[str, Dict] = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls))))
+        try:
+            for list_url in urls:
+                executor.submit(crawl, list_url)
+
+            remaining = len(urls)
+            while remaining:
+                list_url, channel = events.get()
+                if channel is done:
+                    remaining -= 1
+                    continue
+
+                membership = {"list": list_url, "rank": channel["rank"]}
+                key = channel.get("channel_url")
+                if key and key in by_url:
+                    known = by_url[key]
+                    known["lists"].append(membership)
+                    if list_url == primary:
+                        known["rank"] = channel["rank"]
+                    continue
+
+                if not key and list_url != primary:
+                    # Ni URL ni rang principal : aucune clé pour la stocker ni
+                    # la dédoublonner, et rien à enrichir
+                    print(f"[VidIQPlaywrightParser] ⚠ Chaîne sans URL ignorée "
+                          f"({list_url}, rang {channel['rank']})")
+                    continue
+                channel["lists"] = [membership]
+                if list_url != primary:
+                    channel["rank"] = None
+                if key:
+                    by_url[key] = channel
+                yield channel
+        finally:
+            stop.set()
+            executor.shutdown(wait=True)
+            if owned:
+                pool.close()
+
+    @staticmethod
+    def crawl_list(page, url: str, max_pages: Optional[int] = None,
+                   policy: Optional[FetchPolicy] = None, telemetry=None,
+                   progress: Optional[Dict] = None,
+                   before_page: Optional[Callable[[], bool]] = None) -> Iterator[Dict]:
+        """
+        Extrait toutes les pages d'un classement en suivant le lien "suivant".
+
+        `progress`, si fourni, reçoit le nombre de pages lues ("pages") et
+        "complete" = True quand la dernière page a été atteinte.
+
+        `before_page`, si fourni, est appelé avant chaque chargement de
+        page (ex. prise d'un jeton du budget) ; s'il renvoie False, le
+        parcours s'arrête là, classement incomplet.
+        """
+        progress = progress if progress is not None else {}
+        progress.update(pages=0, complete=False)
+        seen_pages = set()
+        page_url = url
+        while page_url and page_url not in seen_pages:
+            if before_page is not None and not before_page():
+                break
+            seen_pages.add(page_url)
+            yield from VidIQPlaywrightParser.extract_top100(page, page_url, policy, telemetry)
+            progress["pages"] += 1
+
+            if max_pages and len(seen_pages) >= max_pages:
+                break
+            page_url = page.evaluate(_NEXT_PAGE_JS)
+            if page_url:
+                print(f"[VidIQPlaywrightParser] Page suivante : {page_url}")
+        else:
+            progress["complete"] = True
+
+    @staticmethod
+    def extract_top100(page, url: str, policy: Optional[FetchPolicy] = None,
+                       telemetry=None) -> Iterator[Dict]:
+        """
+        Extrait le classement depuis une page Playwright déjà ouverte.
+
+        Toute l'extraction DOM passe par page.evaluate : un seul aller-retour
+        par étape de scroll renvoie lignes, rangs et liens. Les liens sont
+        accumulés côté navigateur par un MutationObserver au lieu d'être
+        rescannés. Le clic ligne par ligne ne sert plus qu'en dernier recours.
+
+        Le chargement de la table passe par `policy` : un timeout ou une
+        réponse 429/5xx est rejoué avec backoff au lieu de faire échouer
+        toute l'exécution.
+
+        Si `telemetry` (RunTelemetry) est fourni, les spans navigate, wait et
+        extract de la page de classement y sont enregistrés.
+        """
+        rpc = {"calls": 0}
+        telemetry = telemetry or NullTelemetry()
+
+        def call(fn, *args, **kwargs):
+            rpc["calls"] += 1
+            return fn(*args, **kwargs)
+
+        def load():
             print(f"[VidIQPlaywrightParser] Navigation vers {url}")
-            page.goto(url, wait_until="domcontentloaded", timeout=60000)
-            
+            with telemetry.span("navigate", url):
+                check_response(call(page.goto, url, wait_until="domcontentloaded", timeout=60000))
+
             # Attendre explicitement la table
             print("[VidIQPlaywrightParser] Attente de la table...")
-            page.wait_for_selector('table tbody tr', timeout=30000)
-            
+            with telemetry.span("wait", url):
+                call(page.wait_for_selector, 'table tbody tr', timeout=30000)
+
+        with telemetry.page(page, url):
+            _, fetch_meta = (policy or FetchPolicy()).run(load)
+            if fetch_meta["retries"]:
+                print(f"[VidIQPlaywrightParser] Table chargée après {fetch_meta['retries']} retries "
+                      f"({', '.join(fetch_meta['failure_classes'])})")
+
             # Petit délai pour laisser React charger complètement
-            page.wait_for_timeout(5000)
-            
-            print("[VidIQPlaywrightParser] Extraction des liens de chaînes...")
-
-            # Extraire les données de la table pour connaître la cible
-            rows = page.query_selector_all('table tbody tr')
-            target_count = len(rows)
-            print(f"[VidIQPlaywrightParser] {target_count} lignes trouvées")
-
-            # Créer un mapping rank -> URL depuis les liens (les liens sont dans des DIV en dehors de la table)
-            url_by_rank = {}
-
-            def collect_links() -> int:
-                channel_links = page.query_selector_all('a[href*="/youtube-stats/channel/"]')
-                for link in channel_links:
-                    href = link.get_attribute('href')
-                    text = link.inner_text().strip()
-
-                    # Le texte contient le rank au début (ex: "#1MrBeast941466M110.42B")
-                    if text.startswith('#'):
-                        rank_str = text[1:].split(' ')[0]
-                        rank_match = re.match(r'(\d+)', rank_str)
-                        if rank_match:
-                            rank = int(rank_match.group(1))
-                            if href:
-                                if href.startswith('/'):
-                                    full_url = f"https://vidiq.com{href}"
-                                else:
-                                    full_url = href
-                                url_by_rank[rank] = full_url
-                return len(url_by_rank)
-
-            # Détecter le conteneur scrollable des cartes/liens
-            scroll_handle = page.evaluate_handle(
-                """
-                () => {
-                    const link = document.querySelector('a[href*="/youtube-stats/channel/"]');
-                    if (!link) return null;
-                    let el = link.parentElement;
-                    while (el) {
-                        const style = window.getComputedStyle(el);
-                        if ((style.overflowY === 'auto' || style.overflowY === 'scroll') && el.scrollHeight > el.clientHeight) {
-                            return el;
-                        }
-                        el = el.parentElement;
-                    }
-                    return document.scrollingElement || document.documentElement;
-                }
-                """
-            )
-            scroll_element = scroll_handle.as_element() if scroll_handle else None
-
-            # Collecte initiale
-            current_count = collect_links()
-            print(f"[VidIQPlaywrightParser] ✓ {current_count} liens trouvés")
-
-            # Scroll pour charger tous les liens si nécessaire
-            scroll_attempts = 0
-            max_scroll_attempts = 25
-            last_count = current_count
-            while current_count < target_count and scroll_attempts < max_scroll_attempts:
-                scroll_attempts += 1
-                if scroll_element:
-                    page.evaluate("(el) => el.scrollTo(0, el.scrollHeight)", scroll_element)
-                else:
-                    page.evaluate("() => window.scrollBy(0, document.body.scrollHeight)")
-
-                page.wait_for_timeout(1200)
-                current_count = collect_links()
-                print(f"[VidIQPlaywrightParser] Liens: {current_count}/{target_count} (scroll {scroll_attempts})")
-
-                if current_count == last_count:
-                    page.wait_for_timeout(1200)
+            with telemetry.span("wait", url):
+                call(page.wait_for_timeout, SETTLE_MS)
+
+            with telemetry.span("extract", url):
+                print("[VidIQPlaywrightParser] Extraction des liens de chaînes...")
+
+                # Installe l'observer et récupère le premier instantané en un seul appel
+                snapshot = call(page.evaluate, _SNAPSHOT_JS, {"scroll": False, "delay": 0})
+                target_count = snapshot["rowCount"]
+                print(f"[VidIQPlaywrightParser] {target_count} lignes trouvées")
+
+                rows_by_index = {row["index"]: row for row in snapshot["rows"]}
+                url_by_rank = {int(rank): href for rank, href in snapshot["links"].items()}
+                current_count = len(url_by_rank)
+                print(f"[VidIQPlaywrightParser] ✓ {current_count} liens trouvés")
+
+                # Scroll pour charger tous les liens si nécessaire
+                scroll_attempts = 0
+                max_scroll_attempts = 25
                 last_count = current_count
+                while current_count < target_count and scroll_attempts < max_scroll_attempts:
+                    scroll_attempts += 1
+                    delay = 1200 if current_count != last_count or scroll_attempts == 1 else 2400
+                    last_count = current_count
 
-            print(f"[VidIQPlaywrightParser] {len(url_by_rank)} URLs mappées par rank")
-            
-            # Extraire d'abord toutes les données textuelles des lignes
-            row_data = []
-            for idx, row in enumerate(rows):
-                try:
-                    cells = row.query_selector_all('td')
+                    snapshot = call(page.evaluate, _SNAPSHOT_JS, {"scroll": True, "delay": delay})
+                    for row in snapshot["rows"]:
+                        rows_by_index.setdefault(row["index"], row)
+                    url_by_rank.update({int(rank): href for rank, href in snapshot["links"].items()})
+                    current_count = len(url_by_rank)
+                    print(f"[VidIQPlaywrightParser] Liens: {current_count}/{target_count} (scroll {scroll_attempts})")
+
+                print(f"[VidIQPlaywrightParser] {len(url_by_rank)} URLs mappées par rank")
+
+                # Données textuelles des lignes (déjà extraites côté navigateur)
+                row_data = []
+                for idx in sorted(rows_by_index):
+                    cells = rows_by_index[idx]["cells"]
                     if len(cells) < 5:
                         continue
+                    try:
+                        row_data.append({
+                            "row_index": idx,
+                            "rank": int(cells[0].replace('#', '')),
+                            "channel_name": cells[1],
+                            "videos_raw": cells[2],
+                            "subscribers_raw": cells[3],
+                            "total_views_raw": cells[4],
+                        })
+                    except Exception as e:
+                        print(f"[VidIQPlaywrightParser] Erreur lecture ligne {idx+1}: {e}")
 
-                    rank_text = cells[0].inner_text().strip()
-                    channel_name = cells[1].inner_text().strip()
-                    videos = cells[2].inner_text().strip()
-                    subscribers = cells[3].inner_text().strip()
-                    total_views = cells[4].inner_text().strip()
-
-                    rank = int(rank_text.replace('#', ''))
-
-                    row_data.append({
-                        "row_index": idx,
-                        "rank": rank,
-                        "channel_name": channel_name,
-                        "videos_raw": videos,
-                        "subscribers_raw": subscribers,
-                        "total_views_raw": total_views,
-                    })
-                except Exception as e:
-                    print(f"[VidIQPlaywrightParser] Erreur lecture ligne {idx+1}: {e}")
-
-            # Résoudre les URLs manquantes en cliquant sur chaque ligne
-            def resolve_url_by_click(row_index: int) -> str | None:
-                try:
-                    rows_now = page.query_selector_all('table tbody tr')
-                    if row_index >= len(rows_now):
-                        return None
-                    row_now = rows_now[row_index]
-                    with page.expect_navigation(timeout=30000):
-                        row_now.click()
-                    url = page.url
-                    page.go_back(wait_until="domcontentloaded")
-                    page.wait_for_selector('table tbody tr', timeout=30000)
-                    page.wait_for_timeout(500)
-                    return url
-                except Exception as e:
-                    print(f"[VidIQPlaywrightParser] Erreur navigation ligne {row_index+1}: {e}")
+        # Dernier recours : résoudre une URL manquante en cliquant sur la ligne
+        def resolve_url_by_click(row_index: int) -> str | None:
+            try:
+                rows_now = call(page.query_selector_all, 'table tbody tr')
+                if row_index >= len(rows_now):
                     return None
+                row_now = rows_now[row_index]
+                with page.expect_navigation(timeout=30000):
+                    call(row_now.click)
+                url = page.url
+                call(page.go_back, wait_until="domcontentloaded")
+                call(page.wait_for_selector, 'table tbody tr', timeout=30000)
+                call(page.wait_for_timeout, 500)
+                return url
+            except Exception as e:
+                print(f"[VidIQPlaywrightParser] Erreur navigation ligne {row_index+1}: {e}")
+                return None
+
+        # Construire les objets finaux
+        clicks = 0
+        for item in row_data:
+            try:
+                rank = item["rank"]
+                channel_name = item["channel_name"]
+
+                channel_url = url_by_rank.get(rank)
+                if not channel_url:
+                    clicks += 1
+                    channel_url = resolve_url_by_click(item["row_index"])
+
+                videos_count = VidIQPlaywrightParser._parse_number(item["videos_raw"])
+                subscribers_count = VidIQPlaywrightParser._parse_number(item["subscribers_raw"])
+                views_count = VidIQPlaywrightParser._parse_number(item["total_views_raw"])
+
+                channel = {
+                    'rank': rank,
+                    'channel_name': channel_name,
+                    'channel_url': channel_url,
+                    'videos': videos_count,
+                    'subscribers': subscribers_count,
+                    'total_views': views_count,
+                }
+            except Exception as e:
+                print(f"[VidIQPlaywrightParser] ⚠ Erreur ligne rank {item.get('rank')}: {e}")
+                continue
+
+            yield channel
+
+        print(
+            f"[VidIQPlaywrightParser] {rpc['calls']} appels Playwright "
+            f"({scroll_attempts} scrolls, {clicks} résolutions par clic)"
+        )
 
-            # Construire les objets finaux
-            for item in row_data:
-                try:
-                    rank = item["rank"]
-                    channel_name = item["channel_name"]
-
-                    channel_url = url_by_rank.get(rank)
-                    if not channel_url:
-                        channel_url = resolve_url_by_click(item["row_index"])
-
-                    videos_count = VidIQPlaywrightParser._parse_number(item["videos_raw"])
-                    subscribers_count = VidIQPlaywrightParser._parse_number(item["subscribers_raw"])
-                    views_count = VidIQPlaywrightParser._parse_number(item["total_views_raw"])
-
-                    channel = {
-                        'rank': rank,
-                        'channel_name': channel_name,
-                        'channel_url': channel_url,
-                        'videos': videos_count,
-                        'subscribers': subscribers_count,
-                        'total_views': views_count,
-                    }
-
-                    channels.append(channel)
-                except Exception as e:
-                    print(f"[VidIQPlaywrightParser] ⚠ Erreur ligne rank {item.get('rank')}: {e}")
-            
-            browser.close()
-            
-        print(f"[VidIQPlaywrightParser] ✓ {len(channels)} chaînes extraites avec succès")
-        return channels
-    
     @staticmethod
     def _parse_number(text: str) -> int:
         """
@@ -5,9 +5,88 @@ Récupère les données, les parse et les stocke dans MongoDB.
 
 import os
 import csv
+import json
+import argparse
 from datetime import datetime
-from scrapers.vidiq_playwright_parser import VidIQPlaywrightParser
-from scrapers.db import get_db
+from typing import Dict, List, Optional
+from scrapers.vidiq_playwright_parser import VidIQPlaywrightParser, DEFAULT_LIST_URL
+from scrapers.db import get_db, stamp_data_version
+from scrapers.history import append_snapshots
+from scrapers.telemetry import RunTelemetry
+
+
+RAW_CSV_PATH = os.path.join("data", "raw", "channels_top100.csv")
+RAW_CSV_FIELDS = [
+    "rank",
+    "channel_name",
+    "channel_url",
+    "videos",
+    "subscribers",
+    "total_views",
+    "scraped_at",
+    "lists",
+]
+
+
+def store_channel(collection, channel: Dict):
+    """
+    Upsert d'une chaîne classée dans Mongo.
+
+    Clé : channel_url (une chaîne peut apparaître dans plusieurs listes),
+    ou rank à défaut d'URL. Une chaîne sans l'un ni l'autre n'est pas
+    stockée : elle écraserait les autres sur {"rank": None}.
+    """
+    channel.pop("_id", None)
+    if channel.get("channel_url"):
+        key = {"channel_url": channel["channel_url"]}
+    elif channel.get("rank") is not None:
+        key = {"rank": channel["rank"]}
+    else:
+        print(f"[VideoScraper] ⚠ Chaîne sans URL ni rang ignorée : {channel.get('channel_name')}")
+        return
+    collection.update_one(key, {"$set": channel}, upsert=True)
+
+
+def prune_stale(collection, scraped_at: datetime, lists: List[str]) -> int:
+    """
+    Supprime les chaînes absentes du dernier scraping.
+
+    Args:
+        lists: Classements lus en entier pendant ce scraping ; seules les
+            chaînes dont tous les classements en font partie sont
+            candidates (une chaîne d'un classement non relu est gardée)
+    """
+    if not lists:
+        return 0
+    scope = [{"lists.list": {"$in": lists},
+              "lists": {"$not": {"$elemMatch": {"list": {"$nin": lists}}}}}]
+    if DEFAULT_LIST_URL in lists:
+        # Documents antérieurs au champ lists : Top 100 mondial
+        scope.append({"lists": {"$exists": False}})
+    result = collection.delete_many({"scraped_at": {"$ne": scraped_at}, "$or": scope})
+    return result.deleted_count
+
+
+def export_raw_csv(channels: List[Dict], scraped_at: datetime) -> str:
+    """Écrit le CSV raw (checkpoint) et retourne son chemin."""
+    os.makedirs(os.path.dirname(RAW_CSV_PATH), exist_ok=True)
+
+    with open(RAW_CSV_PATH, mode="w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=RAW_CSV_FIELDS)
+        writer.writeheader()
+        for channel in channels:
+            writer.writerow({
+                "rank": channel.get("rank"),
+                "channel_name": channel.get("channel_name") or channel.get("name"),
+                "channel_url": channel.get("channel_url"),
+                "videos": channel.get("videos"),
+                "subscribers": channel.get("subscribers"),
+                "total_views": channel.get("total_views"),
+                "scraped_at": scraped_at.isoformat(),
+                "lists": json.dumps(channel.get("lists") or []),
+            })
+
+    return RAW_CSV_PATH
 
 
 class VideoScraper:
@@ -18,21 +97,41 @@ class VideoScraper:
     3. Exporte CSV
     """
     
-    def __init__(self):
-        """Initialise le scraper avec les config."""
-        # URL à scraper
-        self.url = "https://vidiq.com/fr/youtube-stats/top/100/"
+    def __init__(self, urls: Optional[List[str]] = None,
+                 max_pages: Optional[int] = None, workers: int = 4,
+                 trace_slowest: int = 0):
+        """
+        Initialise le scraper avec les config.
+
+        Args:
+            urls: Classements VidIQ à parcourir (Top 100 mondial par défaut),
+                par ex. listes par pays ou par catégorie
+            max_pages: Nombre max de pages suivies par classement
+            workers: Nombre de classements scrapés en parallèle
+            trace_slowest: Garder la trace Playwright des N pages les plus lentes
+        """
+        # URLs à scraper
+        self.urls = list(urls or [DEFAULT_LIST_URL])
+        self.url = self.urls[0]
+        self.max_pages = max_pages
+        self.workers = workers
+        self.trace_slowest = trace_slowest
     
     def scrape_and_store(self):
         
         try:
             print("\n" + "="*60)
-            print(" Démarrage du premier scraping VidIQ Top 100")
+            print(f" Démarrage du scraping VidIQ ({len(self.urls)} classement(s))")
             print("="*60)
             
             # Step 1 : Scrape avec Playwright
             print(f"\n Étape 1 : Scraping avec Playwright")
-            channels = VidIQPlaywrightParser.scrape_top100(self.url)
+            telemetry = RunTelemetry("video_scraper", trace_slowest=self.trace_slowest)
+            completed: List[str] = []
+            channels = VidIQPlaywrightParser.scrape_lists(
+                self.urls, max_pages=self.max_pages, workers=self.workers,
+                telemetry=telemetry, completed=completed,
+            )
             
             if not channels:
                 print("Aucune donnée extraite")
@@ -40,55 +139,31 @@ class VideoScraper:
             
             # Step 2 : Ajoute timestamp et stocke dans Mongo
             print("\n Étape 2 : Stockage dans MongoDB")
-            db = get_db()
-            collection = db['channels_top100']
+            collection = get_db()['channels_top100']
 
             scraped_at = datetime.utcnow()
-            for channel in channels:
-                channel['scraped_at'] = scraped_at
-
-                # Upsert par rang
-                channel.pop("_id", None)
-                collection.update_one(
-                    {"rank": channel.get("rank")},
-                    {"$set": channel},
-                    upsert=True
-                )
+            with telemetry.span("write"):
+                for channel in channels:
+                    channel['scraped_at'] = scraped_at
+                    store_channel(collection, channel)
+                # Un classement incomplet : on ne sait pas quelles chaînes ont disparu
+                removed = 0
+                if len(completed) == len(set(self.urls)):
+                    removed = prune_stale(collection, scraped_at, completed)
+                else:
+                    print(f"[VideoScraper] ⚠ {len(set(self.urls)) - len(completed)} classement(s) "
+                          f"incomplet(s) : aucune suppression")
+                append_snapshots(collection.database, channels, scraped_at)
+            stamp_data_version(collection.database, source="video_scraper")
 
-            print(f"[VideoScraper]  {len(channels)} documents insérés / mis à jour")
+            print(f"[VideoScraper]  {len(channels)} documents insérés / mis à jour, {removed} supprimés")
 
             # Step 3 : Export CSV (checkpoint)
             print("\n Étape 3 : Export CSV")
-            raw_dir = os.path.join("data", "raw")
-            os.makedirs(raw_dir, exist_ok=True)
-            csv_path = os.path.join(raw_dir, "channels_top100.csv")
-
-            with open(csv_path, mode="w", newline="", encoding="utf-8") as csvfile:
-                writer = csv.DictWriter(
-                    csvfile,
-                    fieldnames=[
-                        "rank",
-                        "channel_name",
-                        "channel_url",
-                        "videos",
-                        "subscribers",
-                        "total_views",
-                        "scraped_at",
-                    ],
-                )
-                writer.writeheader()
-                for channel in channels:
-                    writer.writerow({
-                        "rank": channel.get("rank"),
-                        "channel_name": channel.get("channel_name") or channel.get("name"),
-                        "channel_url": channel.get("channel_url"),
-                        "videos": channel.get("videos"),
-                        "subscribers": channel.get("subscribers"),
-                        "total_views": channel.get("total_views"),
-                        "scraped_at": scraped_at.isoformat(),
-                    })
+            csv_path = export_raw_csv(channels, scraped_at)
 
             print(f"[VideoScraper]  CSV exporté: {csv_path}")
+            telemetry.finish(collection.database, extra={"scraped": len(channels), "removed": removed})
             
             # Affiche un résumé
             print("\n Résumé des top 5 :")
@@ -113,7 +188,17 @@ class VideoScraper:
 
 def main():
     """Point d'entrée pour lancer le scraper"""
-    scraper = VideoScraper()
+    parser = argparse.ArgumentParser(description="Scraping des classements VidIQ")
+    parser.add_argument("--list", dest="urls", action="append", default=None,
+                        help="URL d'un classement (répétable)")
+    parser.add_argument("--max-pages", type=int, default=None, help="Pages max par classement")
+    parser.add_argument("--workers", type=int, default=4, help="Classements en parallèle")
+    parser.add_argument("--trace-slowest", type=int, default=0,
+                        help="Garder la trace Playwright des N pages les plus lentes")
+    args = parser.parse_args()
+
+    scraper = VideoScraper(args.urls, max_pages=args.max_pages, workers=args.workers,
+                           trace_slowest=args.trace_slowest)
     success = scraper.scrape_and_store()
     return 0 if success else 1
 
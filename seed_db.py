@@ -1,23 +1,28 @@
 """
 seed_db.py
 Orchestrateur Docker :
-1) Scraping Top100 (video_scraper)
-2) Enrichissement VidIQ (vidiq_enrich)
+Scraping Top100 et enrichissement VidIQ en flux (scrapers.pipeline) :
+chaque chaîne part à l'enrichissement dès que son URL est résolue.
 
 Garantit :
 - Mongo prêt avant de lancer
-- Vidiq scraper terminé avant vidiq_enrich scraper
-- CSV raw bien présent
+- CSV raw / enrichi et collections Mongo produits comme avant
+- Temps mural affiché par étape, télémétrie de l'exécution dans
+  scrape_runs et data/runs/<run_id>.json
+- Pages web pré-rendues (app/prerender.py) à partir des nouvelles données
 """
 
-import os
 import sys
 import time
+import argparse
 
 sys.path.insert(0, ".")
 
-from scrapers.vidiq_scraper import VideoScraper
 from scrapers.db import get_db
+from scrapers.pipeline import run_pipeline
+from scrapers.prerender import trigger_prerender
+from scrapers.browser_pool import BrowserPool
+from scrapers.replay import HarRecorder, HarReplayer
 import scrapers.vidiq_enrich as vidiq_enrich
 
 
@@ -40,8 +45,34 @@ def wait_for_mongo(retries=40, delay=2):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scraping + enrichissement VidIQ")
+    parser.add_argument("--workers", type=int, default=2, help="Navigateurs d'enrichissement")
+    parser.add_argument("--limit", type=int, default=None, help="Limiter le nombre de chaînes")
+    parser.add_argument("--list", dest="urls", action="append", default=None,
+                        help="URL d'un classement VidIQ (répétable, Top 100 par défaut)")
+    parser.add_argument("--max-pages", type=int, default=None, help="Pages max par classement")
+    parser.add_argument("--archive", action="store_true",
+                        help="Archiver les pages chaînes pour re-parsing (scrapers.archive)")
+    parser.add_argument("--pages-per-context", type=int, default=50,
+                        help="Pages servies par contexte navigateur avant recyclage")
+    parser.add_argument("--max-browser-rss-mb", type=float, default=None,
+                        help="Recycler les contextes au-delà de cette mémoire navigateur")
+    parser.add_argument("--browser-cache-dir", default=None,
+                        help="Cache disque persistant des assets statiques")
+    parser.add_argument("--trace-slowest", type=int, default=0,
+                        help="Garder la trace Playwright des N pages les plus lentes (data/runs/traces)")
+    parser.add_argument("--record-har", default=None, metavar="DIR",
+                        help="Enregistrer le trafic des contextes en HAR (scrapers.replay)")
+    parser.add_argument("--replay-har", default=None, metavar="DIR",
+                        help="Rejouer les HAR enregistrés au lieu de vidiq.com")
+    parser.add_argument("--replay-latency-ms", type=float, default=0.0,
+                        help="Latence ajoutée à chaque document rejoué")
+    parser.add_argument("--replay-error-rate", type=float, default=0.0,
+                        help="Proportion de documents rejoués en erreur 503")
+    args = parser.parse_args()
+
     print("\n" + "=" * 70)
-    print(" Orchestration Vidiq scraper -> vidiq_enrich scraper")
+    print(" Orchestration Vidiq scraper -> vidiq_enrich scraper (pipeline)")
     print("=" * 70 + "\n")
 
 
@@ -52,38 +83,42 @@ if __name__ == "__main__":
         print(f"[FATAL] {e}")
         sys.exit(1)
 
-    # Phase 1 : Top 100
-    print("\n" + "-" * 70)
-    print(" Phase 1 : video_scraper.py")
-    print("-" * 70)
-
-    scraper = VideoScraper()
-    ok1 = scraper.scrape_and_store()
-
-    if not ok1:
+    har = None
+    if args.replay_har:
+        har = HarReplayer(args.replay_har, args.replay_latency_ms, args.replay_error_rate)
+        # Pas de pause de politesse envers un rejeu local
+        vidiq_enrich.POLITE_PAUSE_SECONDS = (0.0, 0.0)
+    elif args.record_har:
+        har = HarRecorder(args.record_har)
+
+    pool = BrowserPool(
+        pages_per_context=args.pages_per_context,
+        max_rss_mb=args.max_browser_rss_mb,
+        cache_dir=args.browser_cache_dir,
+        har=har,
+    )
+    try:
+        report = run_pipeline(
+            urls=args.urls,
+            workers=args.workers,
+            limit=args.limit,
+            max_pages=args.max_pages,
+            archive=args.archive,
+            pool=pool,
+            trace_slowest=args.trace_slowest,
+        )
+    finally:
+        pool.close()
+
+    if not report["scraped"]:
         print("\n Scraping Top100 échoué → arrêt")
         sys.exit(1)
 
-    # Vérifie que le CSV raw existe (utilisé par l'enrichissement)
-    raw_csv = os.path.join("data", "raw", "channels_top100.csv")
-    if not os.path.exists(raw_csv):
-        print(f"\n✗ CSV raw introuvable : {raw_csv}")
+    if not report["enriched"]:
+        print("\n Enrichissement échoué")
         sys.exit(1)
 
-    print(f"\n[OK] CSV raw trouvé : {raw_csv}")
-
-    # Phase 2 : Enrichissement
-    print("\n" + "-" * 70)
-    print(" Phase 2 : vidiq_enrich.py")
-    print("-" * 70)
-
-    # On appelle le main() directement
-    sys.argv = ["vidiq_enrich"]  # pas de --limit
-    exit_code = vidiq_enrich.main()
-
-    if exit_code != 0:
-        print("\n Enrichissement échoué")
-        sys.exit(exit_code)
+    trigger_prerender()
 
     print("\n Scraping complété avec succès !")
     print(" MongoDB prêt pour l'application web\n")
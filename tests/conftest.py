@@ -0,0 +1,25 @@
+"""
+Tests sans navigateur ni Mongo : Mongo est remplacé par mongomock, les
+pages par du texte ou des instantanés fixes.
+
+    python -m pytest -q
+"""
+
+import os
+import sys
+
+import mongomock
+import pytest
+
+# Pas de pré-rendu lancé en sous-processus par les scrapers testés
+os.environ["PRERENDER"] = "0"
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+# app/ n'est pas un paquet : main.py importe channel_store et query_api à plat
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
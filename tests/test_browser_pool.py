@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import scrapers.browser_pool as browser_pool
+from scrapers.browser_pool import BrowserPool
+
+
+@pytest.fixture
+def child():
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    yield process
+    process.kill()
+    process.wait()
+
+
+def test_tree_rss_includes_children_without_proc_children(child, monkeypatch):
+    alone = browser_pool._rss_kb(child.pid) / 1024
+    with_parent = browser_pool._process_tree_rss_mb(os.getpid())
+
+    # Repli sur le parcours de /proc, comme sur un noyau sans CONFIG_PROC_CHILDREN
+    monkeypatch.setattr(browser_pool, "_child_pids", lambda pid: None)
+    scanned = browser_pool._process_tree_rss_mb(os.getpid())
+
+    assert alone > 0
+    assert with_parent >= alone + browser_pool._rss_kb(os.getpid()) / 1024 - 1
+    assert scanned == pytest.approx(with_parent, rel=0.2)
+
+
+def test_rss_sampled_once_per_interval(monkeypatch):
+    calls = []
+    monkeypatch.setattr(browser_pool, "_process_tree_rss_mb", lambda pid: calls.append(pid) or 100.0)
+    pool = BrowserPool(ws_endpoint="ws://unused", rss_sample_seconds=60)
+    pool._server = subprocess.Popen([sys.executable, "-c", "pass"])
+    pool._server.wait()
+
+    assert pool._sample_rss() == 100.0
+    assert pool._sample_rss() is None
+    pool._next_rss_sample = 0.0
+    assert pool._sample_rss() == 100.0
+    assert len(calls) == 2
+    assert pool.stats["peak_browser_rss_mb"] == 100.0
+
+
+def test_server_output_is_drained_after_endpoint(monkeypatch):
+    # Plus qu'un tampon de tube (64 Kio) écrit après l'endpoint
+    script = "print('ws://127.0.0.1:1/x', flush=True); print('x' * 4096 * 100)"
+    real_popen = subprocess.Popen
+    monkeypatch.setattr(browser_pool.subprocess, "Popen",
+                        lambda cmd, **kwargs: real_popen([sys.executable, "-c", script], **kwargs))
+    pool = BrowserPool()
+
+    assert pool._ensure_server() == "ws://127.0.0.1:1/x"
+    assert pool._server.wait(timeout=10) == 0
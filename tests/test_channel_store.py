@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+
+import channel_store
+from channel_store import ChannelStore, StoreCache, extract_salary
+from main import add_derived_metrics
+
+
+DOCS = [
+    {"rank": 4, "channel_name": "D", "subscribers": 500, "total_views": 9000, "videos": 30,
+     "estimated_monthly_earnings": "$6M - $18M"},
+    {"rank": 1, "channel_name": "A", "subscribers": 900, "total_views": 9000, "videos": 10,
+     "estimated_monthly_earnings": "$865K - $3M"},
+    {"rank": None, "channel_name": "sans rang", "subscribers": 500, "total_views": 100, "videos": 0,
+     "estimated_monthly_earnings": None},
+    {"rank": 3, "channel_name": "C", "subscribers": 700, "total_views": 1000, "videos": 10,
+     "estimated_monthly_earnings": "$6M - $18M"},
+    {"rank": 2, "channel_name": "B", "subscribers": 500, "total_views": 4000, "videos": 40,
+     "estimated_monthly_earnings": "$865K - $3M"},
+    {"rank": 7, "channel_name": "G", "subscribers": 0, "total_views": 0, "videos": 5,
+     "estimated_monthly_earnings": "$1K - $5K"},
+    {"rank": 5, "channel_name": "E", "subscribers": 300, "total_views": 9000, "videos": 30},
+    {"rank": 6, "channel_name": "F", "subscribers": 900, "total_views": 50, "videos": 1,
+     "estimated_monthly_earnings": "$1K - $5K"},
+]
+
+
+@pytest.fixture
+def channels(db):
+    db.channels_enriched.insert_many([dict(doc) for doc in DOCS])
+    return db.channels_enriched
+
+
+def ids(docs):
+    return [str(doc["_id"]) for doc in docs]
+
+
+def test_top_by_matches_mongo_sorts(channels):
+    store = ChannelStore.from_collection(channels)
+
+    for metric, field, order in [("rank", "rank", 1), ("rank_desc", "rank", -1),
+                                 ("videos", "videos", -1), ("total_views", "total_views", -1),
+                                 ("subscribers", "subscribers", -1)]:
+        for k in (1, 3, len(DOCS)):
+            expected = channels.find().sort(field, order).limit(k)
+            assert ids(store.rows(store.top_by(metric, k))) == ids(expected), (metric, k)
+
+
+def test_top_by_matches_python_sorts_of_derived_fields(channels):
+    store = ChannelStore.from_collection(channels)
+
+    by_rank = list(channels.find().sort("rank", 1))
+    by_salary = sorted(by_rank, key=lambda c: extract_salary(c.get("estimated_monthly_earnings", "")),
+                       reverse=True)
+    assert ids(store.rows(store.top_by("salary", 5))) == ids(by_salary[:5])
+
+    derived = add_derived_metrics(list(channels.find()))
+    for metric in ("views_per_video", "views_per_subscriber"):
+        expected = sorted(derived, key=lambda c: c[metric], reverse=True)[:5]
+        rows = store.rows(store.top_by(metric, 5))
+        assert ids(rows) == ids(expected), metric
+        assert [row[metric] for row in rows] == pytest.approx([c[metric] for c in expected])
+
+
+def test_pages_by_rank_match_mongo_skip_limit(channels):
+    store = ChannelStore.from_collection(channels)
+    per_page = 3
+
+    for page in (1, 2, 3, 4):
+        skip = (page - 1) * per_page
+        expected = list(channels.find().sort("rank", 1).skip(skip).limit(per_page))
+        rows = store.rows(store.top_by("rank", skip + per_page)[skip:])
+        assert ids(rows) == ids(expected), page
+        assert [row["rank"] for row in rows] == [doc["rank"] for doc in expected]
+
+
+def test_reload_serves_previous_store_to_concurrent_readers(db, channels, monkeypatch):
+    db.meta.insert_one({"_id": "data_version", "version": "v1"})
+    cache = StoreCache(check_every=0)
+    old = cache.get(lambda: db)
+    assert old.version == "v1"
+
+    db.meta.update_one({"_id": "data_version"}, {"$set": {"version": "v2"}})
+    channels.delete_one({"rank": 7})
+    loading, release = threading.Event(), threading.Event()
+    load = ChannelStore.from_collection
+
+    def slow_load(collection, version=None):
+        loading.set()
+        assert release.wait(5)
+        return load(collection, version)
+
+    monkeypatch.setattr(channel_store.ChannelStore, "from_collection", staticmethod(slow_load))
+    reloaded = {}
+    reloader = threading.Thread(target=lambda: reloaded.setdefault("store", cache.get(lambda: db)))
+    reloader.start()
+    try:
+        assert loading.wait(5)
+        # Pendant le rechargement : l'ancien store, sans attendre le lock
+        current = cache.get(lambda: db)
+        assert current is old
+        assert len(current.rows(current.top_by("rank", len(DOCS)))) == len(DOCS)
+    finally:
+        release.set()
+        reloader.join(5)
+
+    assert reloaded["store"].version == "v2"
+    assert len(reloaded["store"]) == len(DOCS) - 1
+    assert cache.get(lambda: db) is reloaded["store"]
+    assert len(old) == len(DOCS)
@@ -0,0 +1,117 @@
+import types
+from contextlib import contextmanager
+from datetime import timedelta
+
+import mongomock
+import pytest
+
+import scrapers.job_queue as job_queue
+import scrapers.vidiq_enrich as vidiq_enrich
+from scrapers.job_queue import (
+    DEAD, DONE, LEASED, PENDING, JobWorker, claim, complete, enqueue, fail, heartbeat,
+    queue_status, reap_expired,
+)
+
+
+def url(rank):
+    return f"https://vidiq.com/fr/youtube-stats/channel/UC{rank:022d}/"
+
+
+@pytest.fixture
+def jobs(db, monkeypatch):
+    # mongomock ne rejoue pas les UpdateOne de la version de pymongo installée
+    def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            self.update_one(op._filter, op._doc, upsert=op._upsert)
+        return types.SimpleNamespace(upserted_count=len(ops), modified_count=0)
+
+    monkeypatch.setattr(mongomock.collection.Collection, "bulk_write", bulk_write)
+    collection = db[job_queue.JOBS_COLLECTION]
+    enqueue(collection, [{"rank": rank, "channel_url": url(rank)} for rank in (3, 1, 2)], max_attempts=2)
+    return collection
+
+
+def expire(jobs, job_id):
+    """Fait expirer le bail d'un job (worker mort sans heartbeat)."""
+    jobs.update_one({"_id": job_id}, {"$set": {"lease_expires_at": job_queue._now() - timedelta(seconds=1)}})
+
+
+def test_claim_takes_best_rank_once(jobs):
+    first = claim(jobs, "w1", 60)
+    second = claim(jobs, "w2", 60)
+
+    assert (first["_id"], first["state"], first["attempts"]) == (url(1), LEASED, 1)
+    assert second["_id"] == url(2)
+    assert claim(jobs, "w3", 60)["_id"] == url(3)
+    assert claim(jobs, "w4", 60) is None
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_loses_it(jobs):
+    job = claim(jobs, "dead-worker", 60)
+    assert claim(jobs, "w2", 60)["_id"] != job["_id"]
+
+    expire(jobs, job["_id"])
+    reclaimed = claim(jobs, "w3", 60)
+    assert (reclaimed["_id"], reclaimed["lease_owner"], reclaimed["attempts"]) == (job["_id"], "w3", 2)
+    assert not heartbeat(jobs, job["_id"], "dead-worker", 60)
+    assert not complete(jobs, job["_id"], "dead-worker")
+    assert complete(jobs, job["_id"], "w3")
+    assert jobs.find_one({"_id": job["_id"]})["state"] == DONE
+
+
+def test_reap_expired_dead_letters_exhausted_leases(jobs):
+    job = claim(jobs, "w1", 60)
+    expire(jobs, job["_id"])
+    claim(jobs, "w2", 60)                       # 2e et dernière tentative
+    expire(jobs, job["_id"])
+
+    assert reap_expired(jobs) == 1
+    dead = jobs.find_one({"_id": job["_id"]})
+    assert (dead["state"], dead["lease_owner"]) == (DEAD, None)
+    # Les baux encore valides ne sont pas touchés
+    assert queue_status(jobs) == {PENDING: 2, LEASED: 0, DONE: 0, DEAD: 1}
+
+
+def test_fail_retries_with_delay_then_dead_letters(jobs):
+    job = claim(jobs, "w1", 60)
+    assert fail(jobs, job, "w1", "timeout", base_delay=60) == PENDING
+    retried = jobs.find_one({"_id": job["_id"]})
+    # Mongo renvoie des datetimes UTC naïfs
+    assert retried["available_at"] > job_queue._now().replace(tzinfo=None) + timedelta(seconds=50)
+    assert claim(jobs, "w1", 60)["_id"] != job["_id"]
+
+    jobs.update_one({"_id": job["_id"]}, {"$set": {"available_at": job_queue._now()}})
+    job = claim(jobs, "w1", 60)
+    assert job["attempts"] == 2
+    assert fail(jobs, job, "w1", "timeout") == DEAD
+
+
+class FakePool:
+    @contextmanager
+    def page(self):
+        yield None
+
+    def close(self):
+        pass
+
+
+def test_parse_miss_dead_letters_without_erasing_enrichment(jobs, db, monkeypatch):
+    monkeypatch.setattr(job_queue, "get_db", lambda: db)
+    vidiq_enrich.upsert_mongo(
+        [{"channel_url": url(1), "rank": 1, "estimated_monthly_earnings": "$1M - $2M"}],
+        db.channels_enriched,
+    )
+    monkeypatch.setattr(vidiq_enrich, "enrich_channel", lambda page, ch, *args: {
+        **ch, **dict.fromkeys(vidiq_enrich.FIELD_LABELS),
+        "failure_class": vidiq_enrich.PARSE_MISS, "error": "Aucun label reconnu",
+    })
+    worker = JobWorker(worker_id="w1", pool=FakePool())
+
+    worker.process(claim(jobs, "w1", 60))
+
+    job = jobs.find_one({"_id": url(1)})
+    assert (job["state"], job["attempts"], job["last_error"]) == (DEAD, 1, "Aucun label reconnu")
+    doc = db.channels_enriched.find_one({"channel_url": url(1)})
+    assert doc["estimated_monthly_earnings"] == "$1M - $2M"
+    assert doc["failure_class"] == vidiq_enrich.PARSE_MISS
+    assert worker.stats["dead"] == 1 and worker.stats["done"] == 0
@@ -0,0 +1,95 @@
+import gzip
+import json
+import os
+
+import pytest
+from flask import Flask
+
+import scrapers.prerender as trigger
+from prerender import PrerenderedPages
+
+
+class FakeProcess:
+    def __init__(self, *args, **kwargs):
+        self.code = None
+        FakeProcess.started.append(self)
+
+    def poll(self):
+        return self.code
+
+    def wait(self):
+        return self.code or 0
+
+
+@pytest.fixture
+def popen(monkeypatch):
+    FakeProcess.started = []
+    monkeypatch.setattr(trigger, "PRERENDER_ENABLED", True)
+    monkeypatch.setattr(trigger, "_background", None)
+    monkeypatch.setattr(trigger.subprocess, "Popen", FakeProcess)
+    return FakeProcess.started
+
+
+def test_background_render_is_reaped_and_not_overlapped(popen):
+    trigger.trigger_prerender(wait=False)
+    trigger.trigger_prerender(wait=False)
+    assert len(popen) == 1
+
+    popen[0].code = 0
+    trigger.trigger_prerender(wait=False)
+    assert len(popen) == 2
+    assert trigger._background is popen[1]
+
+
+@pytest.fixture
+def pages(tmp_path):
+    version = tmp_path / "v1"
+    version.mkdir()
+    (version / "c.html").write_bytes(b"<p>pre</p>")
+    (version / "c.html.gz").write_bytes(gzip.compress(b"<p>pre</p>"))
+    (version / "manifest.json").write_text(json.dumps({"data_version": "d1", "pages": {"/channels": "c.html"}}))
+    os.symlink("v1", tmp_path / "current")
+    return PrerenderedPages(root=str(tmp_path), check_every=0, version_check_every=0)
+
+
+def fake_db(version):
+    class Meta:
+        def find_one(self, query):
+            return {"_id": "data_version", "version": version}
+    return lambda: {"meta": Meta()}
+
+
+@pytest.mark.parametrize("header, status", [
+    ('"v1/c.html"', 304),
+    ('W/"v1/c.html"', 304),
+    ('"other", "v1/c.html"', 304),
+    ("*", 304),
+    ('"v1/c"', 200),
+    ('"v1/c.html-old"', 200),
+])
+def test_if_none_match(pages, header, status):
+    with Flask(__name__).test_request_context("/channels", headers={"If-None-Match": header}):
+        from flask import request
+        assert pages.response(request, fake_db("d1")).status_code == status
+
+
+def test_stale_pages_fall_through(pages):
+    app = Flask(__name__)
+    with app.test_request_context("/channels"):
+        from flask import request
+        assert pages.response(request, fake_db("d1")).headers["X-Prerendered"] == "v1"
+        assert pages.response(request, fake_db("d2")) is None
+
+
+def test_only_prerendered_routes_look_up_pages(db, monkeypatch):
+    import main
+    monkeypatch.setattr(main, "get_db", lambda: db)
+    seen = []
+    monkeypatch.setattr(main.PRERENDERED, "response", lambda request, get_db: seen.append(request.path))
+    client = main.app.test_client()
+
+    client.get("/api/channels")
+    client.get("/health")
+    client.get("/static/missing.css")
+    client.get("/quiz")
+    assert seen == ["/quiz"]
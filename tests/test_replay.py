@@ -0,0 +1,111 @@
+import json
+import os
+
+import pytest
+
+from scrapers.replay import HarRecorder, HarReplayer, har_from_env
+
+
+HAR = {"log": {"version": "1.2", "creator": {"name": "test", "version": "1"}, "entries": [{
+    "request": {"method": "GET", "url": "https://vidiq.com/fr/youtube-stats/top/100/",
+                "headers": [], "httpVersion": "HTTP/1.1"},
+    "response": {"status": 200, "statusText": "OK", "httpVersion": "HTTP/1.1", "headers": [],
+                 "content": {"mimeType": "text/html", "text": "<table></table>"}},
+}]}}
+
+
+class FakeContext:
+    def __init__(self):
+        self.routes = []
+
+    def route(self, pattern, handler):
+        self.routes.append(("route", pattern, handler))
+
+    def route_from_har(self, path, not_found=None):
+        self.routes.append(("har", path, not_found))
+
+
+class FakeRoute:
+    def __init__(self, resource_type="document"):
+        self.request = type("Request", (), {"resource_type": resource_type})()
+        self.outcome = None
+
+    def fallback(self):
+        self.outcome = "fallback"
+
+    def fulfill(self, status, body):
+        self.outcome = status
+
+    def abort(self, reason):
+        self.outcome = reason
+
+
+@pytest.fixture
+def har_dir(tmp_path):
+    for name in ("context-0002.har", "context-0001.har"):
+        (tmp_path / name).write_text(json.dumps(HAR), encoding="utf-8")
+    return tmp_path
+
+
+def serve(replayer, resource_types):
+    routes = [FakeRoute(resource_type) for resource_type in resource_types]
+    for route in routes:
+        replayer._inject(route)
+    return [route.outcome for route in routes]
+
+
+def test_install_routes_hars_between_faults_and_abort(har_dir):
+    context = FakeContext()
+    replayer = HarReplayer(str(har_dir))
+    replayer.install(context)
+
+    # Playwright appelle le dernier handler enregistré en premier
+    assert [kind for kind, _, _ in context.routes] == ["route", "har", "har", "route"]
+    assert context.routes[-1][2] == replayer._inject
+    assert [os.path.basename(path) for kind, path, _ in context.routes if kind == "har"] == [
+        "context-0001.har", "context-0002.har"]
+    assert all(not_found == "fallback" for kind, _, not_found in context.routes if kind == "har")
+
+    unmatched = FakeRoute()
+    context.routes[0][2](unmatched)
+    assert unmatched.outcome == "internetdisconnected"
+
+
+def test_injected_errors_are_reproducible_and_only_on_documents(har_dir):
+    types = ["document", "script", "document", "image"] * 25
+    first = HarReplayer(str(har_dir), error_rate=0.3, seed=7)
+    outcomes = serve(first, types)
+
+    assert outcomes == serve(HarReplayer(str(har_dir), error_rate=0.3, seed=7), types)
+    assert all(outcome == "fallback" for t, outcome in zip(types, outcomes) if t != "document")
+    assert first.stats["documents"] == 50
+    assert first.stats["injected_errors"] == outcomes.count(503) > 0
+    assert set(serve(HarReplayer(str(har_dir), error_rate=1.0), ["document"] * 3)) == {503}
+    assert set(serve(HarReplayer(str(har_dir)), ["document"] * 3)) == {"fallback"}
+
+
+def test_har_from_env(har_dir, tmp_path_factory, monkeypatch):
+    monkeypatch.delenv("VIDIQ_REPLAY_HAR_DIR", raising=False)
+    monkeypatch.delenv("VIDIQ_RECORD_HAR_DIR", raising=False)
+    assert har_from_env() is None
+
+    record_dir = tmp_path_factory.mktemp("record")
+    (record_dir / "context-0001.zip").write_bytes(b"")
+    monkeypatch.setenv("VIDIQ_RECORD_HAR_DIR", str(record_dir))
+    recorder = har_from_env()
+    assert isinstance(recorder, HarRecorder)
+    # La numérotation reprend après les HAR déjà enregistrés
+    assert recorder.context_options() == {
+        "record_har_path": os.path.join(str(record_dir), "context-0002.zip"), "record_har_mode": "full"}
+
+    monkeypatch.setenv("VIDIQ_REPLAY_HAR_DIR", str(har_dir))
+    monkeypatch.setenv("VIDIQ_REPLAY_ERROR_RATE", "0.25")
+    monkeypatch.setenv("VIDIQ_REPLAY_SEED", "3")
+    replayer = har_from_env()
+    assert isinstance(replayer, HarReplayer)
+    assert replayer.error_rate == 0.25
+    assert len(replayer.har_paths) == 2
+
+    monkeypatch.setenv("VIDIQ_REPLAY_HAR_DIR", str(record_dir / "vide"))
+    with pytest.raises(FileNotFoundError):
+        har_from_env()
@@ -0,0 +1,82 @@
+import time
+from contextlib import contextmanager
+
+import pytest
+
+import scrapers.scheduler as scheduler
+import scrapers.vidiq_enrich as vidiq_enrich
+
+
+URL = "https://vidiq.com/fr/youtube-stats/channel/UC1/"
+
+
+class FakePool:
+    @contextmanager
+    def page(self):
+        yield None
+
+    def release(self):
+        pass
+
+
+@pytest.fixture
+def refresh(db, monkeypatch):
+    monkeypatch.setattr(scheduler, "get_db", lambda: db)
+    return scheduler.RefreshScheduler(pool=FakePool(), base_interval_hours=24)
+
+
+def run_worker(refresh, results, monkeypatch):
+    """Fait traiter la chaîne par un worker, avec `results` comme retours successifs d'enrich_channel."""
+    results = iter(results)
+    monkeypatch.setattr(vidiq_enrich, "enrich_channel", lambda page, ch, **kwargs: {**ch, **next(results)})
+    ch = {"channel_url": URL, "channel_name": "Alpha", "rank": 1}
+    with refresh._lock:
+        refresh._inflight.add(URL)
+    refresh._work.put(ch)
+    refresh._work.put(None)
+    refresh._worker(1)
+
+
+def test_failed_refresh_keeps_enrichment_and_backs_off(refresh, db, monkeypatch):
+    run_worker(refresh, [{"estimated_monthly_earnings": "$1M - $2M", "failure_class": None}], monkeypatch)
+    refreshed_at = refresh._state[URL]["last_refresh"]
+
+    failure = {**dict.fromkeys(vidiq_enrich.FIELD_LABELS), "failure_class": "timeout", "error": "Timeout"}
+    before = time.time()
+    run_worker(refresh, [failure], monkeypatch)
+
+    doc = db.channels_enriched.find_one()
+    assert doc["estimated_monthly_earnings"] == "$1M - $2M"
+    assert doc["failure_class"] == "timeout"
+    state = refresh._state[URL]
+    assert state["last_refresh"] == refreshed_at
+    assert state["failures"] == 1
+    assert before + scheduler.RETRY_BASE_SECONDS <= state["retry_at"] < time.time() + scheduler.RETRY_BASE_SECONDS + 1
+    assert refresh.refreshed == 1
+
+    run_worker(refresh, [failure], monkeypatch)
+    assert refresh._state[URL]["retry_at"] >= before + 2 * scheduler.RETRY_BASE_SECONDS
+
+
+def test_backoff_survives_reload_and_resets_on_success(refresh, db, monkeypatch):
+    db.channels_top100.insert_one({"channel_url": URL, "channel_name": "Alpha", "rank": 1})
+    refresh.reload()
+    run_worker(refresh, [{"failure_class": "throttled", "error": "429"}], monkeypatch)
+    retry_at = refresh._state[URL]["retry_at"]
+
+    refresh.reload()
+    assert refresh._peek() == (retry_at, URL)
+
+    run_worker(refresh, [{"failure_class": None}], monkeypatch)
+    assert (refresh._state[URL]["failures"], refresh._state[URL]["retry_at"]) == (0, None)
+
+
+def test_reload_drops_delisted_channels(refresh, db):
+    db.channels_top100.insert_many([{"channel_url": f"{URL}{i}", "rank": i + 1} for i in range(3)])
+    refresh.reload()
+    refresh._inflight.add(f"{URL}1")
+    db.channels_top100.delete_many({"rank": {"$lte": 2}})
+
+    refresh.reload()
+    assert sorted(refresh._state) == [f"{URL}1", f"{URL}2"]
+    assert refresh._peek()[1] == f"{URL}2"
@@ -0,0 +1,104 @@
+import pytest
+
+from scrapers.vidiq_enrich import (
+    CHANNEL_PAGE_EXTRACTOR, FIELD_LABELS, extract_labeled_value, record_failure, upsert_mongo,
+)
+
+
+GOOD = {
+    "channel_url": "https://vidiq.com/fr/youtube-stats/channel/UC1/",
+    "channel_name": "Alpha",
+    "estimated_monthly_earnings": "$1M - $2M",
+    "avg_video_duration": "10:00",
+}
+FAILED = {
+    "channel_url": GOOD["channel_url"],
+    "channel_name": "Alpha",
+    **dict.fromkeys(FIELD_LABELS),
+    "failure_class": "timeout",
+    "error": "Timeout 60000ms",
+    "retries": 2,
+}
+
+
+def test_failed_upsert_keeps_previous_enrichment(db):
+    upsert_mongo([dict(GOOD)], db.channels_enriched)
+    upsert_mongo([dict(FAILED)], db.channels_enriched)
+
+    doc = db.channels_enriched.find_one()
+    assert doc["estimated_monthly_earnings"] == "$1M - $2M"
+    assert doc["earnings_monthly_low"] == 1_000_000
+    assert doc["avg_video_duration"] == "10:00"
+    assert doc["failure_class"] == "timeout"
+
+
+def test_successful_upsert_clears_previous_failure(db):
+    upsert_mongo([dict(FAILED)], db.channels_enriched)
+    upsert_mongo([dict(GOOD)], db.channels_enriched)
+
+    doc = db.channels_enriched.find_one()
+    assert "error" not in doc and "failure_class" not in doc
+
+
+def test_record_failure_only_writes_failure_fields(db):
+    upsert_mongo([dict(GOOD)], db.channels_enriched)
+    record_failure(dict(FAILED, channel_name="Renamed"), db.channels_enriched)
+
+    doc = db.channels_enriched.find_one()
+    assert doc["channel_name"] == "Alpha"
+    assert doc["earnings_monthly_high"] == 2_000_000
+    assert (doc["failure_class"], doc["retries"]) == ("timeout", 2)
+
+
+def test_record_failure_creates_missing_channel_from_listing(db):
+    record_failure(dict(FAILED, rank=3), db.channels_enriched)
+
+    doc = db.channels_enriched.find_one()
+    assert (doc["rank"], doc["name_key"]) == (3, "alpha")
+    assert "estimated_monthly_earnings" not in doc
+
+
+def test_batch_lookup_finds_keys_written_by_enrichment(db):
+    from query_api import build_batch_lookup
+
+    upsert_mongo([{**GOOD, "channel_name": "  Ｍr  Beast "}], db.channels_enriched)
+
+    for body in ({"names": ["mr beast"]},
+                 {"urls": ["HTTP://WWW.vidiq.com/fr/youtube-stats/channel/UC1?x=1#top"]}):
+        _, field, _, keys, _ = build_batch_lookup(body)
+        assert db.channels_enriched.count_documents({field: {"$in": keys}}) == 1
+
+
+PAGES = [
+    # Valeurs sur la ligne du label (EN)
+    "Home\nEstimated Monthly Earnings: $1.2K - $19.4K\nAverage Video Duration – 12:04\n"
+    "Subscribers Gained 120K\nUpload Frequency: 3 / week\nEngagement Rate 4.2%\n",
+    # Valeurs sur la ligne suivante, après des lignes vides (FR)
+    "Revenus mensuels estimés\n\n  1,2 k€ - 19 k€\nDurée moyenne des vidéos\n8 min\n"
+    "Abonnés gagnés\n\n\n+12 k\nFréquence de publication\n1 vidéo / jour\nTaux d'engagement\n3,1 %",
+    # Label seul sur sa ligne : la ligne suivante est la valeur, même si elle le
+    # répète ; "İ" change la longueur de lower() ; champs absents à None
+    "Monthly Earnings\nMonthly Earnings $5K\nNew Subscribers: 1K\nİstanbul\nEngagement moyen : 2 %",
+    "Aucune statistique",
+]
+
+
+@pytest.mark.parametrize("text", PAGES)
+def test_label_extractor_matches_extract_labeled_value(text):
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    legacy = {field: extract_labeled_value(lines, labels) for field, labels in FIELD_LABELS.items()}
+
+    assert CHANNEL_PAGE_EXTRACTOR.extract(text) == legacy
+
+
+def test_label_extractor_values():
+    first, second, third, empty = (CHANNEL_PAGE_EXTRACTOR.extract(text) for text in PAGES)
+
+    assert first["estimated_monthly_earnings"] == "$1.2K - $19.4K"
+    assert first["avg_video_duration"] == "12:04"
+    assert second["subscribers_gained"] == "+12 k"
+    assert second["engagement_rate"] == "3,1 %"
+    assert third["estimated_monthly_earnings"] == "Monthly Earnings $5K"
+    assert third["engagement_rate"] == "2 %"
+    assert third["avg_video_duration"] is None
+    assert set(empty.values()) == {None}
@@ -0,0 +1,143 @@
+from contextlib import contextmanager
+
+import pytest
+
+from scrapers.vidiq_playwright_parser import _SNAPSHOT_JS, VidIQPlaywrightParser
+from scrapers.vidiq_scraper import store_channel
+
+
+class FakePool:
+    @contextmanager
+    def page(self):
+        yield None
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SnapshotPage:
+    """Page factice : chaque page.evaluate(_SNAPSHOT_JS) renvoie l'instantané suivant."""
+
+    def __init__(self, snapshots, clicked_url=None):
+        self.snapshots = list(snapshots)
+        self.evaluated = []
+        self.clicked_url = clicked_url
+        self.url = None
+
+    def goto(self, url, **kwargs):
+        return None
+
+    def wait_for_selector(self, selector, **kwargs):
+        pass
+
+    def wait_for_timeout(self, ms):
+        pass
+
+    def evaluate(self, script, arg=None):
+        assert script == _SNAPSHOT_JS
+        self.evaluated.append(arg)
+        return self.snapshots.pop(0)
+
+    def query_selector_all(self, selector):
+        page = self
+
+        class Row:
+            def click(self):
+                page.url = page.clicked_url
+
+        return [Row() for _ in range(4)]
+
+    @contextmanager
+    def expect_navigation(self, **kwargs):
+        yield
+
+    def go_back(self, **kwargs):
+        pass
+
+
+def row(index, rank, name):
+    return {"index": index, "cells": [f"#{rank}", name, "1,234", "1.5M", "2B"]}
+
+
+def url(i):
+    return f"https://vidiq.com/fr/youtube-stats/channel/UC{i}/"
+
+
+LISTS = {
+    "top": [(1, url(1)), (2, None), (3, url(3))],
+    "gaming": [(1, url(3)), (2, None), (3, None), (4, url(4))],
+}
+
+
+@pytest.fixture
+def crawl(monkeypatch):
+    def crawl_list(page, list_url, max_pages=None, policy=None, telemetry=None,
+                   progress=None, before_page=None):
+        progress.update(pages=1, complete=True)
+        for rank, channel_url in LISTS[list_url]:
+            yield {"rank": rank, "channel_name": f"{list_url} {rank}", "channel_url": channel_url}
+
+    monkeypatch.setattr(VidIQPlaywrightParser, "crawl_list", staticmethod(crawl_list))
+
+
+def test_iter_lists_dedupes_and_ranks_from_primary_list(crawl):
+    completed = []
+    channels = list(VidIQPlaywrightParser.iter_lists(["top", "gaming"], pool=FakePool(),
+                                                     completed=completed))
+
+    by_url = {ch["channel_url"]: ch for ch in channels}
+    assert by_url[url(3)]["rank"] == 3
+    assert by_url[url(3)]["lists"] == [{"list": "top", "rank": 3}, {"list": "gaming", "rank": 1}]
+    assert by_url[url(4)]["rank"] is None
+    # Sans URL : seule la chaîne du classement principal est gardée, avec son rang
+    assert [ch["rank"] for ch in channels if not ch["channel_url"]] == [2]
+    assert sorted(completed) == ["gaming", "top"]
+
+
+def test_store_channel_never_merges_url_less_channels(db, crawl):
+    channels = list(VidIQPlaywrightParser.iter_lists(["top", "gaming"], pool=FakePool()))
+    for channel in channels:
+        store_channel(db.channels_top100, channel)
+    store_channel(db.channels_top100, {"rank": None, "channel_url": None, "channel_name": "orpheline"})
+
+    assert db.channels_top100.count_documents({}) == len(channels) == 4
+    assert db.channels_top100.count_documents({"rank": None, "channel_url": None}) == 0
+
+
+def test_extract_top100_merges_scroll_snapshots_and_clicks_missing_links(monkeypatch):
+    monkeypatch.setattr("scrapers.vidiq_playwright_parser.SETTLE_MS", 0)
+    page = SnapshotPage([
+        {"rowCount": 4, "rows": [row(0, 1, "Alpha"), row(1, 2, "Beta"), row(2, 3, "Gamma")],
+         "links": {"1": url(1), "2": url(2)}},
+        {"rowCount": 4, "rows": [row(2, 3, "Gamma"), row(3, 4, "Delta"), {"index": 4, "cells": ["pub"]}],
+         "links": {"3": url(3)}},
+    ] + [{"rowCount": 4, "rows": [], "links": {}}] * 24, clicked_url=url(4))
+
+    channels = list(VidIQPlaywrightParser.extract_top100(page, "https://vidiq.test/top/"))
+
+    assert page.evaluated[:2] == [{"scroll": False, "delay": 0}, {"scroll": True, "delay": 1200}]
+    # Délai doublé tant qu'un scroll n'apporte aucun lien, 25 scrolls au plus
+    assert [arg["delay"] for arg in page.evaluated[2:4]] == [1200, 2400]
+    assert len(page.evaluated) == 26
+    assert [(ch["rank"], ch["channel_name"], ch["channel_url"]) for ch in channels] == [
+        (1, "Alpha", url(1)), (2, "Beta", url(2)), (3, "Gamma", url(3)), (4, "Delta", url(4)),
+    ]
+    assert channels[0]["videos"] == 1234
+    assert channels[0]["subscribers"] == 1_500_000
+    assert channels[0]["total_views"] == 2_000_000_000
+
+
+def test_extract_top100_stops_scrolling_once_every_rank_has_a_link(monkeypatch):
+    monkeypatch.setattr("scrapers.vidiq_playwright_parser.SETTLE_MS", 0)
+    page = SnapshotPage([
+        {"rowCount": 2, "rows": [row(0, 1, "Alpha"), row(1, 2, "Beta")], "links": {"1": url(1)}},
+        {"rowCount": 2, "rows": [], "links": {"2": url(2)}},
+    ])
+
+    channels = list(VidIQPlaywrightParser.extract_top100(page, "https://vidiq.test/top/"))
+
+    assert len(page.evaluated) == 2
+    assert [ch["channel_url"] for ch in channels] == [url(1), url(2)]